@@ -41,6 +41,10 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+# Optional offline record/replay of all HTTP traffic (HTTP_CASSETTE_MODE=record|replay)
+from core.storage.http_cassette import install_from_env
+install_from_env()
+
 # Suppress benign warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="mplfinance")
 warnings.filterwarnings("ignore", message="Could not import cached_binomial_price")
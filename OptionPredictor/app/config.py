@@ -1,10 +1,40 @@
 # config.py
 
-from dataclasses import dataclass, field, asdict
+import copy
+from dataclasses import dataclass, field, fields, replace
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Iterable, Optional, List, Dict
 from core.models.filters import FilterConfig
 
+# Numeric inputs: name → (exclusive min, inclusive max or None)
+NUMERIC_RANGES = {
+    'capital': (0, None),
+    'allocation_pct': (0, 100),
+    'profit_target_pct': (0, None),
+    'stop_loss_mult': (0, None),
+    'dte_target': (1, None),
+    'commission_per_contract': (0, None),
+}
+
+PRICING_MODES = ('model', 'quotes_mid', 'quotes_natural')
+
+
+def _check_range(name: str, val) -> None:
+    mn, mx = NUMERIC_RANGES[name]
+    if val <= mn or (mx is not None and val > mx):
+        rng = f"> {mn}" + (f" and ≤ {mx}" if mx else "")
+        raise ValueError(f"{name} must be {rng}.")
+
+
+def _check_dates(start: str, end: str) -> None:
+    try:
+        dt_start = datetime.strptime(start, "%Y-%m-%d")
+        dt_end   = datetime.strptime(end,   "%Y-%m-%d")
+    except Exception:
+        raise ValueError("Dates must be in YYYY-MM-DD format.")
+    if dt_start >= dt_end:
+        raise ValueError("Start date must be before end date.")
+
 @dataclass
 class StrategyConfig:
     """Holds and validates all backtest inputs."""
@@ -27,6 +57,11 @@ class StrategyConfig:
 
     # <-- changed here: use default_factory instead of a mutable default
     filters: FilterConfig       = field(default_factory=FilterConfig)
+    # 'pre' = entry filter checked inside the simulation loop; 'post' = legacy post-filter of finished trades
+    filter_mode: str            = 'pre'
+    # 'model' = Black-Scholes legs; 'quotes_mid' / 'quotes_natural' = archived chain quotes
+    # (mid, or bid for longs / ask for shorts), falling back to the model when a quote is missing
+    pricing_mode: str           = 'model'
 
     def __post_init__(self):
         # --- Symbol ---
@@ -35,27 +70,16 @@ class StrategyConfig:
             raise ValueError("Underlying symbol cannot be empty.")
 
         # --- Dates ---
-        try:
-            dt_start = datetime.strptime(self.start, "%Y-%m-%d")
-            dt_end   = datetime.strptime(self.end,   "%Y-%m-%d")
-        except Exception:
-            raise ValueError("Dates must be in YYYY-MM-DD format.")
-        if dt_start >= dt_end:
-            raise ValueError("Start date must be before end date.")
+        _check_dates(self.start, self.end)
 
         # --- Numeric Ranges ---
-        checks = [
-            ('capital', self.capital, 0, None),
-            ('allocation_pct', self.allocation_pct, 0, 100),
-            ('profit_target_pct', self.profit_target_pct, 0, None),
-            ('stop_loss_mult', self.stop_loss_mult, 0, None),
-            ('dte_target', self.dte_target, 1, None),
-            ('commission_per_contract', self.commission_per_contract, 0, None),
-        ]
-        for name, val, mn, mx in checks:
-            if val <= mn or (mx is not None and val > mx):
-                rng = f"> {mn}" + (f" and ≤ {mx}" if mx else "")
-                raise ValueError(f"{name} must be {rng}.")
+        for name in NUMERIC_RANGES:
+            _check_range(name, getattr(self, name))
+
+        if self.filter_mode not in ('pre', 'post'):
+            raise ValueError("filter_mode must be 'pre' or 'post'.")
+        if self.pricing_mode not in PRICING_MODES:
+            raise ValueError(f"pricing_mode must be one of {', '.join(PRICING_MODES)}.")
 
         # --- Custom legs required for manual strategy ---
         if self.strategy_type == 'custom_manual':
@@ -79,6 +103,7 @@ class StrategyConfig:
             "strategy_params": self.strategy_params,
             "benchmark_ticker": self.benchmark_ticker,
             "use_benchmark": self.use_benchmark,
+            "pricing_mode": self.pricing_mode,
             # you may also want to inject filters here if your engine supports them
         }
         if self.strategy_type == "custom_manual":
@@ -86,11 +111,56 @@ class StrategyConfig:
         return cfg
 
     def with_overrides(self, **overrides) -> "StrategyConfig":
-        cfg = asdict(self)
-        cfg.update(overrides)
-
         # Immediately wrap filters back into FilterConfig if it's a dict
-        if isinstance(cfg.get("filters"), dict):
-            cfg["filters"] = FilterConfig(**cfg["filters"])
-            
-        return StrategyConfig(**cfg)
+        if isinstance(overrides.get("filters"), dict):
+            overrides["filters"] = FilterConfig(**overrides["filters"])
+        # replace() shares nested objects; strategy_params gets its own dict because Backtester.run writes to it
+        overrides.setdefault("strategy_params", dict(self.strategy_params))
+        return replace(self, **overrides)
+
+    def override_template(self, keys: Iterable[str]) -> "OverrideTemplate":
+        return OverrideTemplate(self, keys)
+
+
+class OverrideTemplate:
+    """
+    Compiled with_overrides() for a sweep over a fixed set of keys.
+
+    The base config is validated once (at construction). For each swept key the
+    template precomputes the check it needs – a numeric range, the date pair, or
+    the symbol normalisation – and apply() copies the base config and sets only
+    the changed fields, running just those checks. Keys with cross-field rules
+    (strategy_type, custom_legs, filters, ...) fall back to the full validating
+    with_overrides().
+    """
+    _FAST_KEYS = set(NUMERIC_RANGES) | {'start', 'end', 'underlying', 'risk_free_rate', 'benchmark_ticker',
+                                        'use_benchmark', 'strategy_params'}
+
+    def __init__(self, base: StrategyConfig, keys: Iterable[str]):
+        names = {f.name for f in fields(StrategyConfig)}
+        self.keys = tuple(keys)
+        unknown = [k for k in self.keys if k not in names]
+        if unknown:
+            raise ValueError(f"Unknown StrategyConfig field(s): {', '.join(unknown)}")
+        self.base = base
+        self.fast = all(k in self._FAST_KEYS for k in self.keys)
+        self.range_keys = tuple(k for k in self.keys if k in NUMERIC_RANGES)
+        self.check_dates = 'start' in self.keys or 'end' in self.keys
+
+    def apply(self, overrides: dict) -> StrategyConfig:
+        if not self.fast or any(k not in self.keys for k in overrides):
+            return self.base.with_overrides(**overrides)
+
+        cfg = copy.copy(self.base)
+        cfg.__dict__.update(overrides)
+        if 'strategy_params' not in overrides:
+            cfg.strategy_params = dict(self.base.strategy_params)
+        if 'underlying' in overrides:
+            cfg.underlying = cfg.underlying.strip().upper()
+            if not cfg.underlying:
+                raise ValueError("Underlying symbol cannot be empty.")
+        if self.check_dates:
+            _check_dates(cfg.start, cfg.end)
+        for name in self.range_keys:
+            _check_range(name, getattr(cfg, name))
+        return cfg
@@ -50,16 +50,12 @@ def fetch_ticker_data(ticker: str, days: int) -> pd.Series:
     Fetches daily closing prices for a ticker over the last `days` days, 
     with the end date set to 7 days before the current date to ensure data availability.
     
-    Attempt 1: Tries Stooq first.
-    Attempt 2: Falls back to yfinance with retries if Stooq fails.
-    Raises ValueError with detailed message if neither source works.
+    Prices come from the shared MarketData service (local bar store first,
+    then Stooq with a yfinance fallback).
+    Raises ValueError with detailed message if no source works.
     """
     import datetime as dt
-    import time
-    import pandas as pd
-    import yfinance as yf
-    import requests
-    import io
+    from core.storage.market_data import market_data
 
     # Calculate date range
     current_date = dt.datetime.today()
@@ -74,77 +70,16 @@ def fetch_ticker_data(ticker: str, days: int) -> pd.Series:
     end_str = end_date.strftime("%Y-%m-%d")
     print(f"Fetching data for {ticker} from {start_str} to {end_str}")
 
-    def clean_close(df: pd.DataFrame) -> pd.Series:
-        if 'Close' not in df.columns:
-            raise ValueError(f"'Close' column missing for {ticker}")
-        s = df['Close'].ffill().dropna()
-        if s.empty:
-            raise ValueError(f"No valid 'Close' prices for {ticker}")
-        return s
-
-    # Attempt 1: Fetch data from Stooq
-    symbol = ticker.lower()
-    if '.' not in symbol:
-        symbol += '.us'
-    url = (
-        f"https://stooq.com/q/d/l/"
-        f"?s={symbol}"
-        f"&d1={start_str.replace('-', '')}&d2={end_str.replace('-', '')}"
-        f"&i=d"
-    )
-    print(f"Attempt 1: Fetching Stooq data from URL: {url}")
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        resp = requests.get(url, headers=headers, timeout=10)
-        resp.raise_for_status()
-
-        df = pd.read_csv(
-            io.StringIO(resp.text),
-            parse_dates=[0],
-            index_col=0
-        ).sort_index()
-        return clean_close(df)
-
-    except requests.exceptions.RequestException as e:
-        print(f"Attempt 1 (Stooq) failed for '{ticker}' due to network/HTTP error: {e}")
+        s = market_data().close(ticker, start_date, end_date).ffill().dropna()
     except Exception as e:
-        print(f"Attempt 1 (Stooq) failed for '{ticker}': {e}")
-        if 'resp' in locals():
-            print(f"Problematic Stooq data: {resp.text[:500]}")
-
-    # Attempt 2: Fetch data from yfinance with retries
-    print(f"Attempt 2: Falling back to yfinance for '{ticker}'")
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            df = yf.download(
-                ticker,
-                start=start_str,
-                end=end_str,
-                progress=False,
-                threads=False
-            )
-            if df is not None and not df.empty:
-                return clean_close(df)
-            else:
-                print(f"yfinance returned empty data on retry {attempt + 1}/{max_retries}")
-        except Exception as e:
-            print(f"yfinance retry {attempt + 1}/{max_retries} failed: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(5 * (attempt + 1))  # Exponential backoff
-                continue
-            print(f"Attempt 2 (yfinance) failed after {max_retries} retries")
-            break
-
-    # Both attempts failed
-    raise ValueError(
-        f"Failed to fetch data for '{ticker}'.\n"
-        f"- Attempt 1 (Stooq): Failed.\n"
-        f"- Attempt 2 (yfinance): Failed after {max_retries} retries.\n"
-        f"Date range: {start_str} to {end_str}. Check ticker or network."
-    )
+        raise ValueError(
+            f"Failed to fetch data for '{ticker}': {e}\n"
+            f"Date range: {start_str} to {end_str}. Check ticker or network."
+        ) from e
+    if s.empty:
+        raise ValueError(f"No valid 'Close' prices for {ticker}")
+    return s
 
 def calculate_drift_and_volatility(prices):
     """Calculates annualized drift and realized volatility."""
@@ -1,10 +1,15 @@
 import logging
 from typing import Callable, Optional
 
+import numpy as np
 import pandas as pd
 
 from app.config import StrategyConfig
 from core.models.filters import FilterConfig
+from core.models.trade_log import TradeLog
+from core.storage.chain_archive import default_chain_archive
+from core.storage.fingerprint import data_fingerprint
+from core.storage.result_cache import default_result_cache
 import core.engine.backtester as BT
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,16 +19,18 @@ class BacktestResult:
     def __init__(
         self,
         equity: pd.Series,
-        trades: list[dict],
+        trades: TradeLog | list[dict],
         stats: dict,
         config: dict,
-        benchmark: pd.Series
+        benchmark: pd.Series,
+        filter_stats: Optional[dict] = None
     ):
         self._equity    = equity
-        self._trades    = trades
+        self._trades    = TradeLog.from_records(trades)
         self._stats     = stats
         self._config    = config
         self._benchmark = benchmark
+        self._filter_stats = filter_stats or {}
 
     def summary(self) -> dict:
         return self._stats
@@ -31,15 +38,34 @@ class BacktestResult:
     def equity_curve(self) -> pd.Series:
         return self._equity
 
-    def trade_list(self) -> list[dict]:
-        return list(self._trades)
+    def trade_list(self) -> TradeLog:
+        """Read-only sequence of trade dicts; each dict is built on access from the columnar log."""
+        return self._trades
 
-    def export_csv(self, path: str):
+    def trades(self) -> TradeLog:
+        return self._trades
+
+    def trades_frame(self) -> pd.DataFrame:
+        """Trades as a DataFrame sharing memory with the columnar log."""
+        return self._trades.to_frame()
+
+    def filter_stats(self) -> dict:
+        """How the entry filter ran: mode, entry days skipped, per-rule rejections, positions opened/updated."""
+        return dict(self._filter_stats)
+
+    def export_csv(self, path: str, fmt: str = "csv"):
+        """Write {path}_equity and {path}_trades as CSV, or as Parquet with fmt="parquet" (needs pyarrow)."""
+        if fmt not in ("csv", "parquet"):
+            raise ValueError("fmt must be 'csv' or 'parquet'")
         df_eq = self._equity.to_frame(name="equity").reset_index().rename(columns={'index': 'date'})
-        df_tr = pd.DataFrame(self._trades)
-        df_eq.to_csv(f"{path}_equity.csv", index=False)
-        df_tr.to_csv(f"{path}_trades.csv",  index=False)
-        logging.info(f"Exported equity → {path}_equity.csv and trades → {path}_trades.csv")
+        df_tr = self._trades.to_frame()
+        if fmt == "parquet":
+            df_eq.to_parquet(f"{path}_equity.parquet", index=False)
+            df_tr.to_parquet(f"{path}_trades.parquet", index=False)
+        else:
+            df_eq.to_csv(f"{path}_equity.csv", index=False)
+            df_tr.to_csv(f"{path}_trades.csv",  index=False)
+        logging.info(f"Exported equity → {path}_equity.{fmt} and trades → {path}_trades.{fmt}")
 
 class BacktestEngine:
     """
@@ -52,11 +78,79 @@ class BacktestEngine:
         config: StrategyConfig,
         progress_callback: Optional[Callable[[int, int], None]] = None,
         trade_callback: Optional[Callable[[dict], None]] = None,
+        use_cache: bool = True,
+        cache_writes: bool = True,
     ):
+        """
+        use_cache    – consult the on-disk result cache before simulating
+        cache_writes – store fresh results in it; with False the run only reads, and
+                       save_to_cache() stores the last result on demand (sweep workers)
+        """
         self.config            = config
         self.progress_callback = progress_callback
         self.trade_callback    = trade_callback
+        self.use_cache         = use_cache
+        self.cache_writes      = cache_writes
+        self._unsaved: Optional[tuple[str, dict]] = None
         self._result: Optional[BacktestResult] = None
+        self._filter_stats: dict = {}
+
+    def _load_feed(self) -> tuple[pd.Series, pd.Series]:
+        start, end = pd.to_datetime(self.config.start), pd.to_datetime(self.config.end)
+        prices = BT.Backtester._load_prices(self.config.underlying.upper(), start, end)
+        return prices, BT.realized_vol(prices).ffill().bfill().clip(lower=0.05)
+
+    def _simulate(self, price_data, vol_data, benchmark_data, spy_prices, bars=None, entry_time=None) -> dict:
+        """Run the backtester and apply the entry filters; returns the cacheable result entry."""
+        cfg_dict = self.config.to_dict()
+        logging.info("Starting Backtester.run()")
+        
+        fcfg = self.config.filters
+        if isinstance(fcfg, dict):
+            fcfg = FilterConfig(**fcfg)
+        pre_filter = self.config.filter_mode == "pre"
+
+        # "pre": the entry mask is checked inside the simulation loop, so filtered days are never simulated.
+        # "post": legacy mode – simulate every entry, then drop filtered trades (kept for comparison).
+        if bars is not None:
+            raw = BT.Backtester.run_intraday(cfg_dict, bars, entry_filter=fcfg if pre_filter else None,
+                                             entry_time=entry_time, spy_prices=spy_prices)
+        else:
+            raw = BT.Backtester.run(cfg_dict, price_data=price_data, vol_data=vol_data, spy_prices=spy_prices,
+                                    entry_filter=fcfg if pre_filter else None)
+
+        all_trades = raw["trades"]
+        filter_stats = raw.get("filter_stats", {})
+
+        # One vectorized mask for all trades instead of fcfg.allows() per trade
+        rejections: dict[str, int] = {}
+        if pre_filter:
+            allowed = all_trades
+            rejections = filter_stats.get("rejections", {})
+        elif len(all_trades):
+            opens = pd.DatetimeIndex(all_trades.column("open"))
+            expiries = all_trades.column("expiry")
+            expiries = np.where(np.isnat(expiries), all_trades.column("open"), expiries)
+            mask = fcfg.compile(opens, pd.DatetimeIndex(expiries), self.config.underlying, counts=rejections)
+            allowed = all_trades.take(mask)
+        else:
+            allowed = all_trades
+
+        if not pre_filter:
+            filter_stats = {**filter_stats, "mode": "post",
+                            "trades_discarded": len(all_trades) - len(allowed), "rejections": rejections}
+        logging.info(f"Filtered trades ({self.config.filter_mode}): {len(allowed)} / {len(all_trades)} allowed; "
+                     f"rejections by rule: {rejections}")
+
+        benchmark = raw.get("benchmark")
+        if not cfg_dict.get("use_benchmark", True):
+            benchmark = None
+        elif benchmark_data is not None:
+            benchmark = benchmark_data
+        return {
+            "equity": raw["equity"], "trades": allowed, "stats": raw["stats"],
+            "config": raw["config"], "benchmark": benchmark, "filter_stats": filter_stats,
+        }
 
     @staticmethod
     def estimate_steps(cfg: StrategyConfig) -> int:
@@ -70,44 +164,61 @@ class BacktestEngine:
         price_data: Optional[pd.Series] = None,
         vol_data: Optional[pd.Series] = None,
         benchmark_data: Optional[pd.Series] = None,
-        spy_prices: Optional[pd.Series] = None
+        spy_prices: Optional[pd.Series] = None,
+        data_key: Optional[str] = None,
+        bars=None,
+        entry_time: Optional[str] = None
     ):
-        cfg_dict = self.config.to_dict()
-        logging.info("Starting Backtester.run()")
-        
-        raw = BT.Backtester.run(cfg_dict, price_data=price_data, vol_data=vol_data, spy_prices=spy_prices)
-
-        all_trades = raw["trades"]
-        fcfg = self.config.filters
-        if isinstance(fcfg, dict):
-            fcfg = FilterConfig(**fcfg)
+        """
+        data_key   – precomputed fingerprint of (price, vol, benchmark, spy) for the result
+                     cache; sweep workers hash their feed once instead of on every run.
+        bars       – a BarView (core.storage.bar_store) to run the intraday event loop on
+                     instead of daily closes
+        entry_time – intraday entry time "HH:MM" (default: filter time-of-day start / session open)
+        """
+        cache = default_result_cache() if self.use_cache else None
+        key = entry = None
+        if cache is not None:
+            if bars is not None:
+                data_key = f"bars:{bars.fingerprint()}:{entry_time}:{data_fingerprint(benchmark_data, spy_prices)}"
+            elif price_data is None or vol_data is None:
+                # Load the feed here (same series Backtester would load) so it can be fingerprinted
+                price_data, vol_data = self._load_feed()
+                data_key = None
+            if data_key is None:
+                data_key = data_fingerprint(price_data, vol_data, benchmark_data, spy_prices)
+            if self.config.pricing_mode != "model":
+                data_key += f":chains:{default_chain_archive().fingerprint(self.config.underlying)}"
+            key = cache.key(self.config, data_key, BT.ENGINE_VERSION)
+            entry = cache.get(key)
+            if entry is not None:
+                logging.info("Backtest result cache hit for %s", self.config.underlying)
 
-        allowed = []
-        for trade in all_trades:
-            entry_dt = trade["open"]
-            expiry = trade.get("expiry", entry_dt)
-            expiry_dt = expiry.date() if hasattr(expiry, "date") else pd.to_datetime(expiry).date()
-            if fcfg.allows(entry_dt, expiry_dt, self.config.underlying):
-                allowed.append(trade)
+        self._unsaved = None
+        if entry is None:
+            entry = self._simulate(price_data, vol_data, benchmark_data, spy_prices, bars, entry_time)
+            if cache is not None:
+                if self.cache_writes:
+                    cache.put(key, entry)
+                else:
+                    self._unsaved = (key, entry)
 
+        allowed = entry["trades"]
         total = len(allowed)
-        logging.info(f"Filtered trades: {total} / {len(all_trades)} allowed")
-
-        benchmark = raw.get("benchmark")
-        if not cfg_dict.get("use_benchmark", True):
-            benchmark = None
-        elif benchmark_data is not None:
-            benchmark = benchmark_data
+        self._filter_stats = entry["filter_stats"]
         self._result = BacktestResult(
-            equity=raw["equity"],
-            trades=[],
-            stats=raw["stats"],
-            config=raw["config"],
-            benchmark=benchmark,
+            equity=entry["equity"],
+            trades=TradeLog(),
+            stats=entry["stats"],
+            config=entry["config"],
+            benchmark=entry["benchmark"],
+            filter_stats=self._filter_stats,
         )
 
+        # Trade dicts are only materialised for UI callbacks; headless runs (sweep workers) skip this loop
         buffer = []
-        for idx, trade in enumerate(allowed, start=1):
+        streamed = allowed if (self.trade_callback or self.progress_callback) else ()
+        for idx, trade in enumerate(streamed, start=1):
             buffer.append(trade)
 
             if len(buffer) >= chunk_size:
@@ -133,6 +244,12 @@ class BacktestEngine:
         self._result._trades = allowed
         logging.info("BacktestEngine run complete.")
 
+    def save_to_cache(self) -> None:
+        """Store the last run's result if it was simulated with cache_writes=False."""
+        if self._unsaved is not None:
+            default_result_cache().put(*self._unsaved)
+            self._unsaved = None
+
     def result(self) -> BacktestResult:
         if self._result is None:
             raise RuntimeError("BacktestEngine.run() must be called before result()")
@@ -1,20 +1,30 @@
 from __future__ import annotations
 import math
+import heapq
 import logging
 import datetime as _dt
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 from typing import Optional
 from numba import njit
+from scipy.special import ndtr
 
 from core.models.position import Position, Leg
 from core.storage.data_loader import get_prices
-from core.models.metrics import summary as perf_summary
+from core.models.fast_metrics import fast_summary
+from core.models.trade_log import TradeLog
+from core.storage.chain_archive import default_chain_archive
+from core.storage.fingerprint import data_fingerprint
 
 logger = logging.getLogger(__name__)
 
 # Constants
+# Part of every backtest result-cache key: bump when a change to the simulation alters results
+ENGINE_VERSION = "3"
 DAYS_PER_YEAR = 365.25
+_NS_PER_DAY = 86_400_000_000_000
+_EPOCH = _dt.date(1970, 1, 1)
 TRADING_DAYS_PER_YEAR = 252
 
 def realized_vol(prices: pd.Series, window: int = 21) -> pd.Series:
@@ -34,6 +44,18 @@ def _black_scholes(S: float, K: float, T: float, r: float, sigma: float, option_
     else: price = 0.0
     return max(0.0, price)
 
+def black_scholes_vec(S, K, T, r, sigma, is_put):
+    """Array version of _black_scholes (same small-T / small-sigma intrinsic rule); inputs broadcast."""
+    disc = K * np.exp(-r * T)
+    intrinsic = np.where(is_put, np.maximum(0.0, disc - S), np.maximum(0.0, S - disc))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sq = sigma * np.sqrt(T)
+        d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / sq
+        d2 = d1 - sq
+        price = np.where(is_put, disc * ndtr(-d2) - S * ndtr(-d1), S * ndtr(d1) - disc * ndtr(d2))
+    small = (sigma < 1e-8) | (T < 1e-8)
+    return np.maximum(0.0, np.where(small, intrinsic, price))
+
 def select_short_put_strike(S: float, short_pct: float) -> float:
     return round(S * (1 - short_pct), 2)
 
@@ -48,14 +70,25 @@ class Backtester:
     DEFAULT_SLIPPAGE_PER_CONTRACT = 0.01
     DEFAULT_VOL_PREMIUM = 1.15
 
+    # Entry legs/credit per date of a preloaded feed, keyed by (price+vol content, rf, dte, strategy params).
+    # Reused by every run on that feed – sweep combos sharing a DTE and overlapping walk-forward folds.
+    _ENTRY_CACHE: "OrderedDict[tuple, tuple[np.ndarray, list]]" = OrderedDict()
+    ENTRY_CACHE_SIZE = 32
+
     @classmethod
     def run(
         cls, 
         cfg: dict, 
         price_data: Optional[pd.Series] = None,
         vol_data: Optional[pd.Series] = None,
-        spy_prices: Optional[pd.Series] = None
+        spy_prices: Optional[pd.Series] = None,
+        entry_filter=None,
+        chain=None
     ) -> dict:
+        """
+        chain – ChainTable of archived quotes (core.storage.chain_archive) for the
+                quote pricing modes; loaded from the default archive when omitted
+        """
         logger.info(f"Starting backtest with config: {cfg}")
         sym = cfg["underlying"].upper()
         start = pd.to_datetime(cfg["start"])
@@ -73,6 +106,7 @@ class Backtester:
         if strat_type == "custom_manual":
             strat_params["custom_legs"] = cfg["custom_legs"]
         
+        entry_cache = None
         if price_data is None or vol_data is None:
             prices = cls._load_prices(sym, start, end)
             rolling_vol = realized_vol(prices).ffill().bfill().clip(lower=0.05)
@@ -81,15 +115,47 @@ class Backtester:
             rolling_vol = vol_data.loc[start:end].copy()
             if prices.empty or rolling_vol.empty:
                 raise ValueError("Preloaded data is empty for the specified backtest range.")
+            if vol_data.index.equals(price_data.index) and prices.index.equals(rolling_vol.index):
+                entry_cache = cls._window_entry_legs(price_data, vol_data, prices.index, rf, strat_params, dte_target)
 
+        # Entry filter applied inside the loop: rejected days never build, price or manage a position
+        entry_mask, rejections = None, {}
+        if entry_filter is not None:
+            entry_mask = entry_filter.compile(prices.index, cls._expiries(prices.index, dte_target), sym, counts=rejections)
+
+        pricing_mode = cfg.get("pricing_mode", "model")
+        if pricing_mode != "model":
+            if chain is None:
+                chain = default_chain_archive().load(sym, prices.index[0], prices.index[-1])
+            if not len(chain):
+                logger.warning("No archived option quotes for %s; pricing every leg with the model", sym)
+            entry_cache = None  # entries are re-struck on listed contracts
+        else:
+            chain = None
+
+        work = {}
         eq_series, trades = cls._simulate(
             prices, rolling_vol, capital, alloc_pct,
             pt_pct, sl_mult, dte_target,
-            commission, rf, strat_params
+            commission, rf, strat_params, entry_cache=entry_cache,
+            entry_mask=entry_mask, work=work,
+            chain=chain, natural=pricing_mode == "quotes_natural"
         )
+        if chain is not None:
+            work.update(pricing_mode=pricing_mode, quote_hits=chain.hits, quote_misses=chain.misses)
+        filter_stats = {
+            "mode": "pre" if entry_filter is not None else "none",
+            "entry_days": len(prices),
+            "entries_skipped": int(len(prices) - entry_mask.sum()) if entry_mask is not None else 0,
+            "rejections": rejections,
+            **work,
+        }
+        if entry_mask is not None:
+            logger.info("Entry filter skipped %d/%d entry days before simulation (%s)",
+                        filter_stats["entries_skipped"], len(prices), rejections)
         
-        # <<< FIX: Pass the strategy_type to perf_summary so the risk warning works correctly. >>>
-        stats = perf_summary(eq_series, trades, rf=rf, strat_type=cfg["strategy_type"]) if not eq_series.empty else {}
+        # <<< FIX: Pass the strategy_type so the risk warning works correctly. >>>
+        stats = fast_summary(eq_series, trades, rf=rf, strat_type=cfg["strategy_type"]) if not eq_series.empty else {}
         
         benchmark = pd.Series(dtype=float)
         if cfg.get("use_benchmark", True):
@@ -104,7 +170,177 @@ class Backtester:
 
         return {
             "equity": eq_series, "trades": trades,
-            "stats": stats, "config": cfg, "benchmark": benchmark
+            "stats": stats, "config": cfg, "benchmark": benchmark,
+            "filter_stats": filter_stats
+        }
+
+    @classmethod
+    def run_intraday(
+        cls,
+        cfg: dict,
+        bars,
+        entry_filter=None,
+        entry_time: Optional[str] = None,
+        spy_prices: Optional[pd.Series] = None,
+        seed: int = 0
+    ) -> dict:
+        """
+        Bar-level event loop over a BarView (core.storage.bar_store) of minute or hourly bars.
+
+        At most one entry per session, on the first bar at/after `entry_time` (default: the
+        filter's time-of-day start, else the session open) that passes `entry_filter` – the
+        time-of-day rule now sees real bar timestamps. Time to expiry is measured in bars'
+        nanoseconds to the expiry session's close, so DTE and theta decay intraday. Each
+        position's path from entry to expiry is repriced as one vectorized block and the
+        first bar hitting PT/SL (or the expiry close) closes it; capital for sizing is the
+        cash realized before the entry bar. Only one position path is held in memory at a
+        time, so years of minute bars stay memory-bounded.
+
+        Returns the same dict shape as run(); equity is sampled at each session close.
+        The fill-price noise comes from a generator seeded with `seed`, so a run is
+        reproducible (and safe to serve from the result cache).
+        """
+        sym = cfg["underlying"].upper()
+        start = pd.to_datetime(cfg["start"])
+        end = pd.to_datetime(cfg["end"])
+        capital = float(cfg["capital"])
+        alloc_pct = float(cfg["allocation_pct"]) / 100.0
+        pt_pct = float(cfg["profit_target_pct"]) / 100.0
+        sl_mult = float(cfg["stop_loss_mult"])
+        dte_target = int(cfg["dte_target"])
+        per_contract = float(cfg["commission_per_contract"]) + cls.DEFAULT_SLIPPAGE_PER_CONTRACT
+        rf = float(cfg.get("risk_free_rate", cls.DEFAULT_RISK_FREE_RATE))
+        strat_params = cfg.get("strategy_params", {})
+        strat_params["strategy_type"] = cfg["strategy_type"]
+        if cfg["strategy_type"] == "custom_manual":
+            strat_params["custom_legs"] = cfg["custom_legs"]
+
+        rng = np.random.default_rng(seed)
+        view = bars.slice(start, end)
+        if len(view) == 0:
+            raise ValueError(f"No {bars.timeframe} bars for {sym} in the backtest range.")
+        ts, close = view.ts, view.close
+        sess = view.sessions()
+        days = sess.index
+        first_bar = sess["first"].to_numpy()
+        last_bar = sess["last"].to_numpy()
+        sess_close_ns = np.asarray(ts[last_bar], dtype=np.int64)
+        vol_daily = realized_vol(sess["close"]).ffill().bfill().clip(lower=0.05).to_numpy()
+        exp_sess = np.minimum(days.searchsorted(days + pd.Timedelta(days=dte_target), side='left'), len(days) - 1)
+
+        # Entry bar per session
+        if entry_time is None and entry_filter is not None and getattr(entry_filter, "tod_from", None):
+            entry_time = entry_filter.tod_from.strftime("%H:%M")
+        if entry_time:
+            tod_ns = pd.Timedelta(f"{entry_time}:00" if entry_time.count(":") == 1 else entry_time).value
+            entry_bar = np.searchsorted(ts, days.asi8 + tod_ns, side="left")
+        else:
+            entry_bar = first_bar.copy()
+        has_bar = entry_bar <= last_bar
+        entry_bar = np.minimum(entry_bar, last_bar)
+        entry_ns = np.asarray(ts[entry_bar], dtype=np.int64)
+
+        entry_mask, rejections = has_bar, {}
+        if entry_filter is not None:
+            entry_mask = has_bar & entry_filter.compile(pd.to_datetime(entry_ns), days[exp_sess], sym, counts=rejections)
+
+        trades = TradeLog()
+        pending: list[tuple[int, float]] = []       # (close ns, net pnl) of positions not yet realized
+        closed_ns, closed_pnl = [], []
+        cap = capital
+        reasons = ("Expired", f"Profit Target ({pt_pct*100:.0f}%)", f"Stop Loss ({sl_mult:.1f}x)")
+        bar_evals = 0
+
+        for d in np.flatnonzero(entry_mask):
+            i0, t0 = int(entry_bar[d]), int(entry_ns[d])
+            while pending and pending[0][0] <= t0:
+                cap += heapq.heappop(pending)[1]
+            e = int(exp_sess[d])
+            exp_ns = int(sess_close_ns[e])
+            path = slice(i0 + 1, int(last_bar[e]) + 1)
+            if exp_ns <= t0 or path.start >= path.stop:
+                continue
+
+            S0 = float(close[i0])
+            sigma0 = vol_daily[d] * cls.DEFAULT_VOL_PREMIUM
+            legs, credit = cls._build_legs(S0, sigma0, rf, strat_params, (exp_ns - t0) / _NS_PER_DAY)
+            if credit <= 0:
+                continue
+            size = cls._size_position(cap, alloc_pct, legs)
+            if size <= 0:
+                continue
+
+            # Whole path from entry to expiry close, repriced in one block (per 1 contract)
+            S = np.asarray(close[path], dtype=float)[:, None]
+            bts = np.asarray(ts[path], dtype=np.int64)
+            sidx = np.searchsorted(first_bar, np.arange(path.start, path.stop), side="right") - 1
+            sigma = (vol_daily[sidx] * cls.DEFAULT_VOL_PREMIUM)[:, None]
+            T = (np.maximum(0, exp_ns - bts) / (DAYS_PER_YEAR * _NS_PER_DAY))[:, None]
+            K = np.array([l.strike for l in legs], dtype=float)[None, :]
+            is_put = np.array([l.option_type == 'P' for l in legs])[None, :]
+            direction = np.array([l.direction for l in legs], dtype=float)[None, :]
+            entry_value = float((direction[0] * np.array([l.entry_price for l in legs])).sum()) * 100
+            credit_unit = abs(entry_value)
+
+            px = black_scholes_vec(S, K, T, rf, sigma * (1 + 0.4 * ((K - S) / S)), is_put)
+            px *= 1 + rng.uniform(-0.0005, 0.0005, size=px.shape)
+            pnl = (direction * px).sum(axis=1) * 100 - entry_value
+            bar_evals += len(bts)
+
+            expired = bts >= exp_ns
+            k_exp = int(np.argmax(expired)) if expired.any() else len(bts) - 1
+            hit = ~expired & (credit_unit > 1e-6) & ((pnl >= pt_pct * credit_unit) | (pnl <= -sl_mult * credit_unit))
+            k_hit = int(np.argmax(hit)) if hit.any() else len(bts)
+            if k_hit < k_exp:
+                k = k_hit
+                reason = 1 if pnl[k] >= pt_pct * credit_unit else 2
+                unit_pnl = pt_pct * credit_unit if reason == 1 else -sl_mult * credit_unit
+            else:
+                k, reason, unit_pnl = k_exp, 0, float(pnl[k_exp])
+
+            net = unit_pnl * size - per_contract * size * len(legs)
+            heapq.heappush(pending, (int(bts[k]), net))
+            closed_ns.append(int(bts[k]))
+            closed_pnl.append(net)
+            # Primary strikes as in Position.dict_summary
+            shorts = [l for l in legs if l.direction == -1]
+            longs = [l for l in legs if l.direction == 1]
+            k_short = (min if any(l.option_type == 'P' for l in shorts) else max)((l.strike for l in shorts), default=None)
+            k_long = (max if any(l.option_type == 'P' for l in longs) else min)((l.strike for l in longs), default=None)
+            trades.append({
+                "open": pd.Timestamp(t0), "close": pd.Timestamp(int(bts[k])), "expiry": days[e],
+                "K_short": k_short, "K_long": k_long,
+                "contracts": size, "credit": credit_unit * size, "pnl": net, "close_reason": reasons[reason],
+            })
+
+        # Realized equity at every session close
+        order = np.argsort(closed_ns, kind="stable")
+        cum = np.concatenate([[0.0], np.cumsum(np.asarray(closed_pnl, dtype=float)[order])])
+        n_closed = np.searchsorted(np.asarray(closed_ns, dtype=np.int64)[order], sess_close_ns, side="right")
+        eq_series = pd.Series(capital + cum[n_closed], index=days, name="Equity")
+
+        filter_stats = {
+            "mode": "pre" if entry_filter is not None else "none",
+            "entry_days": len(days),
+            "entries_skipped": int(len(days) - entry_mask.sum()),
+            "rejections": rejections,
+            "positions_opened": len(trades),
+            "position_updates": bar_evals,
+        }
+        stats = fast_summary(eq_series, trades, rf=rf, strat_type=cfg["strategy_type"])
+
+        benchmark = pd.Series(dtype=float)
+        if cfg.get("use_benchmark", True) and spy_prices is not None and not spy_prices.empty:
+            bench_prices = spy_prices.loc[start:end]
+            if not bench_prices.empty:
+                benchmark = eq_series.iloc[0] * (bench_prices / bench_prices.iloc[0])
+
+        logger.info("Intraday backtest %s on %d %s bars: %d trades, %d bar repricings",
+                    sym, len(view), view.timeframe, len(trades), bar_evals)
+        return {
+            "equity": eq_series, "trades": trades,
+            "stats": stats, "config": cfg, "benchmark": benchmark,
+            "filter_stats": filter_stats
         }
 
     @staticmethod
@@ -120,19 +356,54 @@ class Backtester:
             logger.error(f"Price load failed for {sym}: {e}")
             raise
 
+    @classmethod
+    def _window_entry_legs(cls, price_data: pd.Series, vol_data: pd.Series, window: pd.DatetimeIndex,
+                           rf: float, strat_params: dict, dte: int) -> tuple[np.ndarray, list] | None:
+        """Slice of the cached per-date (credit, leg specs) for the full feed, aligned with `window`."""
+        idx = price_data.index
+        if len(window) == 0 or not idx.is_monotonic_increasing:
+            return None
+        a = idx.searchsorted(window[0])
+        b = a + len(window)
+        if b > len(idx) or idx[b - 1] != window[-1]:
+            return None
+
+        # Content key: a reused object id or another vol series must never hit the wrong legs
+        key = (data_fingerprint(price_data, vol_data), float(rf), int(dte), repr(sorted(strat_params.items())))
+        cached = cls._ENTRY_CACHE.get(key)
+        if cached is None:
+            S_all = price_data.to_numpy(dtype=float)
+            sig_all = vol_data.to_numpy(dtype=float) * cls.DEFAULT_VOL_PREMIUM
+            credits = np.empty(len(S_all))
+            specs = []
+            for i in range(len(S_all)):
+                legs, credit = cls._build_legs(S_all[i], sig_all[i], rf, strat_params, dte)
+                credits[i] = credit
+                specs.append(tuple((l.strike, l.option_type, l.direction, l.qty, l.entry_price) for l in legs))
+            cached = (credits, specs)
+            cls._ENTRY_CACHE[key] = cached
+            if len(cls._ENTRY_CACHE) > cls.ENTRY_CACHE_SIZE:
+                cls._ENTRY_CACHE.popitem(last=False)
+        else:
+            cls._ENTRY_CACHE.move_to_end(key)
+        return cached[0][a:b], cached[1][a:b]
+
     @classmethod
     def _simulate(
         cls, prices: pd.Series, vols: pd.Series,
         init_cap, alloc_pct, pt_pct, sl_mult, dte_target,
-        commission, rf, strat_params
-    ) -> tuple[pd.Series, list[dict]]:
+        commission, rf, strat_params, entry_cache=None, entry_mask=None, work=None,
+        chain=None, natural=False
+    ) -> tuple[pd.Series, TradeLog]:
         
         dates = prices.index
         prices_np = prices.to_numpy()
         vols_np = vols.to_numpy()
         equity = [init_cap]
-        trades = []
+        trades = TradeLog()
         positions: list[Position] = []
+        positions_opened = 0
+        position_updates = 0
         
         for i in range(len(dates)):
             today = dates[i]
@@ -142,8 +413,10 @@ class Backtester:
 
             if positions:
                 to_close = []
-                for pos in positions:
-                    pos.update_and_maybe_close(S, today.date(), rf, sigma)
+                position_updates += len(positions)
+                marks = cls._quote_marks(chain, positions, today, natural) if chain is not None else None
+                for j, pos in enumerate(positions):
+                    pos.update_and_maybe_close(S, today.date(), rf, sigma, marks[j] if marks else None)
                     if pos.closed:
                         num_contracts = sum(l.qty for l in pos.legs)
                         commission_cost = commission * num_contracts
@@ -157,9 +430,18 @@ class Backtester:
                     positions = [p for p in positions if not p.closed]
 
             equity.append(cap)
+
+            if entry_mask is not None and not entry_mask[i]:
+                continue
             
             expiry = cls._find_expiry(dates, today, dte_target)
-            legs, credit = cls._build_legs(S, sigma, rf, strat_params, dte_target)
+            if entry_cache is not None:
+                credit = entry_cache[0][i]
+                legs = [Leg(strike=k, option_type=t, direction=d, qty=q, entry_price=p) for k, t, d, q, p in entry_cache[1][i]]
+            else:
+                legs, credit = cls._build_legs(S, sigma, rf, strat_params, dte_target)
+            if chain is not None:
+                legs, credit, expiry = cls._quote_entry(chain, legs, credit, today, expiry, natural)
             
             if credit <= 0: continue
 
@@ -172,11 +454,73 @@ class Backtester:
                     entry_S=S, entry_sigma=sigma, entry_r=rf
                 )
                 positions.append(pos)
+                positions_opened += 1
+
+        if work is not None:
+            work["positions_opened"] = positions_opened
+            work["position_updates"] = position_updates
 
         eq_idx = [dates[0] - pd.Timedelta(days=1)] + list(dates) if dates.size > 0 else []
         eq_vals= [init_cap] + equity[1:]
         return pd.Series(eq_vals, index=eq_idx, name="Equity").reindex(prices.index, method='ffill'), trades
 
+    @staticmethod
+    def _quote_entry(chain, legs: list[Leg], credit: float, today: pd.Timestamp, expiry: _dt.date,
+                     natural: bool) -> tuple[list[Leg], float, _dt.date]:
+        """
+        Re-strike model legs on the nearest listed expiry/strikes of the as-of chain and fill them at
+        mid (or ask for longs / bid for shorts). Legs without a quote keep their model price; if any
+        leg has no listed strike on the chosen expiry the whole position stays on the model.
+        """
+        day = today.value // _NS_PER_DAY
+        if not legs:
+            return legs, credit, expiry
+        # One expiry per position: the one snapped for the first leg; every leg is struck on it
+        first = chain.snap_leg(day, (expiry - _EPOCH).days, legs[0].strike, legs[0].option_type == 'P')
+        if first is None:
+            return legs, credit, expiry
+        exp_day = first[0]
+        strikes = []
+        for l in legs:
+            ks = chain.strikes(day, exp_day, l.option_type == 'P')
+            if not len(ks):
+                return legs, credit, expiry
+            strikes.append(float(ks[np.argmin(np.abs(ks - l.strike))]))
+        is_put = np.array([l.option_type == 'P' for l in legs])
+        bid, ask = chain.quotes(np.full(len(legs), day), np.full(len(legs), exp_day), is_put, strikes)
+        credit = 0.0
+        for j, l in enumerate(legs):
+            l.strike = strikes[j]
+            if np.isfinite(bid[j]):
+                l.entry_price = (bid[j] if l.direction == -1 else ask[j]) if natural else 0.5 * (bid[j] + ask[j])
+            credit -= l.direction * l.entry_price
+        return legs, credit, _EPOCH + _dt.timedelta(days=int(exp_day))
+
+    @staticmethod
+    def _quote_marks(chain, positions: list[Position], today: pd.Timestamp, natural: bool) -> list[np.ndarray]:
+        """Per-position arrays of quoted closing prices for every open leg (NaN = no quote), one lookup for all."""
+        legs = [l for p in positions for l in p.legs]
+        n = len(legs)
+        exp_days = np.fromiter(((p.expiry_date - _EPOCH).days for p in positions for _ in p.legs), np.int64, n)
+        is_put = np.fromiter((l.option_type == 'P' for l in legs), bool, n)
+        strikes = np.fromiter((l.strike for l in legs), float, n)
+        bid, ask = chain.quotes(np.full(n, today.value // _NS_PER_DAY), exp_days, is_put, strikes)
+        if natural:
+            # Closing a short pays the ask, closing a long receives the bid
+            short = np.fromiter((l.direction == -1 for l in legs), bool, n)
+            px = np.where(short, ask, bid)
+        else:
+            px = 0.5 * (bid + ask)
+        return np.split(px, np.cumsum([len(p.legs) for p in positions])[:-1])
+
+    @staticmethod
+    def _expiries(dates: pd.DatetimeIndex, dte: int) -> pd.DatetimeIndex:
+        """Vectorized _find_expiry for every date in the index."""
+        if len(dates) == 0:
+            return dates
+        pos = dates.searchsorted(dates + pd.Timedelta(days=dte), side='left')
+        return dates[np.minimum(pos, len(dates) - 1)]
+
     @staticmethod
     def _find_expiry(dates: pd.DatetimeIndex, today: pd.Timestamp, dte: int) -> _dt.date:
         approx = today + pd.Timedelta(days=dte)
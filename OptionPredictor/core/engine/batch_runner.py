@@ -1,7 +1,8 @@
+import inspect
 import itertools
 import logging
 import multiprocessing as mp
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import pandas as pd
 import numpy as np
 import os
@@ -11,11 +12,16 @@ import gc
 import math
 import time
 import pickle
+import json
 from typing import Iterable, Tuple, Dict, Any
 
 from core.engine.backtestengine import BacktestEngine
 from app.config import StrategyConfig
-from core.models.metrics import summary as perf_summary
+from core.models.fast_metrics import fast_summary
+from core.engine.tpe_search import TPESearch
+from core.engine.result_sink import ResultSink
+from core.storage.fingerprint import data_fingerprint
+from core.storage.sweep_journal import SweepJournal, combo_key, sweep_key
 
 logger = logging.getLogger(__name__)
 
@@ -27,15 +33,24 @@ _worker_vol = None
 _worker_benchmark = None
 _worker_spy = None
 _worker_base_cfg = None
+_worker_objective = "total_return_pct"
+_worker_use_cache = True
+_worker_data_key = None
+_worker_templates = {}
 
 
-def _worker_initializer(price_path, vol_path, bench_path, spy_path, base_cfg_bytes):
+def _worker_initializer(price_path, vol_path, bench_path, spy_path, base_cfg_bytes, objective="total_return_pct",
+                        use_cache=True):
     """
     Runs once per process at pool-start. Loads memory-mapped arrays (numpy.memmap)
     and unpickles the base config to _worker_base_cfg. Keeps one copy per process.
     This avoids sending big pandas objects via pickling per-task.
     """
-    global _worker_price, _worker_vol, _worker_benchmark, _worker_spy, _worker_base_cfg
+    global _worker_price, _worker_vol, _worker_benchmark, _worker_spy, _worker_base_cfg, _worker_objective
+    global _worker_use_cache, _worker_data_key
+
+    _worker_objective = objective
+    _worker_use_cache = use_cache
 
     # Load numpy memmaps if provided
     try:
@@ -65,29 +80,44 @@ def _worker_initializer(price_path, vol_path, bench_path, spy_path, base_cfg_byt
         logger.exception("Failed to unpickle base config in worker: %s", e)
         _worker_base_cfg = None
 
+    # Fingerprint the feed once; every task's result-cache key reuses it
+    if _worker_use_cache and _worker_price is not None and _worker_vol is not None:
+        try:
+            _worker_data_key = data_fingerprint(_worker_price, _worker_vol, _worker_benchmark, _worker_spy)
+        except Exception:
+            _worker_data_key = None
+
     # reduce memory pressure immediately after loading
     gc.collect()
 
 
-def _run_single_core_light(overrides: dict) -> Tuple[dict, dict, float]:
+def _run_single_core_light(overrides: dict, keep_threshold: float | None = None) -> Tuple[dict, dict, float, Any]:
     """
     Worker function that expects global data to be loaded in worker initializer.
     Only receives 'overrides' (lightweight) to avoid pickling big data each time.
-    Returns (overrides, stats, return_pct)
+    Returns (overrides, stats, return_pct, payload). payload is (trades, equity) when the
+    run's objective beats keep_threshold (i.e. it may enter the main process' top-K), else None.
     """
     global _worker_price, _worker_vol, _worker_benchmark, _worker_spy, _worker_base_cfg
     try:
-        # Convert base cfg into a worker-local config with overrides
-        # NOTE: with_overrides must be cheap (should not re-load big data)
-        cfg = _worker_base_cfg.with_overrides(**overrides)
+        # Convert base cfg into a worker-local config with overrides via a per-key-set compiled template:
+        # the base config was validated once, each combo only copies it and checks the swept fields
+        keys = tuple(overrides)
+        template = _worker_templates.get(keys)
+        if template is None:
+            template = _worker_templates[keys] = _worker_base_cfg.override_template(keys)
+        cfg = template.apply(overrides)
 
         # Build engine and run. Pass in the worker-local data; BacktestEngine must accept numpy or None.
-        engine = BacktestEngine(cfg)
+        # Workers only read the shared result cache; writing every combination would churn its
+        # disk budget and evict interactive runs. Runs that make the top-K are stored below.
+        engine = BacktestEngine(cfg, use_cache=_worker_use_cache, cache_writes=False)
         engine.run(
             price_data=_worker_price if _worker_price is not None else None,
             vol_data=_worker_vol if _worker_vol is not None else None,
             benchmark_data=_worker_benchmark if _worker_benchmark is not None else None,
-            spy_prices=_worker_spy if _worker_spy is not None else None
+            spy_prices=_worker_spy if _worker_spy is not None else None,
+            data_key=_worker_data_key
         )
         res = engine.result()
         rf_rate = cfg.risk_free_rate
@@ -95,21 +125,28 @@ def _run_single_core_light(overrides: dict) -> Tuple[dict, dict, float]:
 
         equity = res.equity_curve()
         trades = res.trade_list()
-        stats = perf_summary(equity, trades, rf=rf_rate, strat_type=strat_type) if trades else {}
+        # Single-pass kernel: same numbers as metrics.summary without building DataFrames per task
+        stats = fast_summary(equity, trades, rf=rf_rate, strat_type=strat_type) if trades else {}
         return_pct = stats.get("total_return_pct", float("-inf"))
 
-        # Prefer explicit deletion of heavy refs before returning
-        del engine, res, equity, trades
-        gc.collect()
-        return (overrides, stats, return_pct)
+        payload = None
+        objective = stats.get(_worker_objective, return_pct)
+        if keep_threshold is not None and pd.notna(objective) and objective > keep_threshold:
+            payload = (trades, equity)
+            engine.save_to_cache()
+
+        # Prefer explicit deletion of heavy refs before returning (no per-task gc.collect: it
+        # cost more than the backtest itself; the parent still collects once per chunk)
+        del engine, res
+        return (overrides, stats, return_pct, payload)
 
     except MemoryError:
         logger.error("MemoryError in worker for overrides %s", overrides)
         gc.collect()
-        return (overrides, {}, float("-inf"))
+        return (overrides, {}, float("-inf"), None)
     except Exception as e:
         logger.exception("Worker failed for overrides %s: %s", overrides, e)
-        return (overrides, {}, float("-inf"))
+        return (overrides, {}, float("-inf"), None)
 
 
 
@@ -145,21 +182,131 @@ def _iter_chunks(iterable: Iterable, chunk_size: int):
         yield chunk
 
 
+def _accepts_governor(callback) -> bool:
+    """True if the progress callback takes a 4th (governor state) argument."""
+    try:
+        inspect.signature(callback).bind(0, 0, {}, {})
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+class MemoryGovernor:
+    """
+    Sizes a sweep's in-flight task window from live memory readings.
+
+    At most every `interval` seconds it samples system available memory and the
+    RSS of each pool worker. When RAM in use passes `high_water`, or available
+    memory would no longer cover the reserve plus one worker's peak RSS, the
+    window is halved; below `low_water` with room for two more worker peaks it
+    grows by one task. Fewer tasks in flight means fewer workers at their peak
+    at once, so a large grid backs off before the machine starts swapping.
+    """
+    def __init__(self, max_window: int, min_window: int = 1, high_water: float = 0.85, low_water: float = 0.70,
+                 reserve_bytes: int = 512 * 1024 * 1024, interval: float = 0.5):
+        self.max_window = max(1, int(max_window))
+        self.min_window = max(1, min(int(min_window), self.max_window))
+        self.high_water = high_water
+        self.low_water = low_water
+        self.reserve_bytes = reserve_bytes
+        self.interval = interval
+        self.window = self.max_window
+        self.shrinks = 0
+        self.grows = 0
+        self.state: dict = {"window": self.window, "max_window": self.max_window, "action": "start"}
+        self._procs: dict[int, psutil.Process] = {}
+        self._last = 0.0
+
+    def sample(self) -> bool:
+        """Take a reading (rate-limited) and resize the window. Returns True if the window changed."""
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            return False
+        self._last = now
+
+        vm = psutil.virtual_memory()
+        rss = self._worker_rss()
+        peak = max(rss, default=0)
+        used = 1.0 - vm.available / vm.total if vm.total else 0.0
+        old, action = self.window, "hold"
+        if used >= self.high_water or vm.available < self.reserve_bytes + peak:
+            self.window = max(self.min_window, self.window // 2)
+            action = "shrink"
+            if vm.available < self.reserve_bytes:
+                gc.collect()
+        elif used <= self.low_water and vm.available > self.reserve_bytes + 2 * peak:
+            self.window = min(self.max_window, self.window + 1)
+            action = "grow"
+
+        changed = self.window != old
+        if changed:
+            if action == "shrink":
+                self.shrinks += 1
+            else:
+                self.grows += 1
+            logger.info("Memory governor: %s window %d -> %d (RAM used %.0f%%, available %.0f MB, worker peak RSS %.0f MB)",
+                        action, old, self.window, used * 100, vm.available / 2 ** 20, peak / 2 ** 20)
+        self.state = {
+            "window": self.window, "max_window": self.max_window, "action": action if changed else "hold",
+            "memory_used_pct": round(used * 100, 1), "available_mb": round(vm.available / 2 ** 20),
+            "workers_rss_mb": round(sum(rss) / 2 ** 20), "peak_worker_rss_mb": round(peak / 2 ** 20),
+            "shrinks": self.shrinks, "grows": self.grows,
+        }
+        return changed
+
+    def chunk_size(self, base: int) -> int:
+        """Chunk length scaled down with the window (at least one window's worth)."""
+        return max(self.window, base * self.window // self.max_window)
+
+    def _worker_rss(self) -> list[int]:
+        # Pool workers are this process's children (public API, unlike the executor's _processes)
+        try:
+            children = psutil.Process().children()
+        except psutil.Error:
+            return []
+        self._procs = {c.pid: self._procs.get(c.pid, c) for c in children}
+        out = []
+        for proc in self._procs.values():
+            try:
+                out.append(proc.memory_info().rss)
+            except psutil.Error:
+                pass
+        return out
+
+
 class BatchRunner:
     """
     Faster and more robust BatchRunner:
       - converts large inputs to temp files and loads them once per worker (initializer)
-      - uses a persistent ProcessPoolExecutor with executor.map (lower overhead)
+      - uses a persistent ProcessPoolExecutor fed through submit/wait, keeping at most one
+        governor window of tasks in flight
       - streams combinations via chunks to avoid materializing the whole grid
       - adaptive but conservative worker selection to avoid OOM
+      - optional TPE model-based search (search="tpe") as an alternative to the full grid
+      - journals finished rows to disk so an interrupted sweep resumes where it stopped
+      - streams rows to a Parquet sink and keeps only the top-K runs (with their trades
+        and equity from the worker) in memory
+      - workers consult the on-disk backtest result cache (configs already run interactively
+        are not simulated again) but only write back the runs that enter the top-K
+      - a MemoryGovernor resizes the in-flight task window from worker RSS and available
+        memory; progress callbacks taking a 4th argument receive its state
     """
     def __init__(self, base_cfg: StrategyConfig, sweep_params: dict,
                  price_data=None, vol_data=None, benchmark_data=None, spy_prices=None,
-                 progress_callback=None, trade_callback=None):
+                 progress_callback=None, trade_callback=None,
+                 search: str = "grid", max_evals: int | None = None, time_budget_sec: float | None = None,
+                 warm_start: pd.DataFrame | None = None, objective: str = "total_return_pct", seed: int | None = None,
+                 journal: bool = True, top_k: int = 10, results_path: str | None = None,
+                 use_cache: bool = True,
+                 windows: list[dict] | None = None):
         if not isinstance(base_cfg, StrategyConfig):
             raise ValueError("base_cfg must be StrategyConfig")
         if not isinstance(sweep_params, dict) or not all(isinstance(k, str) and isinstance(v, list) for k, v in sweep_params.items()):
             raise ValueError("sweep_params must be dict[str, list]")
+        if search not in ("grid", "tpe"):
+            raise ValueError("search must be 'grid' or 'tpe'")
+        if windows and search != "grid":
+            raise ValueError("windows are only supported for grid search")
 
         self.base_cfg = base_cfg
         self.sweep_params = sweep_params
@@ -170,11 +317,39 @@ class BatchRunner:
         self.progress_callback = progress_callback
         self.trade_callback = trade_callback
 
-        self._results = pd.DataFrame()
+        # Model-based search options (ignored for the full grid)
+        self.search = search
+        self.max_evals = max_evals
+        self.time_budget_sec = time_budget_sec
+        self.warm_start = warm_start
+        self.objective = objective
+        self.seed = seed
+        self._search = None
+
+        # Optional list of fixed overrides (e.g. walk-forward {"start", "end"} windows) crossed with the grid,
+        # so every window's sweep shares one pool and one copy of the price feed
+        self.windows = list(windows) if windows else None
+
+        # On-disk sweep journal (crash-safe resume)
+        self.journal = journal
+        self._journal = None
+        self._journaled = {}
+        self.resumed_count = 0
+
+        # Content-addressed backtest result cache, shared with BacktestEngine and across workers
+        self.use_cache = use_cache
+
+        self._results = None
+        self._sink = None
+        self.top_k = top_k
+        self.results_path = results_path
         self._best_run_trades = []
+        self._best_run_equity = None
         self._cancel_event = mp.Event()
         self._pause = mp.Event()
         self._pause.set()
+        self._governor: MemoryGovernor | None = None
+        self._callback_takes_governor = bool(progress_callback) and _accepts_governor(progress_callback)
 
     def cancel(self):
         self._cancel_event.set()
@@ -200,19 +375,196 @@ class BatchRunner:
         n_workers = min(cpu_avail, max_workers_by_mem)
         return max(1, n_workers)
 
+    def _record(self, overrides: dict, stats: dict, return_pct: float, payload=None):
+        """Store one finished combination and report progress. Runs in the calling (UI worker) thread."""
+        row = {**overrides, **stats}
+        objective = stats.get(self.objective, return_pct) if stats else return_pct
+        trades, equity = payload if payload is not None else (None, None)
+        self._sink.add(row, objective, overrides, trades, equity)
+        if self._journal is not None:
+            try:
+                self._journal.append(overrides, row)
+            except Exception:
+                logger.exception("Sweep journal write failed; continuing without it")
+                self._journal = None
+
+        if pd.notna(objective) and objective > self._best_return:
+            self._best_return = objective
+            self._best_overrides = overrides
+
+        self._completed += 1
+        self._notify(overrides)
+        return objective
+
+    def _notify(self, overrides: dict):
+        if not self.progress_callback:
+            return
+        try:
+            if self._callback_takes_governor:
+                governor = self._governor.state if self._governor is not None else {}
+                self.progress_callback(self._completed, self._total, overrides, governor)
+            else:
+                self.progress_callback(self._completed, self._total, overrides)
+        except Exception:
+            pass
+
+    def _govern(self) -> int:
+        """Sample memory, report window changes through the progress callback, return the current window."""
+        if self._governor.sample() and self._callback_takes_governor:
+            self._notify({})
+        return self._governor.window
+
+    def governor_state(self) -> dict:
+        return dict(self._governor.state) if self._governor is not None else {}
+
+    def _run_grid(self, exe, keys, lists, chunksize):
+        # Stream combos lazily and keep at most the governor's window of tasks submitted,
+        # so neither the task queue nor concurrent worker peaks grow with the grid
+        windows = self.windows or [{}]
+        combos = ({**w, **dict(zip(keys, c))} for w, c in itertools.product(windows, itertools.product(*lists)))
+        if self._journaled:
+            combos = (o for o in combos if combo_key(o) not in self._journaled)
+
+        in_flight = {}
+        since_gc = 0
+        exhausted = False
+        while True:
+            if self._cancel_event.is_set():
+                for f in in_flight:
+                    f.cancel()
+                break
+            window = self._govern()
+            # Workers attach trades/equity only for runs that can still make the top-K
+            while not exhausted and len(in_flight) < window:
+                overrides = next(combos, None)
+                if overrides is None:
+                    exhausted = True
+                    break
+                in_flight[exe.submit(_run_single_core_light, overrides, self._sink.threshold())] = overrides
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+            self._pause.wait()
+            for f in done:
+                overrides = in_flight.pop(f)
+                try:
+                    result = f.result()
+                except Exception as e:
+                    logger.exception("Grid task failed for overrides %s: %s", overrides, e)
+                    result = (overrides, {}, float("-inf"), None)
+                self._record(*result)
+                since_gc += 1
+
+            # light cleanup every chunk (chunks shrink with the window under memory pressure)
+            if since_gc >= self._governor.chunk_size(chunksize):
+                gc.collect()
+                since_gc = 0
+
+    def _run_tpe(self, exe, n_workers):
+        """
+        Model-based search: keep n_workers tasks in flight (fewer while the memory governor
+        has shrunk the window), refit the TPE model as each one returns and immediately
+        propose a replacement. Stops on eval/time budget or when the grid has no unseen point
+        left; returns True if it ended that way (not cancelled).
+        """
+        search = TPESearch(self.sweep_params, max_evals=self.max_evals,
+                           time_budget_sec=self.time_budget_sec, seed=self.seed)
+        if self.warm_start is not None:
+            search.warm_start(self.warm_start, objective=self.objective)
+        for key, row in self._journaled.items():
+            overrides = json.loads(key)
+            search.replay(overrides, row.get(self.objective, float("-inf")))
+        self._search = search
+        search.start()
+
+        in_flight = {}
+
+        def top_up():
+            free = min(n_workers, self._govern()) - len(in_flight)
+            if free <= 0 or self._cancel_event.is_set():
+                return
+            for overrides in search.ask(free):
+                in_flight[exe.submit(_run_single_core_light, overrides, self._sink.threshold())] = overrides
+
+        top_up()
+        while in_flight:
+            done, _ = wait(in_flight, timeout=1.0, return_when=FIRST_COMPLETED)
+            if self._cancel_event.is_set():
+                for f in in_flight:
+                    f.cancel()
+                break
+            self._pause.wait()
+            for f in done:
+                overrides = in_flight.pop(f)
+                try:
+                    result = f.result()
+                except Exception as e:
+                    logger.exception("TPE task failed for overrides %s: %s", overrides, e)
+                    result = (overrides, {}, float("-inf"), None)
+                objective = self._record(*result)
+                search.tell(overrides, objective)
+            top_up()
+
+        if self._cancel_event.is_set():
+            return False
+        logger.info("TPE search finished: %d evaluations in %.1fs", self._completed, search.elapsed())
+        return True
+
+    def _open_journal(self, total: int):
+        """Attach the on-disk journal for this sweep and preload any rows from an earlier, interrupted run."""
+        self._journal, self._journaled, self.resumed_count = None, {}, 0
+        if not self.journal:
+            return
+        try:
+            search_opts = {"search": self.search}
+            if self.windows:
+                search_opts["windows"] = self.windows
+            if self.search == "tpe":
+                search_opts.update(max_evals=self.max_evals, objective=self.objective)
+            fingerprint = data_fingerprint(self.price_data, self.vol_data, self.benchmark_data, self.spy_prices)
+            key = sweep_key(self.base_cfg, self.sweep_params, fingerprint, search_opts)
+            self._journal = SweepJournal(key)
+            self._journal.open(self.base_cfg, self.sweep_params, total,
+                               {**search_opts, "time_budget_sec": self.time_budget_sec})
+            self._journaled = self._journal.completed()
+        except Exception:
+            logger.exception("Could not open sweep journal; running without checkpointing")
+            self._journal, self._journaled = None, {}
+            return
+
+        for key, row in self._journaled.items():
+            overrides = json.loads(key)
+            objective = row.get(self.objective, float("-inf"))
+            self._sink.add(row, objective, overrides)
+            if pd.notna(objective) and objective > self._best_return:
+                self._best_return = objective
+                self._best_overrides = overrides
+        self._completed = self.resumed_count = len(self._journaled)
+        if self.resumed_count:
+            logger.info("Resuming sweep %s: %d/%d combinations already journaled", self._journal.key, self.resumed_count, total)
+            self._notify({})
+
+    def search_history(self) -> pd.DataFrame:
+        """Every observation the TPE model saw (including warm-start rows), in order."""
+        return self._search.history() if self._search is not None else pd.DataFrame()
+
     def run(self):
         # Create combination generator (do NOT materialize entire list for large grids)
         keys = list(self.sweep_params.keys())
         lists = [self.sweep_params[k] for k in keys]
-        combos_iter = (dict(zip(keys, combo)) for combo in itertools.product(*lists))
         total = 1
         for l in lists:
             total *= len(l)
+        if self.windows:
+            total *= len(self.windows)
         if total == 0:
             logger.info("No combinations to run.")
             return
 
-        if total > 200000:
+        if self.search == "tpe":
+            total = min(total, self.max_evals) if self.max_evals else total
+        elif total > 200000:
             logger.warning("Very large grid: %d combos", total)
 
         # Estimate memory footprint of data (rough)
@@ -245,62 +597,35 @@ class BatchRunner:
 
         # Determine safe worker count
         n_workers = self._estimate_worker_count(data_mem)
-        logger.info("BatchRunner2 starting with %d workers; estimated data size %.2f MB; total combos %d",
-                    n_workers, data_mem / 1024 / 1024.0, total)
+        logger.info("BatchRunner2 starting with %d workers (%s search); estimated data size %.2f MB; total combos %d",
+                    n_workers, self.search, data_mem / 1024 / 1024.0, total)
 
         # chunk size heuristics: larger chunks reduce IPC but increase per-chunk memory spikes
         chunksize = max(4, min(512, math.ceil(total / (n_workers * 4))))
-
-
-        rows = []
-        completed = 0
-        best_return = float("-inf")
-        best_overrides = None
+        # Grid keeps two tasks per worker queued at full window; TPE proposes one per worker
+        self._governor = MemoryGovernor(max_window=n_workers if self.search == "tpe" else n_workers * 2)
+
+        if self._sink is not None:
+            self._sink.cleanup()
+        self._sink = ResultSink(self.results_path, top_k=self.top_k, objective=self.objective)
+        self._results = None
+        self._completed = 0
+        self._total = total
+        self._best_return = float("-inf")
+        self._best_overrides = None
+        self._open_journal(total)
 
         # We'll use a persistent pool with initializer that loads the data once per process.
         with ProcessPoolExecutor(max_workers=n_workers,
                                  initializer=_worker_initializer,
-                                 initargs=(price_path, vol_path, bench_path, spy_path, base_cfg_bytes)) as exe:
-            # executor.map is slightly faster than submit/await per-task overhead for many small tasks
-            # We'll stream combos in chunks to avoid huge task queue memory
-            # Build a generator of overrides; we'll map _run_single_core_light over it
-            def combo_chunks():
-                it = itertools.product(*lists)
-                # yield chunk lists of overrides
-                while True:
-                    chunk = list(itertools.islice(it, chunksize))
-                    if not chunk:
-                        break
-                    yield [dict(zip(keys, c)) for c in chunk]
-
-            # Use map over flattened generator to ensure tasks are submitted in small batches.
+                                 initargs=(price_path, vol_path, bench_path, spy_path, base_cfg_bytes, self.objective,
+                                           self.use_cache)) as exe:
+            search_done = False   # TPE ended on its own budget/time/grid; the grid on its count
             try:
-                for chunk in combo_chunks():
-                    if self._cancel_event.is_set():
-                        break
-                    # For each chunk, map the worker function with executor.map (returns iterator)
-                    futures_iter = exe.map(_run_single_core_light, chunk, chunksize=1)
-                    for result in futures_iter:
-                        if self._cancel_event.is_set():
-                            break
-                        self._pause.wait()
-                        overrides, stats, return_pct = result
-                        row = {**overrides, **stats}
-                        rows.append(row)
-
-                        if pd.notna(return_pct) and return_pct > best_return:
-                            best_return = return_pct
-                            best_overrides = overrides
-
-                        completed += 1
-                        if self.progress_callback:
-                            try:
-                                self.progress_callback(completed, total, overrides)
-                            except Exception:
-                                pass
-
-                    # light cleanup each chunk
-                    gc.collect()
+                if self.search == "tpe":
+                    search_done = self._run_tpe(exe, n_workers)
+                else:
+                    self._run_grid(exe, keys, lists, chunksize)
             except Exception as e:
                 logger.exception("Batch run failed: %s", e)
             finally:
@@ -312,15 +637,30 @@ class BatchRunner:
                     except Exception:
                         pass
 
-        # Final results DataFrame
-        self._results = pd.DataFrame(rows)
-
-        # Capture full best run (equity + trades) immediately, no recomputation in UI
-        self._best_run_equity = None
-        if best_overrides is not None:
+        if self._journal is not None:
+            try:
+                # Only a cancel or a crash leaves the sweep resumable
+                if (search_done or self._completed >= total) and not self._cancel_event.is_set():
+                    self._journal.mark_finished()
+                self._journal.close()
+            except Exception:
+                logger.exception("Failed to finalize sweep journal")
+            self._journal = None
+
+        self._sink.close()
+        best_overrides = self._best_overrides
+
+        # Best run's trades/equity come from the worker via the top-K heap; only re-run in the
+        # main process when it is missing (e.g. the best row was restored from the journal).
+        self._best_run_trades, self._best_run_equity = [], None
+        top = self._sink.top()
+        if top and top[0]["trades"] is not None:
+            self._best_run_trades = top[0]["trades"]
+            self._best_run_equity = top[0]["equity"]
+        elif best_overrides is not None:
             try:
                 cfg = self.base_cfg.with_overrides(**best_overrides)
-                engine = BacktestEngine(cfg)
+                engine = BacktestEngine(cfg, use_cache=self.use_cache)
                 engine.run(price_data=self.price_data,
                            vol_data=self.vol_data,
                            benchmark_data=self.benchmark_data,
@@ -332,7 +672,6 @@ class BatchRunner:
                 logger.exception("Failed to capture best configuration results in main process")
                 self._best_run_trades, self._best_run_equity = [], None
 
-
         if self.trade_callback and self._best_run_trades:
             try:
                 self.trade_callback(self._best_run_trades)
@@ -340,8 +679,19 @@ class BatchRunner:
                 logger.exception("trade_callback failed")
 
     def results_df(self) -> pd.DataFrame:
+        """All result rows, read back from the sink on first access."""
+        if self._results is None:
+            self._results = self._sink.to_frame() if self._sink is not None else pd.DataFrame()
         return self._results
 
+    def top_runs(self) -> list[dict]:
+        """Top-K runs, best first, each with 'overrides', 'stats', 'trades' and 'equity'."""
+        return self._sink.top() if self._sink is not None else []
+
+    def top_run(self, overrides: dict) -> dict | None:
+        """Retained top-K run for the given overrides (trades/equity may be None if not sent by the worker)."""
+        return self._sink.lookup(overrides) if self._sink is not None else None
+
     def all_trades(self) -> list:
         return self._best_run_trades
 
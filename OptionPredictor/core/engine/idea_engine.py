@@ -8,6 +8,7 @@ from concurrent.futures import ThreadPoolExecutor
 from core.storage.idea_cache import IdeaCache
 from core.models.idea_models import Idea
 from core.engine.market_data_service import MarketDataService
+from core.storage.market_data import market_data as shared_market_data
 
 # --- Detector base ---
 class DetectorBase:
@@ -619,10 +620,21 @@ class IdeaEngine:
             print(f"Error fetching global macro metrics: {e}")
             macro_metrics = {}
 
+        # Batch-download the daily bars the per-symbol providers will ask for (1y, see YahooPriceProvider)
+        cached_ideas = self.cache.read_many(universe_list)
+        cached_metrics = self.market_data._read_many(universe_list)
+        uncached = [sym for sym in universe_list
+                    if sym.upper() not in cached_ideas and sym.upper() not in cached_metrics]
+        if len(uncached) > 1:
+            try:
+                shared_market_data().history_many(uncached, period="1y")
+            except Exception as e:
+                print(f"Warning: batch price prefetch failed: {e}")
+
         for sym in universe_list: # Iterate over the list
             try:
                 # 1. Check Cache First
-                if cached := self.cache.read(sym):
+                if cached := cached_ideas.get(sym.upper()):
                     ideas.extend(cached)
                     processed_symbols += 1
                     if self.progress_sink:
@@ -4,9 +4,12 @@ import time
 import threading
 import sqlite3
 import json
+import datetime as dt
 from pathlib import Path
 from typing import Dict, Any, Iterable, List
 from core.models.providers import ProviderHub
+from core.models import trading_calendar
+from core.storage.sqlite_pool import database
 
 import numpy as np
 import pandas as pd
@@ -27,9 +30,8 @@ class MarketDataService:
 
     def __init__(self, ttl_sec: int = 900) -> None:
         self.ttl_sec = ttl_sec
-        self._lock = threading.Lock()
-        self._conn = sqlite3.connect(self.DB_FILE, check_same_thread=False)
-        self._create_table()
+        # Per-thread WAL connections; the table is created once, when the first one opens
+        self._db = database(self.DB_FILE, self._create_table)
         # NEW: Proactively fetch global data on init for Macro
         # This call will trigger ProviderHub.get_macro_data() and cache the result.
         # It is essential this is robust to avoid startup errors.
@@ -109,7 +111,9 @@ class MarketDataService:
         return payload
 
     def bulk_prefetch(self, symbols: Iterable[str]) -> List[Dict[str, Any]]:
-        out: List[Dict[str, Any]] = []
+        symbols = list(symbols)
+        cached = self._read_many(symbols)  # one query for everything already cached
+        out: List[Dict[str, Any]] = [cached[s.upper()] for s in symbols if s.upper() in cached]
         threads: List[threading.Thread] = []
 
         def _job(sym: str) -> None:
@@ -121,6 +125,8 @@ class MarketDataService:
                 out.append({"symbol": sym, "error": str(e)}) # Add an error entry
 
         for sym in symbols:
+            if sym.upper() in cached:
+                continue
             t = threading.Thread(target=_job, args=(sym,), daemon=True)
             t.start()
             threads.append(t)
@@ -129,39 +135,63 @@ class MarketDataService:
         return out
 
     def invalidate(self, symbol: str | None = None) -> None:
-        with self._lock, self._conn:
+        with self._db.transaction() as conn:
             if symbol:
-                self._conn.execute("DELETE FROM idea_cache WHERE symbol = ?", (symbol.upper(),))
+                conn.execute("DELETE FROM idea_cache WHERE symbol = ?", (symbol.upper(),))
             else:
-                self._conn.execute("DELETE FROM idea_cache")
+                conn.execute("DELETE FROM idea_cache")
 
     def close(self) -> None:
-        self._conn.close()
+        self._db.close()
 
     # ────────── internal ──────────
-    def _create_table(self) -> None:
-        with self._lock, self._conn:
-            self._conn.execute(
-                "CREATE TABLE IF NOT EXISTS idea_cache (symbol TEXT PRIMARY KEY, ts INTEGER, payload TEXT)"
-            )
+    @staticmethod
+    def _create_table(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS idea_cache (symbol TEXT PRIMARY KEY, ts INTEGER, payload TEXT)"
+        )
 
     def _read(self, symbol: str) -> Dict[str, Any] | None:
-        with self._lock, self._conn:
-            row = self._conn.execute(
-                "SELECT ts, payload FROM idea_cache WHERE symbol = ?", (symbol.upper(),)
-            ).fetchone()
-        if not row:
-            return None
-        ts, payload = row
-        if time.time() - ts > self.ttl_sec:
-            print(f"MarketDataService: Cache for {symbol} is stale. Invalidating.")
-            self.invalidate(symbol) # Invalidate stale cache
-            return None
-        return json.loads(payload)
+        return self._read_many([symbol]).get(symbol.upper())
+
+    def _read_many(self, symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fresh cached payloads for several symbols in one query (upper-cased keys; misses absent)."""
+        rows = self._db.query_in(
+            "SELECT symbol, ts, payload FROM idea_cache WHERE symbol IN ({in})",
+            list(dict.fromkeys(s.upper() for s in symbols)),
+        )
+        out, stale = {}, []
+        for symbol, ts, payload in rows:
+            if self._is_stale(ts):
+                stale.append(symbol)
+            else:
+                out[symbol] = json.loads(payload)
+        if stale:
+            print(f"MarketDataService: Cache for {', '.join(stale)} is stale. Invalidating.")
+            with self._db.transaction() as conn:
+                conn.executemany("DELETE FROM idea_cache WHERE symbol = ?", [(sym,) for sym in stale])
+        return out
+
+    def _is_stale(self, ts: float, now: float | None = None) -> bool:
+        """
+        Past the TTL *and* the market moved since ts: a session traded in between, or a
+        new daily bar was published. Entries written after Friday's close stay warm all weekend.
+        """
+        now = time.time() if now is None else now
+        if now - ts <= self.ttl_sec:
+            return False
+        if trading_calendar.market_open_between(ts, now):
+            return True
+        to_dt = lambda t: dt.datetime.fromtimestamp(t, trading_calendar.EXCHANGE_TZ)
+        return trading_calendar.expected_last_session(to_dt(ts)) != trading_calendar.expected_last_session(to_dt(now))
 
     def _write(self, symbol: str, payload: Dict[str, Any]) -> None:
-        with self._lock, self._conn:
-            self._conn.execute(
+        self._write_many({symbol: payload})
+
+    def _write_many(self, payloads: Dict[str, Dict[str, Any]]) -> None:
+        now = int(time.time())
+        with self._db.transaction() as conn:
+            conn.executemany(
                 "INSERT OR REPLACE INTO idea_cache(symbol, ts, payload) VALUES (?, ?, ?)",
-                (symbol.upper(), int(time.time()), json.dumps(payload)),
-            )
\ No newline at end of file
+                [(sym.upper(), now, json.dumps(payload)) for sym, payload in payloads.items()],
+            )
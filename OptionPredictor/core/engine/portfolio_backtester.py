@@ -0,0 +1,393 @@
+"""portfolio_backtester.py
+────────────────────────────────────────────────────────────────────────────
+Multi-underlying backtest with one shared capital pool.
+
+Every symbol trades the same StrategyConfig rules as the single-symbol
+Backtester (same strike selection, Black-Scholes entry pricing with spread,
+PT/SL/expiry exits, commission and slippage), but:
+
+  • prices and realized vols of all symbols sit in two symbol × day matrices
+    held in one shared-memory block (SymbolMatrix) that other processes can
+    attach to without copying;
+  • open positions are kept as flat arrays (one row per position, one column
+    per leg) and repriced for all symbols in a single vectorized step per day;
+  • new positions are sized from the shared capital and clipped by optional
+    per-symbol and aggregate risk limits (percent of current capital, risk =
+    short put strike × 100 × contracts, as in Backtester._size_position).
+
+The result is a combined equity curve plus per-symbol P&L attribution and
+trade logs.
+"""
+
+from __future__ import annotations
+import logging
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from app.config import StrategyConfig
+from core.engine.backtester import Backtester, realized_vol, black_scholes_vec, DAYS_PER_YEAR
+from core.models.fast_metrics import fast_summary
+from core.models.filters import FilterConfig
+from core.models.trade_log import TradeLog
+from core.storage.data_loader import get_prices_many
+
+logger = logging.getLogger(__name__)
+
+_NS_PER_DAY = 86_400_000_000_000
+
+
+# ────────── shared symbol × day matrices ──────────
+class SymbolMatrix:
+    """
+    Aligned price / vol / listed matrices (symbols × days) in one SharedMemory block.
+    `handle()` is a small picklable dict; `SymbolMatrix.attach(handle)` maps the same
+    memory in another process.
+    """
+    def __init__(self, symbols: list[str], dates: pd.DatetimeIndex, shm: shared_memory.SharedMemory, owner: bool):
+        self.symbols = list(symbols)
+        self.dates = pd.DatetimeIndex(dates)
+        self._shm = shm
+        self._owner = owner
+        n, m = len(self.symbols), len(self.dates)
+        self.prices = np.ndarray((n, m), dtype=np.float64, buffer=shm.buf, offset=0)
+        self.vols = np.ndarray((n, m), dtype=np.float64, buffer=shm.buf, offset=n * m * 8)
+        self.listed = np.ndarray((n, m), dtype=np.bool_, buffer=shm.buf, offset=2 * n * m * 8)
+
+    @classmethod
+    def build(cls, price_data, vol_data=None, start=None, end=None) -> "SymbolMatrix":
+        """
+        price_data – DataFrame (one column per symbol) or dict symbol → Series.
+        Dates are the union calendar; a symbol is 'listed' on days it has its own bar.
+        Vol defaults to each symbol's realized_vol over the full feed (as Backtester does).
+        """
+        frame = pd.DataFrame(price_data).sort_index()
+        frame.index = pd.DatetimeIndex(frame.index)
+        if vol_data is None:
+            vols = realized_vol(frame.ffill())
+        else:
+            vols = pd.DataFrame(vol_data).reindex(index=frame.index, columns=frame.columns)
+        vols = vols.ffill().bfill().clip(lower=0.05)
+
+        if start is not None or end is not None:
+            frame = frame.loc[start:end]
+            vols = vols.loc[start:end]
+        if frame.empty:
+            raise ValueError("No price data in the portfolio backtest range.")
+
+        n, m = frame.shape[1], frame.shape[0]
+        shm = shared_memory.SharedMemory(create=True, size=max(1, 2 * n * m * 8 + n * m))
+        mat = cls([str(c).upper() for c in frame.columns], frame.index, shm, owner=True)
+        mat.listed[:] = frame.notna().to_numpy().T
+        mat.prices[:] = frame.ffill().to_numpy(dtype=float).T
+        mat.vols[:] = vols.to_numpy(dtype=float).T
+        return mat
+
+    def handle(self) -> dict:
+        return {"name": self._shm.name, "symbols": self.symbols, "dates": self.dates.asi8}
+
+    @classmethod
+    def attach(cls, handle: dict) -> "SymbolMatrix":
+        shm = shared_memory.SharedMemory(name=handle["name"])
+        return cls(handle["symbols"], pd.DatetimeIndex(handle["dates"]), shm, owner=False)
+
+    def close(self):
+        # Drop the views before releasing the buffer
+        self.prices = self.vols = self.listed = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class _PositionBook:
+    """Open positions as parallel arrays; legs are columns (absent legs have direction 0)."""
+    FIELDS = ("sym", "open_day", "expiry_day", "qty", "entry_value", "credit", "risk", "k_short", "k_long")
+
+    def __init__(self, n_legs: int):
+        self.n_legs = n_legs
+        self.sym = np.empty(0, dtype=np.int64)
+        self.open_day = np.empty(0, dtype=np.int64)
+        self.expiry_day = np.empty(0, dtype=np.int64)
+        self.qty = np.empty(0, dtype=np.int64)
+        self.entry_value = np.empty(0)
+        self.credit = np.empty(0)
+        self.risk = np.empty(0)
+        self.k_short = np.empty(0)
+        self.k_long = np.empty(0)
+        self.K = np.empty((0, n_legs))
+        self.is_put = np.empty((0, n_legs), dtype=np.bool_)
+        self.direction = np.empty((0, n_legs))
+
+    def __len__(self) -> int:
+        return len(self.sym)
+
+    def add(self, **cols):
+        for name in self.FIELDS + ("K", "is_put", "direction"):
+            setattr(self, name, np.concatenate([getattr(self, name), cols[name]]))
+
+    def keep(self, mask: np.ndarray):
+        for name in self.FIELDS + ("K", "is_put", "direction"):
+            setattr(self, name, getattr(self, name)[mask])
+
+
+# ────────── backtester ──────────
+class PortfolioBacktester:
+    def __init__(self, base_cfg: StrategyConfig, symbols: Optional[list[str]] = None,
+                 price_data=None, vol_data=None, symbol_risk_pct: Optional[float] = None,
+                 total_risk_pct: Optional[float] = None, seed: Optional[int] = None,
+                 matrix: Optional[SymbolMatrix] = None):
+        """
+        base_cfg        – strategy rules, capital and date range (its `underlying` is ignored)
+        symbols         – symbols to load when price_data is not given
+        symbol_risk_pct – max open risk per symbol, % of current capital (None = unlimited)
+        total_risk_pct  – max open risk across all symbols, % of current capital (None = unlimited)
+        matrix          – an existing SymbolMatrix to run on (e.g. attached from another process)
+        """
+        if not isinstance(base_cfg, StrategyConfig):
+            raise ValueError("base_cfg must be StrategyConfig")
+        if matrix is None and price_data is None and not symbols:
+            raise ValueError("Portfolio backtest needs symbols or price_data")
+
+        self.cfg = base_cfg
+        self.symbols = [s.strip().upper() for s in symbols] if symbols else None
+        self.price_data = price_data
+        self.vol_data = vol_data
+        self.symbol_risk_pct = symbol_risk_pct
+        self.total_risk_pct = total_risk_pct
+        self._rng = np.random.default_rng(seed)
+        self.matrix = matrix
+        self._owns_matrix = matrix is None
+
+        self._equity = pd.Series(dtype=float, name="Equity")
+        self._symbol_pnl = pd.DataFrame()
+        self._trades: dict[str, TradeLog] = {}
+        self._stats: dict = {}
+
+    # ────────── data ──────────
+    def _load_matrix(self) -> SymbolMatrix:
+        start, end = pd.to_datetime(self.cfg.start), pd.to_datetime(self.cfg.end)
+        prices = self.price_data
+        if prices is None:
+            # One batched load for the whole universe instead of a download per symbol
+            prices = get_prices_many(self.symbols, start.date(), end.date())
+            for sym in self.symbols:
+                if sym not in prices.columns:
+                    logger.warning("Portfolio: skipping %s (no price data)", sym)
+        elif self.symbols:
+            prices = pd.DataFrame(prices)[self.symbols]
+        return SymbolMatrix.build(prices, self.vol_data, start, end)
+
+    # ────────── run ──────────
+    def run(self) -> "PortfolioBacktester":
+        if self.matrix is None:
+            self.matrix = self._load_matrix()
+        try:
+            self._run(self.matrix)
+        finally:
+            if self._owns_matrix:
+                self.matrix.close()
+                self.matrix = None
+        return self
+
+    def _legs_template(self) -> list[dict]:
+        params = self.cfg.strategy_params or {}
+        if self.cfg.strategy_type == "custom_manual":
+            return list(self.cfg.custom_legs)
+        legs = [{"type": "P", "dir": -1}]
+        if self.cfg.strategy_type == "put_spread":
+            legs.append({"type": "P", "dir": +1})
+        short_pct = params.get("short_put_pct_otm", 0.07)
+        width = params.get("spread_width_pct", 0.05)
+        for ld in legs:
+            ld["short_pct"], ld["width"] = short_pct, width
+        return legs
+
+    def _entry_legs(self, S: np.ndarray, sigma: np.ndarray, T: float, r: float, legs: list[dict]):
+        """Strikes, entry prices and credit for new positions on S (one row per candidate symbol)."""
+        n, L = len(S), len(legs)
+        half_spread = Backtester.DEFAULT_SPREAD_PCT / 2.0
+        K = np.empty((n, L))
+        is_put = np.empty((n, L), dtype=np.bool_)
+        direction = np.empty((n, L))
+        entry = np.empty((n, L))
+        for j, ld in enumerate(legs):
+            if "strike" in ld:                          # custom_manual: absolute strikes
+                K[:, j] = float(ld["strike"])
+            elif j == 0:                                # select_short_put_strike
+                K[:, j] = np.round(S * (1 - ld["short_pct"]), 2)
+            else:                                       # select_put_spread_strikes
+                K[:, j] = np.minimum(np.round(K[:, 0] - S * ld["width"], 2), K[:, 0] - 0.01)
+            is_put[:, j] = ld["type"] == "P"
+            direction[:, j] = ld["dir"]
+            prem = black_scholes_vec(S, K[:, j], T, r, sigma, is_put[:, j])
+            entry[:, j] = prem * ((1.0 - half_spread) if ld["dir"] == -1 else (1.0 + half_spread))
+        credit = -(direction * entry).sum(axis=1)
+        return K, is_put, direction, entry, credit
+
+    @staticmethod
+    def _primary_strikes(K, is_put, direction):
+        """Position.dict_summary's K_short / K_long for each row."""
+        def pick(sel, lo_for_puts):
+            any_put = (sel & is_put).any(axis=1)
+            masked_lo = np.where(sel, K, np.inf).min(axis=1)
+            masked_hi = np.where(sel, K, -np.inf).max(axis=1)
+            out = np.where(any_put == lo_for_puts, masked_lo, masked_hi)
+            return np.where(sel.any(axis=1), out, np.nan)
+        return pick(direction == -1, True), pick(direction == 1, False)
+
+    def _run(self, mat: SymbolMatrix):
+        cfg = self.cfg
+        dates = mat.dates
+        n_sym, n_days = mat.prices.shape
+        day_num = dates.asi8 // _NS_PER_DAY
+        rf = float(cfg.risk_free_rate)
+        alloc = cfg.allocation_pct / 100.0
+        pt, sl = cfg.profit_target_pct / 100.0, cfg.stop_loss_mult
+        per_contract = cfg.commission_per_contract + Backtester.DEFAULT_SLIPPAGE_PER_CONTRACT
+        T_entry = max(1e-6, cfg.dte_target / DAYS_PER_YEAR)
+        legs = self._legs_template()
+        n_legs = len(legs)
+
+        # Expiry day per entry day (Backtester._find_expiry on the shared calendar)
+        expiry_day = np.minimum(dates.searchsorted(dates + pd.Timedelta(days=cfg.dte_target), side="left"), n_days - 1)
+
+        # Entry filters: one compiled mask per symbol
+        fcfg = cfg.filters
+        if isinstance(fcfg, dict):
+            fcfg = FilterConfig(**fcfg)
+        can_enter = mat.listed.copy()
+        if fcfg is not None:
+            expiries = dates[expiry_day]
+            for s, sym in enumerate(mat.symbols):
+                can_enter[s] &= fcfg.compile(dates, expiries, sym)
+
+        reasons = ("Expired", f"Profit Target ({pt*100:.0f}%)", f"Stop Loss ({sl:.1f}x)")
+        trades = {sym: TradeLog() for sym in mat.symbols}
+        realized = np.zeros((n_sym, n_days))
+        equity = np.empty(n_days)
+        cap = float(cfg.capital)
+        book = _PositionBook(len(legs))
+        reprices = 0
+
+        for t in range(n_days):
+            # 1) Reprice every open position across all symbols in one step
+            if len(book):
+                reprices += len(book)
+                S = mat.prices[book.sym, t][:, None]
+                sigma = (mat.vols[book.sym, t] * Backtester.DEFAULT_VOL_PREMIUM)[:, None]
+                T = (np.maximum(0, day_num[book.expiry_day] - day_num[t]) / 365.25)[:, None]
+                skew_vol = sigma * (1 + 0.4 * ((book.K - S) / S))
+                px = black_scholes_vec(S, book.K, T, rf, skew_vol, book.is_put)
+                px *= 1 + self._rng.uniform(-0.0005, 0.0005, size=px.shape)
+                value = (book.direction * px).sum(axis=1) * 100 * book.qty
+                pnl = value - book.entry_value
+
+                expired = t >= book.expiry_day
+                meaningful = book.credit > 1e-6
+                hit_pt = ~expired & meaningful & (pnl >= pt * book.credit)
+                hit_sl = ~expired & meaningful & ~hit_pt & (pnl <= -sl * book.credit)
+                pnl = np.where(hit_pt, pt * book.credit, np.where(hit_sl, -sl * book.credit, pnl))
+                closing = expired | hit_pt | hit_sl
+
+                if closing.any():
+                    idx = np.flatnonzero(closing)
+                    net = pnl[idx] - per_contract * book.qty[idx] * n_legs
+                    reason = np.where(expired[idx], 0, np.where(hit_pt[idx], 1, 2))
+                    np.add.at(realized[:, t], book.sym[idx], net)
+                    cap += float(net.sum())
+                    for j, p in enumerate(idx):
+                        trades[mat.symbols[book.sym[p]]].append({
+                            "open": dates[book.open_day[p]], "close": dates[t],
+                            "expiry": dates[book.expiry_day[p]],
+                            "K_short": book.k_short[p], "K_long": book.k_long[p],
+                            "contracts": book.qty[p], "credit": book.credit[p],
+                            "pnl": net[j], "close_reason": reasons[reason[j]],
+                        })
+                    book.keep(~closing)
+
+            equity[t] = cap
+
+            # 2) New entries for every symbol allowed today, sized from the shared pool
+            cand = np.flatnonzero(can_enter[:, t])
+            if cand.size == 0 or cap <= 0:
+                continue
+            S = mat.prices[cand, t]
+            sigma = mat.vols[cand, t] * Backtester.DEFAULT_VOL_PREMIUM
+            K, is_put, direction, entry, credit = self._entry_legs(S, sigma, T_entry, rf, legs)
+            ok = credit > 0
+            short_put_k = np.where((direction == -1) & is_put, K, -np.inf).max(axis=1)
+            risk_unit = np.where(np.isfinite(short_put_k), short_put_k * 100, 1000.0)
+            ok &= risk_unit > 0
+            risk_unit = np.where(ok, risk_unit, 1.0)
+            size = np.where(ok, np.maximum(1, np.floor(cap * alloc / risk_unit)), 0)
+
+            if self.symbol_risk_pct is not None:
+                open_risk = np.bincount(book.sym, weights=book.risk, minlength=n_sym)[cand] if len(book) else 0.0
+                room = np.maximum(0.0, cap * self.symbol_risk_pct / 100.0 - open_risk)
+                size = np.minimum(size, np.floor(room / risk_unit))
+            if self.total_risk_pct is not None:
+                room = max(0.0, cap * self.total_risk_pct / 100.0 - float(book.risk.sum()))
+                fits = np.cumsum(size * risk_unit) <= room   # first come, first served in symbol order
+                size = np.where(fits, size, 0)
+
+            take = size >= 1
+            if not take.any():
+                continue
+            qty = size[take].astype(np.int64)
+            k_short, k_long = self._primary_strikes(K[take], is_put[take], direction[take])
+            entry_value = (direction[take] * entry[take]).sum(axis=1) * 100 * qty
+            book.add(
+                sym=cand[take], open_day=np.full(len(qty), t), expiry_day=np.full(len(qty), expiry_day[t]),
+                qty=qty, entry_value=entry_value, credit=np.abs(entry_value), risk=risk_unit[take] * qty,
+                k_short=k_short, k_long=k_long, K=K[take], is_put=is_put[take], direction=direction[take],
+            )
+
+        self._equity = pd.Series(equity, index=dates, name="Equity")
+        self._symbol_pnl = pd.DataFrame(np.cumsum(realized, axis=1).T, index=dates, columns=mat.symbols)
+        self._trades = trades
+        all_pnl = np.concatenate([log.column("pnl") for log in trades.values()]) if trades else np.empty(0)
+        self._stats = fast_summary(self._equity, all_pnl, rf=rf, strat_type=cfg.strategy_type)
+        self._stats["position_updates"] = reprices
+        logger.info("Portfolio backtest: %d symbols × %d days, %d trades, %d position-day repricings",
+                    n_sym, n_days, len(all_pnl), reprices)
+
+    # ────────── results ──────────
+    def equity_curve(self) -> pd.Series:
+        return self._equity
+
+    def summary(self) -> dict:
+        return self._stats
+
+    def symbol_pnl(self) -> pd.DataFrame:
+        """Cumulative realized P&L per symbol (columns) by day."""
+        return self._symbol_pnl
+
+    def trades(self, symbol: str) -> TradeLog:
+        return self._trades.get(symbol.upper(), TradeLog())
+
+    def trades_frame(self) -> pd.DataFrame:
+        frames = [log.to_frame().assign(symbol=sym) for sym, log in self._trades.items() if len(log)]
+        return pd.concat(frames, ignore_index=True).sort_values("close", kind="stable") if frames else pd.DataFrame()
+
+    def attribution(self) -> pd.DataFrame:
+        """Per-symbol trades, P&L, win rate and share of total P&L."""
+        rows = []
+        for sym, log in self._trades.items():
+            pnl = log.column("pnl")
+            rows.append({
+                "symbol": sym,
+                "trades": len(pnl),
+                "pnl": float(pnl.sum()),
+                "win_rate": float((pnl > 0).mean() * 100) if len(pnl) else 0.0,
+            })
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return df
+        total = df["pnl"].sum()
+        df["contribution_pct"] = df["pnl"] / total * 100 if total else 0.0
+        return df.sort_values("pnl", ascending=False).reset_index(drop=True)
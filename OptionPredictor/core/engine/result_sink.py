@@ -0,0 +1,195 @@
+"""result_sink.py
+────────────────────────────────────────────────────────────────────────────
+Streaming result sink for BatchRunner sweeps.
+
+Rows are buffered and written to a Parquet file in fixed-size chunks, so the
+main process never holds more than one chunk of results. Alongside the file a
+bounded min-heap keeps the top-K configurations by objective together with the
+full trade log and equity curve the worker produced for them – the best run no
+longer has to be recomputed in the main process.
+
+The file schema grows with the data: a Parquet writer's schema is fixed, so a
+chunk that brings new columns (e.g. the metrics of the first successful run
+after a streak of failed ones) rewrites the row groups written so far under the
+widened schema, filling the new columns with nulls. That normally happens once,
+early, while the file is still small.
+
+pyarrow is optional: without it the sink falls back to keeping rows in memory.
+"""
+
+from __future__ import annotations
+import os
+import heapq
+import logging
+import itertools
+import tempfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+
+class ResultSink:
+    def __init__(self, path: Optional[str] = None, top_k: int = 10,
+                 objective: str = "total_return_pct", chunk_rows: int = 5000):
+        self.top_k = max(1, top_k)
+        self.objective = objective
+        self.chunk_rows = max(1, chunk_rows)
+        self.n_rows = 0
+
+        self._buffer: list[dict] = []
+        self._memory_rows: list[dict] | None = None
+        self._writer = None
+        self._schema = None
+        self._owns_path = path is None
+        self._heap: list[tuple] = []        # (objective, seq, overrides, stats, trades, equity)
+        self._seq = itertools.count()
+
+        if pa is None:
+            logger.warning("pyarrow not installed; sweep results will be kept in memory")
+            self.path = None
+            self._memory_rows = []
+        elif path is None:
+            fd, self.path = tempfile.mkstemp(suffix=".parquet", prefix="sweep_")
+            os.close(fd)
+        else:
+            self.path = path
+
+    # ────────── writing ──────────
+    def add(self, row: dict, objective: float, overrides: dict | None = None,
+            trades: list | None = None, equity: pd.Series | None = None):
+        """Append one result row; offer it (with its worker payload, if any) to the top-K heap."""
+        self.n_rows += 1
+        if self._memory_rows is not None:
+            self._memory_rows.append(row)
+        else:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.chunk_rows:
+                self.flush()
+
+        if objective is None or not np.isfinite(objective):
+            return
+        entry = (float(objective), next(self._seq), overrides or {}, row, trades, equity)
+        if len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, entry)
+        elif objective > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def threshold(self) -> float:
+        """Objective a new result must beat to enter the top-K (-inf until the heap is full)."""
+        return self._heap[0][0] if len(self._heap) >= self.top_k else float("-inf")
+
+    def flush(self):
+        if not self._buffer:
+            return
+        # via pandas so the column set is the union over the chunk, not just the first row's keys
+        table = pa.Table.from_pandas(pd.DataFrame(self._buffer), preserve_index=False)
+        self._buffer = []
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        else:
+            wider = self._widened(table.schema)
+            if wider is not None:
+                self._rewrite(wider)
+            table = self._conform(table)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._memory_rows is not None:
+            return
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _widened(self, incoming):
+        """File schema extended by `incoming`'s new columns (and typed where it only had nulls), or None."""
+        fields, changed = [], False
+        for field in self._schema:
+            if pa.types.is_null(field.type) and field.name in incoming.names:
+                new_type = incoming.field(field.name).type
+                if not pa.types.is_null(new_type):
+                    field, changed = field.with_type(new_type), True
+            fields.append(field)
+        extra = [f for f in incoming if f.name not in self._schema.names]
+        if not extra and not changed:
+            return None
+        return pa.schema(fields + extra)
+
+    def _rewrite(self, schema):
+        """Re-open the file under a wider schema, copying the row groups written so far."""
+        self._writer.close()
+        old_path = self.path + ".old"
+        os.replace(self.path, old_path)
+        self._schema = schema
+        self._writer = pq.ParquetWriter(self.path, schema)
+        old = pq.ParquetFile(old_path)
+        try:
+            for i in range(old.num_row_groups):
+                self._writer.write_table(self._conform(old.read_row_group(i)))
+        finally:
+            old.close()
+        os.remove(old_path)
+        logger.debug("Widened sweep schema to %d columns", len(schema))
+
+    def _conform(self, table):
+        """Align a chunk to the file schema (rows from failed runs lack metric columns)."""
+        cols, lost = [], []
+        for field in self._schema:
+            if field.name in table.column_names:
+                col = table.column(field.name)
+                if col.type != field.type:
+                    try:
+                        col = col.cast(field.type)
+                    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                        col = pa.nulls(len(table), type=field.type)
+                        lost.append(field.name)
+            else:
+                col = pa.nulls(len(table), type=field.type)
+            cols.append(col)
+        lost += sorted(set(table.column_names) - set(self._schema.names))
+        if lost:
+            logger.warning("Dropping sweep result values that do not fit the file schema: %s", lost)
+        return pa.Table.from_arrays(cols, schema=self._schema)
+
+    # ────────── reading ──────────
+    def to_frame(self, columns: list[str] | None = None) -> pd.DataFrame:
+        if self._memory_rows is not None:
+            df = pd.DataFrame(self._memory_rows)
+            return df[[c for c in columns if c in df.columns]] if columns else df
+        # The Parquet footer is only written on close, so the file is read once the sweep is over
+        self.close()
+        if self._schema is None:
+            return pd.DataFrame()
+        return pd.read_parquet(self.path, columns=columns)
+
+    def top(self) -> list[dict]:
+        """Top-K entries, best first: {'overrides', 'stats', 'objective', 'trades', 'equity'}."""
+        return [
+            {"objective": obj, "overrides": ov, "stats": row, "trades": trades, "equity": eq}
+            for obj, _, ov, row, trades, eq in sorted(self._heap, key=lambda e: (-e[0], e[1]))
+        ]
+
+    def lookup(self, overrides: dict) -> Optional[dict]:
+        """Top-K entry for a specific configuration, if it is retained."""
+        for entry in self.top():
+            if all(entry["overrides"].get(k) == v for k, v in overrides.items()):
+                return entry
+        return None
+
+    def cleanup(self):
+        self.close()
+        if self._owns_path and self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,226 @@
+"""robustness.py
+────────────────────────────────────────────────────────────────────────────
+Bootstrap robustness analysis for a single strategy config.
+
+The stored price history is resampled into many synthetic paths with a
+stationary block bootstrap of its daily log returns (Politis & Romano:
+blocks start at random points, block lengths are geometric with mean
+`mean_block`, so short-range autocorrelation and vol clustering survive).
+Each path keeps the original calendar and starting price; realized vol is
+recomputed on it with `realized_vol`, exactly as the Backtester does for real
+data. The strategy is run on every path and the resulting CAGR, Sharpe and
+max drawdown are summarised as percentile bands.
+
+Paths are generated inside the worker processes from (seed, path id), so only
+the base log returns are shipped to each worker once, and each task runs a
+batch of paths. The global NumPy RNG behind the model's fill noise is seeded
+from the same pair before every path, so a given seed reproduces the bands
+whichever worker runs which path.
+"""
+
+from __future__ import annotations
+import logging
+import multiprocessing as mp
+import pickle
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.config import StrategyConfig
+from core.engine.backtestengine import BacktestEngine
+from core.engine.backtester import realized_vol
+from core.models.fast_metrics import fast_summary
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("cagr", "sharpe", "max_drawdown", "total_return_pct")
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# -------------------------
+# Worker-side globals (set once per worker by the initializer)
+# -------------------------
+_worker_cfg = None
+_worker_logret = None
+_worker_dates = None
+_worker_p0 = None
+_worker_mean_block = 21
+_worker_seed = 0
+
+
+def _worker_initializer(cfg_bytes, logret, dates_ns, p0, mean_block, seed):
+    global _worker_cfg, _worker_logret, _worker_dates, _worker_p0, _worker_mean_block, _worker_seed
+    _worker_cfg = pickle.loads(cfg_bytes)
+    _worker_logret = logret
+    _worker_dates = pd.DatetimeIndex(dates_ns)
+    _worker_p0 = p0
+    _worker_mean_block = mean_block
+    _worker_seed = seed
+
+
+def block_bootstrap_indices(n: int, n_paths: int, mean_block: float, rng: np.random.Generator) -> np.ndarray:
+    """Stationary block bootstrap: (n_paths × n) indices into a length-n return series (circular)."""
+    p_new = 1.0 / max(1.0, mean_block)
+    new_block = rng.random((n_paths, n)) < p_new
+    starts = rng.integers(0, n, size=(n_paths, n))
+    idx = np.empty((n_paths, n), dtype=np.int64)
+    idx[:, 0] = starts[:, 0]
+    for t in range(1, n):
+        idx[:, t] = np.where(new_block[:, t], starts[:, t], (idx[:, t - 1] + 1) % n)
+    return idx
+
+
+def synthetic_path(logret: np.ndarray, idx: np.ndarray, p0: float, dates: pd.DatetimeIndex) -> pd.Series:
+    """Price series on `dates` starting at p0 whose daily log returns are logret[idx]."""
+    levels = p0 * np.exp(np.concatenate([[0.0], np.cumsum(logret[idx])]))
+    return pd.Series(levels, index=dates, name="Close")
+
+
+def _run_paths(path_ids: list[int]) -> list[tuple[int, dict, np.ndarray]]:
+    """Worker task: bootstrap and backtest a batch of paths. Returns (path id, stats, equity) per path."""
+    out = []
+    n = len(_worker_logret)
+    for pid in path_ids:
+        try:
+            rng = np.random.default_rng([_worker_seed, pid])
+            idx = block_bootstrap_indices(n, 1, _worker_mean_block, rng)[0]
+            np.random.seed(int(rng.integers(2 ** 32)))  # Leg.current_price slippage draws from it
+            prices = synthetic_path(_worker_logret, idx, _worker_p0, _worker_dates)
+            vols = realized_vol(prices).ffill().bfill().clip(lower=0.05)
+
+            engine = BacktestEngine(_worker_cfg, use_cache=False)
+            engine.run(price_data=prices, vol_data=vols)
+            res = engine.result()
+            equity = res.equity_curve()
+            stats = fast_summary(equity, res.trades(), rf=_worker_cfg.risk_free_rate,
+                                 strat_type=_worker_cfg.strategy_type)
+            out.append((pid, {k: stats.get(k, np.nan) for k in METRICS + ("total_trades",)},
+                        equity.to_numpy(dtype=np.float32)))
+        except Exception as e:
+            logger.warning("Bootstrap path %d failed: %s", pid, e)
+            out.append((pid, {}, None))
+    return out
+
+
+class BootstrapRobustness:
+    def __init__(self, cfg: StrategyConfig, price_data: pd.Series, n_paths: int = 500,
+                 mean_block: float = 21.0, seed: Optional[int] = None, n_workers: Optional[int] = None,
+                 batch_size: int = 8, progress_callback: Optional[Callable[[int, int], None]] = None):
+        """
+        cfg        – strategy to test; its start/end select the history that is resampled
+        price_data – stored close history for cfg.underlying
+        mean_block – mean bootstrap block length in trading days
+        """
+        if not isinstance(cfg, StrategyConfig):
+            raise ValueError("cfg must be StrategyConfig")
+        prices = price_data.loc[cfg.start:cfg.end].dropna() if price_data is not None else None
+        if prices is not None:
+            prices = prices[prices > 0]  # log returns need positive closes; drop bad rows, not dates at the end
+        if prices is None or len(prices) < 30:
+            raise ValueError("Bootstrap needs at least 30 bars of price history")
+
+        # Synthetic paths have no real benchmark; skip loading one in every worker
+        self.cfg = cfg.with_overrides(use_benchmark=False)
+        self.prices = prices
+        self.n_paths = n_paths
+        self.mean_block = mean_block
+        self.seed = int(seed) if seed is not None else int(np.random.SeedSequence().entropy % (2 ** 32))
+        self.n_workers = n_workers or max(1, mp.cpu_count() - 1)
+        self.batch_size = max(1, batch_size)
+        self.progress_callback = progress_callback
+
+        self._cancel_event = mp.Event()
+        self._stats: dict[int, dict] = {}
+        self._equity: dict[int, np.ndarray] = {}
+        self._historical: dict = {}
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def run(self) -> "BootstrapRobustness":
+        # Prices were cleaned in __init__, so every return is finite and lines up with its date
+        logret = np.diff(np.log(self.prices.to_numpy(dtype=float)))
+        dates = self.prices.index
+        p0 = float(self.prices.iloc[0])
+
+        # Reference: the strategy on the actual history (fill noise seeded like the paths, state restored)
+        rng_state = np.random.get_state()
+        try:
+            np.random.seed(self.seed)
+            vols = realized_vol(self.prices).ffill().bfill().clip(lower=0.05)
+            engine = BacktestEngine(self.cfg)
+            engine.run(price_data=self.prices, vol_data=vols)
+            res = engine.result()
+            self._historical = fast_summary(res.equity_curve(), res.trades(), rf=self.cfg.risk_free_rate,
+                                            strat_type=self.cfg.strategy_type)
+        except Exception as e:
+            logger.warning("Historical reference run failed: %s", e)
+        finally:
+            np.random.set_state(rng_state)
+
+        batches = [list(range(i, min(i + self.batch_size, self.n_paths)))
+                   for i in range(0, self.n_paths, self.batch_size)]
+        done = 0
+        with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_worker_initializer,
+                                 initargs=(pickle.dumps(self.cfg), logret, dates.as_unit("ns").asi8, p0,
+                                           self.mean_block, self.seed)) as exe:
+            pending = {exe.submit(_run_paths, b) for b in batches[:self.n_workers * 2]}
+            queued = iter(batches[self.n_workers * 2:])
+            while pending:
+                finished, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                if self._cancel_event.is_set():
+                    for f in pending:
+                        f.cancel()
+                    break
+                for f in finished:
+                    for pid, stats, equity in f.result():
+                        if stats:
+                            self._stats[pid] = stats
+                            self._equity[pid] = equity
+                        done += 1
+                    nxt = next(queued, None)
+                    if nxt is not None:
+                        pending.add(exe.submit(_run_paths, nxt))
+                    if self.progress_callback:
+                        try:
+                            self.progress_callback(done, self.n_paths)
+                        except Exception:
+                            pass
+
+        logger.info("Bootstrap robustness: %d/%d paths completed (seed=%d, mean block=%.0f)",
+                    len(self._stats), self.n_paths, self.seed, self.mean_block)
+        return self
+
+    # ────────── results ──────────
+    def results_df(self) -> pd.DataFrame:
+        """One row per completed path."""
+        return pd.DataFrame.from_dict(self._stats, orient="index").sort_index().rename_axis("path")
+
+    def percentiles(self, q=PERCENTILES) -> pd.DataFrame:
+        """Metric × percentile table, plus mean and the historical path's value for comparison."""
+        df = self.results_df()
+        if df.empty:
+            return pd.DataFrame()
+        rows = {}
+        for m in METRICS:
+            vals = pd.to_numeric(df[m], errors="coerce").replace([np.inf, -np.inf], np.nan).dropna().to_numpy()
+            row = {f"p{p}": (float(np.percentile(vals, p)) if vals.size else np.nan) for p in q}
+            row["mean"] = float(vals.mean()) if vals.size else np.nan
+            row["historical"] = self._historical.get(m, np.nan)
+            # Share of bootstrap paths that did worse than the actual history
+            row["hist_rank_pct"] = float((vals < row["historical"]).mean() * 100) if vals.size else np.nan
+            rows[m] = row
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def equity_bands(self, q=PERCENTILES) -> pd.DataFrame:
+        """Per-day percentiles of the bootstrap equity curves (columns p5 … p95)."""
+        if not self._equity:
+            return pd.DataFrame()
+        curves = np.vstack([self._equity[k] for k in sorted(self._equity)])
+        bands = np.nanpercentile(curves, q, axis=0)
+        index = self.prices.index[:curves.shape[1]]
+        return pd.DataFrame(bands.T, index=index, columns=[f"p{p}" for p in q])
+
+    def historical_summary(self) -> dict:
+        return self._historical
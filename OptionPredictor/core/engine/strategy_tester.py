@@ -24,6 +24,7 @@ from ui.bounceoverlay import BounceOverlay
 from app.config import StrategyConfig
 from core.engine.backtestengine import BacktestEngine
 from core.engine.batch_runner import BatchRunner
+from core.storage.sweep_journal import SweepJournal
 from core.storage.data_loader import get_prices
 from core.engine.backtester import realized_vol
 
@@ -900,13 +901,67 @@ class StrategyTesterWindow:
 
 
     def _open_optimize_dialog(self):
+        if self._offer_resume_sweep():
+            return
         dlg = OptimizeDialog(self.win, controller=self)
         # You MUST ensure OptionsApp applies its theme to 'dlg' after creation
         if hasattr(self.win.master, 'apply_theme_to_window'):
              self.win.master.apply_theme_to_window(dlg)
 
-    def _start_optimization(self, param_grid: dict):
+    def _offer_resume_sweep(self) -> bool:
+        """If an earlier sweep was interrupted, offer to reopen it. Returns True if a resume was started."""
+        try:
+            unfinished = SweepJournal.list_unfinished()
+        except Exception:
+            logging.exception("Could not read the sweep journal")
+            return False
+        # Walk-forward sweeps are driven by WalkForwardRunner, not this dialog
+        unfinished = [u for u in unfinished if not u["search"].get("windows")]
+        if not unfinished:
+            return False
+
+        sweep = unfinished[0]
+        updated = _dt.datetime.fromtimestamp(sweep["updated"]).strftime("%Y-%m-%d %H:%M")
+        msg = (
+            f"An unfinished optimization for {sweep['underlying']} was found "
+            f"({sweep['done']:,} of {sweep['total']:,} combinations done, last saved {updated}).\n\n"
+            "Resume it? Finished combinations will be skipped.\n"
+            "Choose 'No' to configure a new optimization instead."
+        )
+        if not messagebox.askyesno("Resume Optimization", msg, parent=self.win):
+            try:
+                SweepJournal.abandon([sweep["key"]])  # don't ask again for this sweep
+            except Exception:
+                logging.exception("Could not update the sweep journal")
+            return False
+
+        self._apply_config_to_inputs(sweep["config"])
+        opts = {k: v for k, v in sweep["search"].items() if k in ("search", "max_evals", "time_budget_sec") and v is not None}
+        if opts.get("search") == "grid":
+            opts = {}
+        self._start_optimization(sweep["grid"], opts or None)
+        return True
+
+    def _apply_config_to_inputs(self, cfg: StrategyConfig):
+        """Load a StrategyConfig back into the input form (used when reopening a journaled sweep)."""
+        strat_names = {"short_put": "Short Put", "put_spread": "Put Credit Spread", "custom_manual": "Custom Strategy"}
+        self.symbol_ent.delete(0, tk.END); self.symbol_ent.insert(0, cfg.underlying)
+        self.start_ent.set_date(_dt.datetime.strptime(cfg.start, "%Y-%m-%d").date())
+        self.end_ent.set_date(_dt.datetime.strptime(cfg.end, "%Y-%m-%d").date())
+        self.strat_cbo.set(strat_names.get(cfg.strategy_type, "Short Put"))
+        for ent, val in ((self.cap_ent, cfg.capital), (self.alloc_ent, cfg.allocation_pct),
+                         (self.pt_ent, cfg.profit_target_pct), (self.sl_ent, cfg.stop_loss_mult),
+                         (self.dte_ent, cfg.dte_target), (self.comm_ent, cfg.commission_per_contract)):
+            ent.delete(0, tk.END); ent.insert(0, str(val))
+        self.benchmark_cbo.set(cfg.benchmark_ticker)
+        self.benchmark_var.set(cfg.use_benchmark)
+        self.custom_legs = list(cfg.custom_legs or [])
+        self.filters = cfg.filters if isinstance(cfg.filters, FilterConfig) else FilterConfig(**cfg.filters)
+        self._toggle_builder_visibility()
+
+    def _start_optimization(self, param_grid: dict, search_opts: dict | None = None):
         """Kick off a batch run over our param grid with live progress."""
+        search_opts = dict(search_opts or {})
         base_cfg = self._validate_inputs()
         if base_cfg is None:
             return
@@ -940,6 +995,8 @@ class StrategyTesterWindow:
         total = 1
         for vals in param_grid.values():
             total *= len(vals)
+        if search_opts.get("max_evals"):
+            total = min(total, search_opts["max_evals"])
         self.progress.configure(maximum=total, value=0, mode='determinate')
         self.opt_start_time = time.monotonic() # Use monotonic for accurate duration
         self.opt_combo_lbl.config(text="Initializing...")
@@ -958,6 +1015,11 @@ class StrategyTesterWindow:
         if template.use_benchmark:
             benchmark_data = get_prices(template.benchmark_ticker, template.start, template.end)
 
+        # Warm-start TPE from the previous sweep's history if requested
+        if search_opts.pop("warm_start", False) and hasattr(self, 'runner'):
+            previous = self.runner.search_history()
+            search_opts["warm_start"] = previous if not previous.empty else self.runner.results_df()
+
         # Create and store the BatchRunner with shared data
         self.runner = BatchRunner(
             base_cfg=template,
@@ -968,7 +1030,8 @@ class StrategyTesterWindow:
             progress_callback=self._update_opt_progress,
             # FIX: This callback is disabled to prevent the premature trade log population.
             # The final results function is now solely responsible for all UI updates.
-            trade_callback=None
+            trade_callback=None,
+            **search_opts
         )
 
         # Run in background
@@ -1069,30 +1132,34 @@ class StrategyTesterWindow:
         Handles populating all UI elements with the data from a single, specific run
         (e.g., the best run after an optimization).
         """
-        # --- 1. Regenerate full results for the selected run ---
-        # This ensures we have the definitive trade list and equity curve.
+        # --- 1. Take the best run's trades/equity from the sweep (sent back by the worker) ---
+        # Only regenerate them here if the runner could not supply them.
         from core.engine.backtestengine import BacktestEngine
         from app.config import StrategyConfig
         try:
-            base_cfg = self._validate_inputs()
-            best_config_dict = {
-                **base_cfg,
-                "dte_target": int(best["dte_target"]),
-                "allocation_pct": best["allocation_pct"],
-                "profit_target_pct": best["profit_target_pct"],
-                "stop_loss_mult": best["stop_loss_mult"],
-            }
-            config = StrategyConfig(**best_config_dict)
-            engine = BacktestEngine(config)
-            engine.run(
-                price_data=getattr(self.runner, "price_data", None),
-                vol_data=getattr(self.runner, "vol_data", None),
-                benchmark_data=getattr(self.runner, "benchmark_data", None),
-                spy_prices=getattr(self.runner, "spy_prices", None)
-            )
-            result = engine.result()
-            self._best_trades = result.trade_list() # This is used to populate the Trade Log
-            self._best_equity = result.equity_curve()
+            if getattr(self, 'runner', None) is not None and self.runner.best_run_equity() is not None:
+                self._best_trades = self.runner.best_run_trades()
+                self._best_equity = self.runner.best_run_equity()
+            else:
+                base_cfg = self._validate_inputs()
+                best_config_dict = {
+                    **base_cfg,
+                    "dte_target": int(best["dte_target"]),
+                    "allocation_pct": best["allocation_pct"],
+                    "profit_target_pct": best["profit_target_pct"],
+                    "stop_loss_mult": best["stop_loss_mult"],
+                }
+                config = StrategyConfig(**best_config_dict)
+                engine = BacktestEngine(config)
+                engine.run(
+                    price_data=getattr(self.runner, "price_data", None),
+                    vol_data=getattr(self.runner, "vol_data", None),
+                    benchmark_data=getattr(self.runner, "benchmark_data", None),
+                    spy_prices=getattr(self.runner, "spy_prices", None)
+                )
+                result = engine.result()
+                self._best_trades = result.trade_list() # This is used to populate the Trade Log
+                self._best_equity = result.equity_curve()
 
         except Exception as e:
             logging.error(f"Failed to generate final results for the best run: {e}")
@@ -1178,13 +1245,13 @@ class StrategyTesterWindow:
 
 
 
-    def _update_opt_progress(self, done: int, total: int, overrides: dict[str, Any]):
+    def _update_opt_progress(self, done: int, total: int, overrides: dict[str, Any], governor: dict | None = None):
         # hop to GUI thread
-        self.win.after(0, lambda d=done, t=total, o=overrides:
-                    self._update_opt_gui(d, t, o))
+        self.win.after(0, lambda d=done, t=total, o=overrides, g=governor:
+                    self._update_opt_gui(d, t, o, g))
 
 
-    def _update_opt_gui(self, done: int, total: int, overrides: dict[str, Any]):
+    def _update_opt_gui(self, done: int, total: int, overrides: dict[str, Any], governor: dict | None = None):
         # Stop the initial "loading" animation
         if hasattr(self, '_animation_job') and self._animation_job:
             self._stop_status_animation()
@@ -1195,11 +1262,15 @@ class StrategyTesterWindow:
 
         now = time.monotonic()
         percent_done = (done / total) * 100 if total > 0 else 0
+        # Memory governor throttled the sweep: show the reduced task window
+        mem_str = ""
+        if governor and governor.get("window", 0) < governor.get("max_window", 0):
+            mem_str = f" — mem {governor.get('memory_used_pct', 0):.0f}%, {governor['window']}/{governor['max_window']} tasks"
         
         # --- New "Steady-State" ETA Logic ---
         if not self._eta_calibrated:
             # --- Phase 1 & 2: Pre-Calibration and Calibration Window ---
-            self.opt_progress_lbl.config(text=f"{done}/{total} ({percent_done:.1f}%) — Calibrating ETA...")
+            self.opt_progress_lbl.config(text=f"{done}/{total} ({percent_done:.1f}%) — Calibrating ETA...{mem_str}")
 
             # Record the start time exactly when the 3rd task completes
             if done == self.CALIBRATION_START_TASK:
@@ -1224,7 +1295,7 @@ class StrategyTesterWindow:
             current_eta = max(0, current_eta)
             
             eta_str = f" — ETA {self._format_eta(current_eta)}"
-            self.opt_progress_lbl.config(text=f"{done}/{total} ({percent_done:.1f}%){eta_str}")
+            self.opt_progress_lbl.config(text=f"{done}/{total} ({percent_done:.1f}%){eta_str}{mem_str}")
 
         # Update the line showing the current combination being tested
         if overrides:
@@ -1452,6 +1523,13 @@ class StrategyTesterWindow:
             if 'dte_target' in overrides:
                 overrides['dte_target'] = int(overrides['dte_target'])
             
+            # Top-K runs already carry their trades from the sweep worker
+            top = self.runner.top_run(overrides) if hasattr(self, 'runner') else None
+            if top is not None and top["trades"] is not None:
+                trades = top["trades"]
+                self.win.after(0, lambda: self._populate_log_tree(trades))
+                return
+
             # Combine the base config from the UI with the clean overrides
             full_config_dict = {**base_cfg, **overrides}
             
@@ -2478,9 +2556,9 @@ class OptimizeDialog(tk.Toplevel):
         self.grab_set()
         self.title("Configure Optimization")
         # <<< FIX: Set a wider initial size and make the window resizable >>>
-        self.geometry("550x750")
+        self.geometry("550x880")
         self.resizable(True, True)
-        self.minsize(550, 750)
+        self.minsize(550, 880)
 
         frm = ttk.Frame(self, padding=15)
         frm.pack(fill="both", expand=True)
@@ -2518,7 +2596,28 @@ class OptimizeDialog(tk.Toplevel):
         )
         self.param_selectors['stop_loss_mult'].pack(fill='x')
 
+        # --- Search method: exhaustive grid or model-based (TPE) ---
+        method_frame = ttk.LabelFrame(frm, text="Search Method", padding=10)
+        method_frame.columnconfigure(1, weight=1)
+        self.search_var = tk.StringVar(value="grid")
+        ttk.Radiobutton(method_frame, text="Full Grid", value="grid", variable=self.search_var,
+                        command=self._update_totals).grid(row=0, column=0, sticky='w')
+        ttk.Radiobutton(method_frame, text="Smart Search (TPE)", value="tpe", variable=self.search_var,
+                        command=self._update_totals).grid(row=0, column=1, sticky='w')
+        ttk.Label(method_frame, text="Max Evaluations:").grid(row=1, column=0, sticky='w', pady=(5, 0))
+        self.max_evals_var = tk.StringVar(value="100")
+        ttk.Entry(method_frame, textvariable=self.max_evals_var, width=8).grid(row=1, column=1, sticky='w', pady=(5, 0))
+        ttk.Label(method_frame, text="Time Budget (min, 0 = none):").grid(row=2, column=0, sticky='w')
+        self.time_budget_var = tk.StringVar(value="0")
+        ttk.Entry(method_frame, textvariable=self.time_budget_var, width=8).grid(row=2, column=1, sticky='w')
+        self.warm_start_var = tk.BooleanVar(value=False)
+        has_previous = hasattr(controller, 'runner') and not controller.runner.results_df().empty
+        ttk.Checkbutton(method_frame, text="Warm-start from previous sweep", variable=self.warm_start_var,
+                        state='normal' if has_previous else 'disabled').grid(row=3, column=0, columnspan=2, sticky='w', pady=(5, 0))
+        self.max_evals_var.trace_add("write", lambda *a: self._update_totals())
+
         # Finally, pack the summary and button widgets into the layout.
+        method_frame.pack(fill='x', pady=(15, 0))
         summary_frame.pack(fill='x', pady=(15, 5))
         btn_frm.pack(side='bottom', fill='x', pady=(10, 0))
         self.run_btn.pack(side="right", padx=5)
@@ -2536,9 +2635,14 @@ class OptimizeDialog(tk.Toplevel):
                 steps = selector.var_steps.get()
                 total *= steps if steps > 0 else 1
 
+            if getattr(self, 'search_var', None) is not None and self.search_var.get() == "tpe":
+                max_evals = int(self.max_evals_var.get() or 0)
+                if max_evals > 0:
+                    total = min(total, max_evals)
+
             self.totals_label.config(text=f"{total:,}")
             self.run_btn.config(state='normal')
-        except (ValueError, tk.Toplevel):
+        except (ValueError, tk.TclError):
             self.totals_label.config(text="Invalid input...")
             self.run_btn.config(state='disabled')
 
@@ -2554,7 +2658,17 @@ class OptimizeDialog(tk.Toplevel):
                 messagebox.showerror("Input Error", "At least one parameter must have a valid range.", parent=self)
                 return
 
-            self.controller._start_optimization(grid)
+            search_opts = None
+            if self.search_var.get() == "tpe":
+                minutes = float(self.time_budget_var.get() or 0)
+                search_opts = {
+                    "search": "tpe",
+                    "max_evals": int(self.max_evals_var.get() or 0) or None,
+                    "time_budget_sec": minutes * 60 if minutes > 0 else None,
+                    "warm_start": self.warm_start_var.get(),
+                }
+
+            self.controller._start_optimization(grid, search_opts)
             self.destroy()
         except Exception as e:
             messagebox.showerror("Input Error", f"Could not generate grid.\nDetails: {e}", parent=self)
\ No newline at end of file
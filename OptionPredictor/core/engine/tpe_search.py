@@ -0,0 +1,234 @@
+"""tpe_search.py
+────────────────────────────────────────────────────────────────────────────
+Self-contained Tree-structured Parzen Estimator (TPE) for strategy parameter
+search. Works over the same discrete value lists the grid search uses (the
+ranges picked in ParameterRangeSelector), so the search space is identical –
+TPE just visits the promising part of it first.
+
+Each parameter is modelled independently as an ordinal variable over the
+index of its value list. Observations are split into a "good" set (best
+`gamma` quantile) and a "bad" set; candidates are drawn from the good-set
+Parzen density l(x) and ranked by l(x) / g(x).
+"""
+
+from __future__ import annotations
+import math
+import time
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class TPESearch:
+    """
+    Ask/tell optimizer. `ask(n)` proposes up to n new overrides dicts, `tell()`
+    feeds back an objective (higher is better). Proposals and results can be
+    interleaved freely, so the model is updated as soon as any worker returns.
+    """
+    def __init__(self, space: dict, max_evals: Optional[int] = None,
+                 time_budget_sec: Optional[float] = None, n_startup: int = 10,
+                 gamma: float = 0.25, n_ei_candidates: int = 24, seed: Optional[int] = None):
+        if not isinstance(space, dict) or not space or not all(isinstance(v, list) and v for v in space.values()):
+            raise ValueError("space must be a non-empty dict[str, list]")
+
+        self.keys = list(space.keys())
+        self.choices = [list(space[k]) for k in self.keys]
+        self.sizes = np.array([len(c) for c in self.choices], dtype=int)
+        self.grid_size = int(np.prod(self.sizes, dtype=float))
+
+        self.max_evals = min(max_evals, self.grid_size) if max_evals else self.grid_size
+        self.time_budget_sec = time_budget_sec
+        self.n_startup = max(1, n_startup)
+        self.gamma = gamma
+        self.n_ei_candidates = n_ei_candidates
+        self._rng = np.random.default_rng(seed)
+
+        self._obs_x: list[tuple] = []      # index vectors of completed evaluations
+        self._obs_y: list[float] = []      # objective values (higher is better)
+        self._history: list[dict] = []     # overrides + objective + source, in completion order
+        self._seen: set[tuple] = set()     # evaluated, pending or warm-started: never proposed again
+        self._warm: set[tuple] = set()     # seen only through warm_start (not counted in the budget)
+        self._pending: set[tuple] = set()
+        self._n_asked = 0
+        self._t0: Optional[float] = None
+
+    # ────────── budget ──────────
+    def start(self):
+        self._t0 = time.monotonic()
+
+    def elapsed(self) -> float:
+        return 0.0 if self._t0 is None else time.monotonic() - self._t0
+
+    def budget_left(self) -> int:
+        """Number of evaluations that may still be proposed."""
+        return max(0, self.max_evals - self._n_asked)
+
+    def is_done(self) -> bool:
+        if self.time_budget_sec is not None and self.elapsed() >= self.time_budget_sec:
+            return True
+        return self.budget_left() == 0 and not self._pending
+
+    # ────────── ask / tell ──────────
+    def ask(self, n: int) -> list[dict]:
+        """Propose up to n unseen configurations (fewer if budget or grid is exhausted)."""
+        if self._t0 is None:
+            self.start()
+        if self.time_budget_sec is not None and self.elapsed() >= self.time_budget_sec:
+            return []
+
+        out = []
+        for _ in range(min(n, self.budget_left())):
+            x = self._propose()
+            if x is None:
+                break
+            self._seen.add(x)
+            self._pending.add(x)
+            self._n_asked += 1
+            out.append(self._to_overrides(x))
+        return out
+
+    def tell(self, overrides: dict, objective: float):
+        """Record the result of an evaluation proposed by ask()."""
+        x = self._to_index(overrides)
+        self._pending.discard(x)
+        self._seen.add(x)
+        self._observe(x, objective, overrides, source="run")
+
+    def replay(self, overrides: dict, objective: float):
+        """Re-apply an evaluation from an interrupted run of this same search (counts against the budget)."""
+        x = self._to_index(overrides)
+        if x in self._seen and x not in self._warm:
+            return
+        self._seen.add(x)
+        self._n_asked += 1
+        if x in self._warm:
+            self._warm.discard(x)  # already in the model; only the budget was missing it
+            return
+        self._observe(x, objective, overrides, source="journal")
+
+    def warm_start(self, df: pd.DataFrame, objective: str = "total_return_pct") -> int:
+        """
+        Seed the model with a previous sweep's results (BatchRunner.results_df() or search_history()).
+        Values are snapped to the nearest choice; rows missing a swept column are skipped.
+        Warm-start points inform the model and are never proposed again, but are not counted
+        against the budget.
+        """
+        if df is not None and objective not in df.columns and "objective" in df.columns:
+            objective = "objective"  # a previous run's search_history()
+        if df is None or df.empty or objective not in df.columns:
+            return 0
+        if not all(k in df.columns for k in self.keys):
+            logger.info("Warm-start skipped: previous results do not cover %s", self.keys)
+            return 0
+
+        n = 0
+        for _, row in df.iterrows():
+            try:
+                y = float(row[objective])
+                overrides = {k: row[k] for k in self.keys}
+                x = self._to_index(overrides)
+            except (TypeError, ValueError):
+                continue
+            if x not in self._seen:
+                self._seen.add(x)
+                self._warm.add(x)
+            self._observe(x, y, self._to_overrides(x), source="warm_start")
+            n += 1
+        logger.info("TPE warm-started with %d prior observations", n)
+        return n
+
+    def history(self) -> pd.DataFrame:
+        return pd.DataFrame(self._history)
+
+    def best(self) -> Optional[dict]:
+        if not self._obs_y:
+            return None
+        i = int(np.argmax(self._obs_y))
+        return self._to_overrides(self._obs_x[i])
+
+    # ────────── internals ──────────
+    def _observe(self, x: tuple, y: float, overrides: dict, source: str):
+        if y is None or not np.isfinite(y):
+            # Failed runs are kept in the model as the worst seen value so TPE steers away from them
+            y = min([v for v in self._obs_y if np.isfinite(v)], default=0.0) - 1.0
+        self._obs_x.append(x)
+        self._obs_y.append(float(y))
+        self._history.append({**overrides, "objective": float(y), "source": source})
+
+    def _to_overrides(self, x: tuple) -> dict:
+        return {k: self.choices[d][i] for d, (k, i) in enumerate(zip(self.keys, x))}
+
+    def _to_index(self, overrides: dict) -> tuple:
+        idx = []
+        for d, k in enumerate(self.keys):
+            vals = self.choices[d]
+            v = overrides[k]
+            try:
+                idx.append(vals.index(v))
+            except ValueError:
+                arr = np.asarray(vals, dtype=float)
+                idx.append(int(np.argmin(np.abs(arr - float(v)))))
+        return tuple(idx)
+
+    def _random_unseen(self) -> Optional[tuple]:
+        if len(self._seen) >= self.grid_size:
+            return None
+        for _ in range(64):
+            x = tuple(int(self._rng.integers(0, s)) for s in self.sizes)
+            if x not in self._seen:
+                return x
+        # Dense grid: fall back to a linear scan from a random offset
+        start = int(self._rng.integers(0, self.grid_size))
+        for flat in range(self.grid_size):
+            x = tuple(int(i) for i in np.unravel_index((start + flat) % self.grid_size, self.sizes))
+            if x not in self._seen:
+                return x
+        return None
+
+    def _propose(self) -> Optional[tuple]:
+        if len(self._obs_y) < self.n_startup:
+            return self._random_unseen()
+
+        X = np.asarray(self._obs_x, dtype=float)
+        y = np.asarray(self._obs_y, dtype=float)
+        n_good = max(1, int(math.ceil(self.gamma * len(y))))
+        order = np.argsort(-y, kind="stable")
+        good, bad = X[order[:n_good]], X[order[n_good:]]
+
+        # Per-dimension categorical weights from ordinal Gaussian kernels
+        log_l, log_g = [], []
+        for d, size in enumerate(self.sizes):
+            l_w = self._parzen(good[:, d], size)
+            g_w = self._parzen(bad[:, d], size)
+            log_l.append(np.log(l_w))
+            log_g.append(np.log(g_w))
+
+        cands = np.column_stack([
+            self._rng.choice(size, size=self.n_ei_candidates, p=np.exp(log_l[d]))
+            for d, size in enumerate(self.sizes)
+        ])
+        scores = np.zeros(len(cands))
+        for d in range(len(self.sizes)):
+            scores += log_l[d][cands[:, d]] - log_g[d][cands[:, d]]
+
+        for i in np.argsort(-scores):
+            x = tuple(int(v) for v in cands[i])
+            if x not in self._seen:
+                return x
+        return self._random_unseen()
+
+    @staticmethod
+    def _parzen(obs: np.ndarray, size: int) -> np.ndarray:
+        """Normalised kernel density over choice indices 0..size-1 with a uniform prior component."""
+        grid = np.arange(size, dtype=float)
+        w = np.full(size, 1.0 / size)  # prior, weight 1
+        if obs.size:
+            bw = max(0.5, size / (1.0 + math.sqrt(obs.size)) / 2.0)
+            k = np.exp(-0.5 * ((grid[None, :] - obs[:, None]) / bw) ** 2)
+            k /= k.sum(axis=1, keepdims=True)
+            w = w + k.sum(axis=0)
+        return w / w.sum()
@@ -0,0 +1,185 @@
+"""walk_forward.py
+────────────────────────────────────────────────────────────────────────────
+Walk-forward optimization on top of BatchRunner.
+
+The history is cut into consecutive train/test folds (rolling or anchored).
+All in-sample sweeps run as ONE BatchRunner job – the grid crossed with every
+fold's train window – so every fold is optimised in parallel over the same
+worker pool and the same memory-mapped price feed. The winning config of each
+fold is then applied to the following, unseen test window and the
+out-of-sample equity curves are chained into a single curve.
+
+Per-fold precomputation is shared rather than repeated: realized vol is
+computed once over the whole feed and sliced per window, and the
+Backtester caches its per-date entry legs/credit for the feed, so
+overlapping folds (and combos sharing a DTE) reuse them.
+"""
+
+from __future__ import annotations
+import logging
+from typing import Callable, Optional
+
+import pandas as pd
+
+from app.config import StrategyConfig
+from core.engine.backtestengine import BacktestEngine
+from core.engine.backtester import realized_vol
+from core.engine.batch_runner import BatchRunner
+from core.models.fast_metrics import fast_summary
+
+logger = logging.getLogger(__name__)
+
+
+class WalkForwardRunner:
+    def __init__(self, base_cfg: StrategyConfig, sweep_params: dict, price_data: pd.Series,
+                 vol_data: Optional[pd.Series] = None, benchmark_data: Optional[pd.Series] = None,
+                 spy_prices: Optional[pd.Series] = None, train_bars: int = 252, test_bars: int = 63,
+                 step_bars: Optional[int] = None, anchored: bool = False,
+                 objective: str = "total_return_pct",
+                 progress_callback: Optional[Callable[[int, int, dict], None]] = None):
+        if not isinstance(base_cfg, StrategyConfig):
+            raise ValueError("base_cfg must be StrategyConfig")
+        if price_data is None or price_data.empty:
+            raise ValueError("Walk-forward needs preloaded price_data")
+
+        self.base_cfg = base_cfg
+        self.sweep_params = sweep_params
+        self.price_data = price_data
+        # One realized-vol series for the whole feed: every fold slices it instead of recomputing
+        self.vol_data = vol_data if vol_data is not None else realized_vol(price_data).ffill().bfill().clip(lower=0.05)
+        self.benchmark_data = benchmark_data
+        self.spy_prices = spy_prices
+        self.objective = objective
+        self.progress_callback = progress_callback
+
+        self.folds = self.make_folds(price_data.index, train_bars, test_bars, step_bars, anchored)
+        if not self.folds:
+            raise ValueError("Not enough history for a single train/test fold")
+
+        self.runner: Optional[BatchRunner] = None
+        self._fold_results: list[dict] = []
+        self._oos_equity = pd.Series(dtype=float)
+        self._oos_trades: list[dict] = []
+        self._oos_stats: dict = {}
+
+    @staticmethod
+    def make_folds(index: pd.DatetimeIndex, train_bars: int, test_bars: int,
+                   step_bars: Optional[int] = None, anchored: bool = False) -> list[dict]:
+        """
+        Train/test windows as YYYY-MM-DD strings. Rolling folds slide a fixed-length train
+        window; anchored folds keep the first bar as train start and grow the window.
+        """
+        if train_bars < 2 or test_bars < 2:
+            raise ValueError("train_bars and test_bars must be at least 2")
+        step = step_bars or test_bars
+        n = len(index)
+        fmt = lambda i: index[i].strftime("%Y-%m-%d")
+
+        folds, k = [], 0
+        while True:
+            train_end = k * step + train_bars - 1
+            test_start = train_end + 1
+            if test_start + 1 >= n:
+                break
+            test_end = min(test_start + test_bars - 1, n - 1)
+            folds.append({
+                "fold": k,
+                "train_start": fmt(0 if anchored else k * step),
+                "train_end": fmt(train_end),
+                "test_start": fmt(test_start),
+                "test_end": fmt(test_end),
+            })
+            k += 1
+        return folds
+
+    def cancel(self):
+        if self.runner is not None:
+            self.runner.cancel()
+
+    def run(self):
+        # 1) In-sample: one sweep over (fold train window × grid) in a single pool
+        windows = [{"start": f["train_start"], "end": f["train_end"]} for f in self.folds]
+        self.runner = BatchRunner(
+            base_cfg=self.base_cfg, sweep_params=self.sweep_params,
+            price_data=self.price_data, vol_data=self.vol_data,
+            benchmark_data=self.benchmark_data, spy_prices=self.spy_prices,
+            progress_callback=self.progress_callback, objective=self.objective,
+            windows=windows, top_k=1,
+        )
+        self.runner.run()
+        is_results = self.runner.results_df()
+        if is_results.empty or self.objective not in is_results.columns:
+            logger.warning("Walk-forward: in-sample sweep produced no results")
+            return
+
+        # 2) Out-of-sample: apply each fold's winner to its test window
+        keys = list(self.sweep_params.keys())
+        self._fold_results, oos_curves, self._oos_trades = [], [], []
+        for f in self.folds:
+            rows = is_results[(is_results["start"] == f["train_start"]) & (is_results["end"] == f["train_end"])]
+            rows = rows[pd.to_numeric(rows[self.objective], errors="coerce").notna()]
+            if rows.empty:
+                logger.warning("Walk-forward fold %d has no valid in-sample results; skipping", f["fold"])
+                continue
+            best = rows.loc[pd.to_numeric(rows[self.objective]).idxmax()]
+            params = {k: (best[k].item() if hasattr(best[k], "item") else best[k]) for k in keys}
+
+            try:
+                cfg = self.base_cfg.with_overrides(start=f["test_start"], end=f["test_end"], **params)
+                engine = BacktestEngine(cfg)
+                engine.run(price_data=self.price_data, vol_data=self.vol_data,
+                           benchmark_data=self.benchmark_data, spy_prices=self.spy_prices)
+                res = engine.result()
+            except Exception as e:
+                logger.exception("Walk-forward fold %d out-of-sample run failed: %s", f["fold"], e)
+                continue
+
+            equity, trades = res.equity_curve(), res.trade_list()
+            oos_stats = fast_summary(equity, trades, rf=cfg.risk_free_rate, strat_type=cfg.strategy_type)
+            self._fold_results.append({
+                **f, **params,
+                f"is_{self.objective}": float(best[self.objective]),
+                f"oos_{self.objective}": oos_stats.get(self.objective, 0.0),
+                "oos_trades": len(trades),
+            })
+            oos_curves.append(equity)
+            self._oos_trades.extend({**t, "fold": f["fold"]} for t in trades)
+
+        # 3) Chain the test-window curves: each fold starts from the previous fold's ending equity
+        self._oos_equity = self._stitch(oos_curves)
+        if not self._oos_equity.empty:
+            self._oos_stats = fast_summary(self._oos_equity, self._oos_trades,
+                                           rf=self.base_cfg.risk_free_rate, strat_type=self.base_cfg.strategy_type)
+
+    @staticmethod
+    def _stitch(curves: list[pd.Series]) -> pd.Series:
+        parts, level = [], None
+        for eq in curves:
+            eq = eq.dropna()
+            if eq.empty or eq.iloc[0] == 0:
+                continue
+            scaled = eq if level is None else eq * (level / eq.iloc[0])
+            if parts:
+                scaled = scaled[scaled.index > parts[-1].index[-1]]
+            if scaled.empty:
+                continue
+            parts.append(scaled)
+            level = scaled.iloc[-1]
+        return pd.concat(parts).rename("Equity") if parts else pd.Series(dtype=float, name="Equity")
+
+    # ────────── results ──────────
+    def fold_results(self) -> pd.DataFrame:
+        """One row per fold: windows, chosen parameters, in-sample vs out-of-sample objective."""
+        return pd.DataFrame(self._fold_results)
+
+    def oos_equity(self) -> pd.Series:
+        return self._oos_equity
+
+    def oos_trades(self) -> list[dict]:
+        return list(self._oos_trades)
+
+    def oos_summary(self) -> dict:
+        return self._oos_stats
+
+    def in_sample_results(self) -> pd.DataFrame:
+        return self.runner.results_df() if self.runner is not None else pd.DataFrame()
@@ -0,0 +1,141 @@
+"""
+core/models/fast_metrics.py
+───────────────────────────────────────────────────────────────────────────
+Pandas-free performance summary for sweep workers.
+
+Computes the same keys as `core.models.metrics.summary` (CAGR, Sharpe,
+Sortino, max drawdown and its duration, ulcer index and the trade stats) on
+plain NumPy arrays – no pandas objects are built. Every sum, mean and standard
+deviation is the NumPy reduction pandas itself performs (pairwise sums, the
+two-pass variance), so the numbers are identical to `summary`'s; only the
+drawdown-duration loop is JIT-compiled with numba when it is available.
+"""
+
+from __future__ import annotations
+import math
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # plain-Python fallback; same results, just slower
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+# Keep in sync with core/models/metrics.py (not imported: that module pulls in pandas/yfinance)
+TRADING_DAYS_PER_YEAR = 252
+RISK_FREE_RATE_DEFAULT = 0.03
+UNLIMITED_RISK_STRATEGIES = ("short_put", "short_call", "custom_manual")
+_NS_PER_DAY = 86_400_000_000_000
+
+
+@njit(cache=True)
+def _max_underwater_run(dd):
+    """Longest run of consecutive bars with dd < 0."""
+    run = 0; max_run = 0
+    for i in range(dd.shape[0]):
+        if dd[i] < 0.0:
+            run += 1
+            if run > max_run:
+                max_run = run
+        else:
+            run = 0
+    return max_run
+
+
+def _std(x):
+    """Sample std with numpy's two-pass formula – the same operations as pandas' Series.std()."""
+    return float(x.std(ddof=1)) if x.size > 1 else math.nan
+
+
+def fast_summary(
+    equity,
+    pnl=None,
+    index_ns=None,
+    rf: float = RISK_FREE_RATE_DEFAULT,
+    strat_type: str = "",
+) -> dict:
+    """
+    Drop-in, pandas-free equivalent of metrics.summary.
+
+    equity   – equity values (ndarray, list, or anything with .to_numpy(); a pandas
+               Series also supplies its DatetimeIndex for the CAGR duration)
+    pnl      – per-trade P&L array, a TradeLog, or the trade list of dicts itself
+    index_ns – int64 nanosecond timestamps matching `equity` when it is a bare array
+    """
+    if hasattr(equity, "index") and index_ns is None:
+        idx = equity.index
+        if hasattr(idx, "as_unit"):  # pandas may store s/ms/us resolution
+            idx = idx.as_unit("ns")
+        index_ns = np.asarray(idx.asi8) if hasattr(idx, "asi8") else None
+    eq = np.asarray(equity.to_numpy() if hasattr(equity, "to_numpy") else equity, dtype=np.float64)
+    metrics = {}
+
+    # --- Equity-Based Metrics ---
+    if eq.size >= 2 and not np.isnan(eq).all():
+        valid = ~np.isnan(eq)
+        if not valid.all():
+            eq = eq[valid]
+            index_ns = np.asarray(index_ns)[valid] if index_ns is not None else None
+    else:
+        eq = eq[:0]
+
+    if eq.size >= 2:
+        start, end = float(eq[0]), float(eq[-1])
+        metrics['start_value'] = start
+        metrics['end_value'] = end
+        metrics['total_return'] = end - start
+        metrics['total_return_pct'] = (end / start - 1) * 100 if start != 0 else 0.0
+
+        duration_days = int((int(index_ns[-1]) - int(index_ns[0])) // _NS_PER_DAY) if index_ns is not None else eq.size - 1
+        duration_years = max(1.0, duration_days) / 365.25
+        metrics['cagr'] = ((end / start) ** (1 / duration_years) - 1) * 100 if start != 0 else 0.0
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rets = eq[1:] / eq[:-1] - 1
+            rets = rets[~np.isnan(rets)]
+            if rets.size > 1:
+                annualized_std = _std(rets) * np.sqrt(TRADING_DAYS_PER_YEAR)
+                cagr_decimal = metrics['cagr'] / 100
+                metrics['sharpe'] = (cagr_decimal - rf) / annualized_std if annualized_std > 0 else math.nan
+                downside_std = _std(rets[rets < 0]) * np.sqrt(TRADING_DAYS_PER_YEAR)
+                metrics['sortino'] = (cagr_decimal - rf) / downside_std if downside_std > 0 else math.inf
+
+            peak = np.maximum.accumulate(eq)
+            dd = eq - peak
+            dd_pct = dd / peak
+            dd_pct = dd_pct[~np.isnan(dd_pct)]
+        metrics['max_drawdown'] = float(dd.min())
+        metrics['ulcer_index'] = float(np.sqrt(np.sum(dd_pct ** 2) / len(dd_pct))) if len(dd_pct) > 0 else 0.0
+        metrics['max_drawdown_duration'] = int(_max_underwater_run(dd))
+
+    # --- Trade-Based Metrics ---
+    if pnl is not None and len(pnl) > 0:
+        if hasattr(pnl, "column"):  # columnar TradeLog
+            pnl = np.asarray(pnl.column("pnl"), dtype=np.float64)
+        elif isinstance(pnl, list) and isinstance(pnl[0], dict):
+            has_pnl = any('pnl' in t for t in pnl)
+            pnl = np.array([t.get('pnl', math.nan) if t.get('pnl') is not None else math.nan for t in pnl],
+                           dtype=np.float64) if has_pnl else None
+        else:
+            pnl = np.asarray(pnl, dtype=np.float64)
+
+        if pnl is not None:
+            missing = np.isnan(pnl)
+            wins, losses = pnl[pnl > 0], pnl[pnl <= 0]   # NaN is in neither, as in pandas
+            n_trades, n_valid = pnl.shape[0], int((~missing).sum())
+            gross_profit, gross_loss = float(wins.sum()), float(losses.sum())
+            metrics['total_trades'] = n_trades
+            metrics['win_rate'] = (len(wins) / n_trades) * 100 if n_trades > 0 else 0
+            metrics['avg_win'] = gross_profit / len(wins) if len(wins) else math.nan
+            metrics['avg_loss'] = gross_loss / len(losses) if len(losses) else math.nan
+            metrics['gross_profit'] = gross_profit
+            metrics['gross_loss'] = gross_loss
+            metrics['profit_factor'] = gross_profit / abs(gross_loss) if abs(gross_loss) > 0 else math.inf
+            # pandas' skipna mean: NaNs summed as 0, divided by the valid count
+            metrics['expectancy'] = float(np.where(missing, 0.0, pnl).sum()) / n_valid if n_valid else math.nan
+
+    metrics['unlimited_risk'] = "Yes" if strat_type in UNLIMITED_RISK_STRATEGIES else "No"
+
+    return {k: (0 if isinstance(v, float) and math.isnan(v) else v) for k, v in metrics.items()}
@@ -1,9 +1,18 @@
 # filters.py
 
 import datetime as dt
+import logging
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Union
 
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Rule names used for rejection counts, in the order allows() applies them
+FILTER_RULES = ("time_of_day", "weekday", "days_before_expiry", "earnings_buffer")
+
 @dataclass
 class FilterConfig:
     """
@@ -39,13 +48,70 @@ class FilterConfig:
             h, m = map(int, self.tod_to_str.split(":"))
             self.tod_to = dt.time(hour=h, minute=m)
 
+    def compile(self, dates, expiries, ticker: str, counts: Optional[Dict[str, int]] = None,
+                debug: bool = False) -> np.ndarray:
+        """
+        Vectorized allows() for a whole index of entry dates: returns a boolean mask
+        (True = entry allowed). `expiries` is one expiry per date (or a scalar).
+
+        If `counts` is given it is filled with per-rule rejection counts; each rejected
+        date is charged to the first rule that fails, in allows() order. `debug=True`
+        logs those counts once instead of printing per trade.
+        """
+        dates = pd.DatetimeIndex(dates)
+        n = len(dates)
+        days = dates.normalize()
+        fails = {}
+
+        # Time-of-day: only meaningful for intraday timestamps
+        if self.tod_from and self.tod_to and n and (dates != days).any():
+            secs = (dates - days).total_seconds().to_numpy()
+            lo = self.tod_from.hour * 3600 + self.tod_from.minute * 60 + self.tod_from.second
+            hi = self.tod_to.hour * 3600 + self.tod_to.minute * 60 + self.tod_to.second
+            fails["time_of_day"] = (secs < lo) | (secs > hi)
+
+        # Weekday lookup
+        if self.skip_weekdays:
+            fails["weekday"] = np.isin(dates.dayofweek.to_numpy(), list(self.skip_weekdays))
+
+        # DTE comparison
+        if self.days_before_expiry is not None:
+            exp = pd.DatetimeIndex(np.broadcast_to(np.asarray(pd.to_datetime(expiries), dtype="datetime64[ns]"), (n,)))
+            dte = (exp.normalize() - days).days.to_numpy()
+            fails["days_before_expiry"] = dte > self.days_before_expiry
+
+        # Earnings buffer: distance to the nearest earnings date via searchsorted
+        if self.earnings_buffer is not None and self.earnings_calendar.get(ticker):
+            earn = np.unique(np.asarray(pd.to_datetime(self.earnings_calendar[ticker]), dtype="datetime64[D]"))
+            d = days.to_numpy().astype("datetime64[D]")
+            pos = np.searchsorted(earn, d)
+            left = earn[np.clip(pos - 1, 0, len(earn) - 1)]
+            right = earn[np.clip(pos, 0, len(earn) - 1)]
+            nearest = np.minimum(np.abs((d - left).astype(int)), np.abs((right - d).astype(int)))
+            fails["earnings_buffer"] = nearest <= self.earnings_buffer
+
+        mask = np.ones(n, dtype=bool)
+        rejected = {}
+        for rule in FILTER_RULES:
+            if rule in fails:
+                rejected[rule] = int((mask & fails[rule]).sum())
+                mask &= ~fails[rule]
+
+        if counts is not None:
+            for rule, c in rejected.items():
+                counts[rule] = counts.get(rule, 0) + c
+        if debug:
+            logger.info("Filter compile for %s: %d/%d entries allowed; rejections %s",
+                        ticker, int(mask.sum()), n, rejected)
+        return mask
+
     def allows(self, entry_dt: Union[dt.datetime, dt.date], expiry_date: dt.date, ticker: str) -> bool:
-        print(f"Checking trade: entry_dt={entry_dt}, expiry_date={expiry_date}, ticker={ticker}")
+        logger.debug(f"Checking trade: entry_dt={entry_dt}, expiry_date={expiry_date}, ticker={ticker}")
         # Time-of-Day check
         if self.tod_from and self.tod_to and isinstance(entry_dt, dt.datetime):
             t = entry_dt.time()
             if t < self.tod_from or t > self.tod_to:
-                print("Failed time-of-day filter")
+                logger.debug("Failed time-of-day filter")
                 return False
 
         # Normalize entry_date
@@ -54,19 +120,19 @@ class FilterConfig:
         elif isinstance(entry_dt, dt.date):
             entry_date = entry_dt
         else:
-            print("Invalid entry_dt type")
+            logger.debug("Invalid entry_dt type")
             return False
 
         # Weekday filter
         if entry_date.weekday() in self.skip_weekdays:
-            print(f"Skipped due to weekday {entry_date.weekday()} in skip_weekdays={self.skip_weekdays}")
+            logger.debug(f"Skipped due to weekday {entry_date.weekday()} in skip_weekdays={self.skip_weekdays}")
             return False
 
         # Days before expiry
         if self.days_before_expiry is not None:
             dte = (expiry_date - entry_date).days
             if dte > self.days_before_expiry:
-                print(f"Failed days_before_expiry filter: DTE={dte} > {self.days_before_expiry}")
+                logger.debug(f"Failed days_before_expiry filter: DTE={dte} > {self.days_before_expiry}")
                 return False
 
         # Earnings buffer
@@ -74,7 +140,7 @@ class FilterConfig:
             for ed in self.earnings_calendar.get(ticker, []):
                 days_diff = abs((entry_date - ed).days)
                 if days_diff <= self.earnings_buffer:
-                    print(f"Failed earnings buffer filter: entry_date={entry_date}, earnings_date={ed}, days_diff={days_diff} <= {self.earnings_buffer}")
+                    logger.debug(f"Failed earnings buffer filter: entry_date={entry_date}, earnings_date={ed}, days_diff={days_diff} <= {self.earnings_buffer}")
                     return False
 
         return True
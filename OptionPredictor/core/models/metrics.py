@@ -66,6 +66,10 @@ def summary(
         drawdown_pct = (drawdown / cumulative_max).dropna()
         metrics['ulcer_index'] = np.sqrt(np.sum(drawdown_pct**2) / len(drawdown_pct)) if len(drawdown_pct) > 0 else 0.0
 
+        # Longest run of consecutive bars spent below a prior peak
+        underwater = (drawdown < 0).astype(int)
+        metrics['max_drawdown_duration'] = int(underwater.groupby((underwater == 0).cumsum()).sum().max())
+
     # --- Trade-Based Metrics ---
     if trades is not None and len(trades) > 0:
         df_trades = pd.DataFrame(trades)
@@ -124,8 +124,12 @@ class Position:
         logging.debug(f"Position Init: Open={self.open_date}, Exp={self.expiry_date}, EntryValue=${self.entry_value:.2f}, InitialCredit=${self.initial_credit:.2f}")
 
 
-    def get_current_value(self, S: float, today: _dt.date, r: float, sigma: float) -> float:
-        """Calculates the current mark-to-market dollar value of the position."""
+    def get_current_value(self, S: float, today: _dt.date, r: float, sigma: float, marks=None) -> float:
+        """
+        Calculates the current mark-to-market dollar value of the position.
+        marks: optional per-leg market prices (per share, aligned with self.legs);
+               legs whose mark is missing/NaN are priced by the model.
+        """
         if self.closed:
             # Once closed, the value is fixed by the PnL. Technically value is 0.
             # Returning PnL might be confusing. Let's return 0.
@@ -139,17 +143,20 @@ class Position:
              T_remaining = remaining_days / 365.25
 
         current_pos_value = 0.0
-        for leg in self.legs:
-            current_pos_value += leg.current_value(S, T_remaining, r, sigma)
+        for j, leg in enumerate(self.legs):
+            if marks is not None and math.isfinite(marks[j]):
+                current_pos_value += leg.direction * marks[j] * 100 * leg.qty
+            else:
+                current_pos_value += leg.current_value(S, T_remaining, r, sigma)
 
         return current_pos_value
 
-    def get_current_pnl(self, S: float, today: _dt.date, r: float, sigma: float) -> float:
+    def get_current_pnl(self, S: float, today: _dt.date, r: float, sigma: float, marks=None) -> float:
         """Calculates the current unrealized PnL based on MTM value."""
         if self.closed:
             return self.pnl if self.pnl is not None else 0.0 # Return realized PnL if closed
 
-        current_mtm_value = self.get_current_value(S, today, r, sigma)
+        current_mtm_value = self.get_current_value(S, today, r, sigma, marks)
 
         # PnL = Current Value - Entry Value
         # For a short premium trade: entry_value is negative (e.g., -$50).
@@ -159,10 +166,11 @@ class Position:
         return unrealized_pnl
 
 
-    def update_and_maybe_close(self, S: float, today: _dt.date, r: float, sigma: float):
+    def update_and_maybe_close(self, S: float, today: _dt.date, r: float, sigma: float, marks=None):
         """
         Recalculates PnL and checks exit conditions (PT, SL, Expiry).
         Sets internal state (closed, pnl, close_date, close_reason) if an exit is triggered.
+        marks: optional per-leg quoted prices (see get_current_value); expiry always settles at intrinsic.
         """
         if self.closed:
             return # Already closed, nothing to do
@@ -178,7 +186,7 @@ class Position:
             return
 
         # --- Calculate Current PnL ---
-        running_pnl = self.get_current_pnl(S, today, r, sigma)
+        running_pnl = self.get_current_pnl(S, today, r, sigma, marks)
 
         # --- Check Exit Rules (only if credit is meaningful) ---
         if self.initial_credit > 1e-6: # Avoid division by zero / weird behavior
@@ -10,7 +10,6 @@ import datetime as dt
 import math
 import random
 import re
-import time
 import warnings
 from abc import ABC, abstractmethod
 from functools import lru_cache
@@ -22,11 +21,15 @@ from typing import Any, Dict, List
 import numpy as np
 import pandas as pd
 import pandas_ta as ta
-import requests
 import yfinance as yf
 from bs4 import BeautifulSoup
 from pytrends.request import TrendReq
 
+from core.models import trading_calendar
+from core.storage import synthetic_market
+from core.storage.market_data import market_data
+from core.storage.single_flight import http_get, single_flight
+
 
 # --- TURN OFF NOISY FUTUREWARNINGS ---
 warnings.filterwarnings("ignore", category=FutureWarning, module="(pytrends|pandas|yfinance)")
@@ -220,7 +223,7 @@ class HardcodedMacroProvider(DataProvider):
         # This provider doesn't actually 'fetch' but rather 'curates' from hardcoded data.
         
         # Filter events for the current month or future from PREGENERATED_EVENTS
-        today = dt.date.today()
+        today = trading_calendar.current_date()
         current_month = today.month
         current_year = today.year
         
@@ -271,8 +274,25 @@ class YahooPriceProvider(DataProvider):
     Ensures High, Low, and Close columns are available and correctly named,
     handling MultiIndex columns from yfinance.
     """
-    @lru_cache(maxsize=256)
     def fetch(self, symbol: str, period: str = "1y", interval: str = "1d") -> pd.DataFrame:
+        # Cached per trading session: a frame stays valid until a newer bar can exist;
+        # concurrent first requests for the same frame share one download
+        stamp = self._cache_stamp(interval)
+        return single_flight().do(("yahoo", "price", symbol, period, interval, stamp),
+                                  self._fetch_cached, symbol, period, interval, stamp)
+
+    @staticmethod
+    def _cache_stamp(interval: str):
+        """Last published daily session; intraday intervals also roll every 5 minutes while the market is open."""
+        stamp = trading_calendar.expected_last_session()
+        if interval[-1] in "mh":
+            now = trading_calendar.current_time().timestamp()
+            if trading_calendar.market_open_between(now - 300, now):
+                return stamp, int(now // 300)
+        return stamp
+
+    @lru_cache(maxsize=256)
+    def _fetch_cached(self, symbol: str, period: str, interval: str, _stamp) -> pd.DataFrame:
         yf_symbol = symbol.replace('.', '-') # Normalize for Yahoo
 
         import numpy as np, datetime as dt, hashlib
@@ -314,20 +334,32 @@ class YahooPriceProvider(DataProvider):
                 print(f"Warning: Missing required OHLCV columns for {yf_symbol} after processing.")
                 return pd.DataFrame()
             
+        # --- 0. Daily bars come from the shared MarketData service (local store first) ---
+        if synthetic_market.enabled():
+            # Synthetic runs have daily bars only, served for every interval; never touch Yahoo
+            return _process_yfinance_df(market_data().history(symbol, period=period).copy())
+        if interval == "1d":
+            try:
+                df = _process_yfinance_df(market_data().history(symbol, period=period).copy())
+            except Exception as e:
+                print(f"MarketData history failed for {symbol}: {e}")
+                df = pd.DataFrame()
+
         # --- 1. Attempt yfinance.download ---
-        try:
-            download_df = yf.download(
-                tickers=yf_symbol,
-                period=period,
-                interval=interval,
-                threads=False,
-                progress=False,
-                auto_adjust=False, # Crucial: False to retain OHLCV columns
-            )
-            df = _process_yfinance_df(download_df)
-        except Exception as e:
-            print(f"yfinance.download failed for {yf_symbol}: {e}")
-            df = pd.DataFrame() # Reset df on failure
+        if df.empty:
+            try:
+                download_df = yf.download(
+                    tickers=yf_symbol,
+                    period=period,
+                    interval=interval,
+                    threads=False,
+                    progress=False,
+                    auto_adjust=False, # Crucial: False to retain OHLCV columns
+                )
+                df = _process_yfinance_df(download_df)
+            except Exception as e:
+                print(f"yfinance.download failed for {yf_symbol}: {e}")
+                df = pd.DataFrame() # Reset df on failure
 
         # --- 2. Attempt Ticker.history (if download failed or was incomplete) ---
         if df.empty:
@@ -345,7 +377,8 @@ class YahooPriceProvider(DataProvider):
         # --- 3. Final fallback – synthetic OHLCV walk (if all else fails) ---
         if df.empty:
             print(f"Creating synthetic OHLCV data for {symbol}")
-            idx = pd.bdate_range(end=dt.date.today(), periods=252) # 1 year of business days
+            last = trading_calendar.expected_last_session()
+            idx = trading_calendar.sessions(last - dt.timedelta(days=400), last)[-252:] # 1 year of sessions
             rng = np.random.default_rng(
                 int(hashlib.md5(symbol.encode()).hexdigest(), 16) % 2**32
             )
@@ -424,6 +457,8 @@ class YfinanceEarningsProvider(DataProvider):
     from yfinance's options data.
     """
     def fetch(self, symbol: str, **kwargs) -> dict | None:
+        if synthetic_market.enabled():
+            return synthetic_market.synthetic_market().earnings_info(symbol)
         try:
             tk = yf.Ticker(symbol)
             cal = tk.calendar
@@ -449,7 +484,7 @@ class YfinanceEarningsProvider(DataProvider):
 
             if earnings_date_str:
                 event_date_dt = dt.datetime.strptime(earnings_date_str, "%Y-%m-%d").date()
-                days_until = (event_date_dt - dt.date.today()).days
+                days_until = (event_date_dt - trading_calendar.current_date()).days
 
                 expected_move_pct = None
                 if current_price and days_until > 0: # Only calculate if we have a price and it's a future event
@@ -531,7 +566,7 @@ class YfinanceEarningsProvider(DataProvider):
 
             # --- Calculate the expected move using the standard formula ---
             expiry_date_dt = dt.datetime.strptime(closest_expiry, "%Y-%m-%d").date()
-            days_to_expiry = (expiry_date_dt - dt.date.today()).days
+            days_to_expiry = (expiry_date_dt - trading_calendar.current_date()).days
             
             if days_to_expiry <= 0:
                 print(f"DEBUG: Calculated days to expiry is {days_to_expiry}, which is not valid for this calculation.")
@@ -563,7 +598,7 @@ class RedditProvider(DataProvider):
     def fetch(self, symbol: str = "all", **kwargs) -> Dict[str, int]:
         try:
             url = "https://buzztickr.com/reddit.html"
-            response = requests.get(url, timeout=10)
+            response = http_get("buzztickr", url, timeout=10)
             response.raise_for_status()
             soup = BeautifulSoup(response.content, "html.parser")
             
@@ -752,7 +787,7 @@ class FundamentalDataProvider(DataProvider):
             try:
                 earnings_dates_df = ticker_obj.earnings_dates
                 if earnings_dates_df is not None and not earnings_dates_df.empty:
-                    current_naive_date = dt.date.today()
+                    current_naive_date = trading_calendar.current_date()
                     past_earnings_dates_df = earnings_dates_df[earnings_dates_df.index.date < current_naive_date]
                     if not past_earnings_dates_df.empty:
                         latest_report_row = past_earnings_dates_df.sort_index(ascending=False).iloc[0]
@@ -805,7 +840,7 @@ class FinnhubProfileProvider(DataProvider):
     def fetch(self, symbol: str, **kwargs) -> Dict[str, Any]:
         try:
             url = f"https://finnhub.io/api/v1/stock/profile2?symbol={symbol}&token={self.api_key}"
-            response = requests.get(url, timeout=10)
+            response = http_get("finnhub", url, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -837,7 +872,7 @@ class FinnhubFundamentalsProvider(DataProvider):
     def fetch(self, symbol: str, **kwargs) -> Dict[str, Any]:
         try:
             url = f"https://finnhub.io/api/v1/stock/metric?symbol={symbol}&metric=all&token={self.api_key}"
-            response = requests.get(url, timeout=10)
+            response = http_get("finnhub", url, timeout=10)
             response.raise_for_status()
             data = response.json().get("metric", {})
 
@@ -948,7 +983,7 @@ class InsiderTransactionsProvider(DataProvider):
     def fetch(self, symbol: str, **kwargs) -> List[Dict[str, Any]]:
         url = f"https://finnhub.io/api/v1/stock/insider-transactions?symbol={symbol}&token={self.api_key}"
         try:
-            response = requests.get(url, timeout=10)
+            response = http_get("finnhub", url, timeout=10)
             response.raise_for_status()
             data = response.json().get('data', [])
 
@@ -977,6 +1012,8 @@ class OptionsChainProvider(DataProvider):
     """Fetches the full options chain for several upcoming expiries."""
     @lru_cache(maxsize=32)
     def fetch(self, symbol: str, session=None, **kwargs) -> Dict[str, Dict[str, pd.DataFrame]]:
+        if synthetic_market.enabled():
+            return self._synthetic(symbol)
         try:
             ticker_obj = yf.Ticker(symbol, session=session)
             expirations = ticker_obj.options
@@ -996,6 +1033,24 @@ class OptionsChainProvider(DataProvider):
         except Exception as e:
             print(f"Error fetching options chain for {symbol}: {e}")
             return {}
+
+    @staticmethod
+    def _synthetic(symbol: str) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """The synthetic market's chain in yfinance's option_chain() layout."""
+        chain = synthetic_market.synthetic_market().option_chain(symbol, trading_calendar.current_date())
+        chain = chain.assign(
+            lastPrice=((chain["bid"] + chain["ask"]) / 2).round(2),
+            impliedVolatility=chain["iv"],
+            volume=0, openInterest=0,
+        )
+        cols = ["strike", "lastPrice", "bid", "ask", "volume", "openInterest", "impliedVolatility"]
+        out = {}
+        for exp, rows in chain.groupby("expiration"):
+            out[exp.isoformat()] = {
+                "calls": rows.loc[rows["option_type"] == "call", cols].reset_index(drop=True),
+                "puts": rows.loc[rows["option_type"] == "put", cols].reset_index(drop=True),
+            }
+        return out
         
 class PeerComparisonProvider(DataProvider):
     """
@@ -1011,7 +1066,7 @@ class PeerComparisonProvider(DataProvider):
         print(f"[{symbol}] Fetching peer comparison data...")
         peers_url = f"https://finnhub.io/api/v1/stock/peers?symbol={symbol}&token={self.api_key}"
         try:
-            response = requests.get(peers_url, timeout=10)
+            response = http_get("finnhub", peers_url, timeout=10)
             response.raise_for_status()
             peer_tickers = response.json()
 
@@ -0,0 +1,184 @@
+"""
+core/models/trade_log.py
+───────────────────────────────────────────────────────────────────────────
+Columnar trade log.
+
+Closed trades are stored as one typed NumPy array per field instead of a list
+of `Position.dict_summary()` dicts: open/close/expiry as datetime64[ns],
+strikes, credit and P&L as float64, contracts as int64 and the exit reason as
+a small integer code into a per-log category list. Columns grow in chunks as
+the simulation appends trades, slices of them are handed to pandas without a
+copy, and the log pickles as a handful of arrays (cheap to ship back from
+sweep workers).
+
+For existing callers the log is also a read-only sequence of trade dicts:
+indexing or iterating builds the dict for that row on demand.
+"""
+
+from __future__ import annotations
+import math
+from collections.abc import Sequence
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Field name → dtype, in dict_summary order
+TRADE_COLUMNS = (
+    ("open", "datetime64[ns]"),
+    ("close", "datetime64[ns]"),
+    ("expiry", "datetime64[ns]"),
+    ("K_short", "float64"),
+    ("K_long", "float64"),
+    ("contracts", "int64"),
+    ("credit", "float64"),
+    ("pnl", "float64"),
+    ("close_reason", "int16"),
+)
+_DATE_COLS = ("open", "close", "expiry")
+_NULLABLE_FLOAT_COLS = ("K_short", "K_long")
+_NAT = np.datetime64("NaT", "ns")
+
+
+def _to_ns(v) -> np.datetime64:
+    if v is None:
+        return _NAT
+    ts = pd.Timestamp(v)
+    return _NAT if ts is pd.NaT else ts.to_datetime64().astype("datetime64[ns]")
+
+
+def _to_float(v) -> float:
+    return math.nan if v is None else float(v)
+
+
+class TradeLog(Sequence):
+    """Append-only columnar store of closed trades (see module docstring)."""
+
+    def __init__(self, chunk_rows: int = 256):
+        self.chunk_rows = max(1, chunk_rows)
+        self.reasons: list[str] = []           # close_reason code → label; -1 = no reason
+        self._reason_codes: dict[str, int] = {}
+        self._cols = {name: np.empty(0, dtype=dt) for name, dt in TRADE_COLUMNS}
+        self._n = 0
+
+    # ────────── building ──────────
+    @classmethod
+    def from_records(cls, trades: Iterable[dict]) -> "TradeLog":
+        if isinstance(trades, TradeLog):
+            return trades
+        log = cls()
+        log.extend(trades)
+        return log
+
+    def append(self, trade: dict):
+        """Append one dict_summary()-style trade."""
+        if self._n == len(self._cols["pnl"]):
+            self._grow(self.chunk_rows)
+        i = self._n
+        c = self._cols
+        for name in _DATE_COLS:
+            c[name][i] = _to_ns(trade.get(name))
+        c["K_short"][i] = _to_float(trade.get("K_short"))
+        c["K_long"][i] = _to_float(trade.get("K_long"))
+        c["contracts"][i] = int(trade.get("contracts") or 0)
+        c["credit"][i] = _to_float(trade.get("credit"))
+        c["pnl"][i] = _to_float(trade.get("pnl"))
+        c["close_reason"][i] = self._reason_code(trade.get("close_reason"))
+        self._n += 1
+
+    def extend(self, trades: Iterable[dict]):
+        if isinstance(trades, TradeLog):
+            self._append_columns(trades)
+            return
+        for t in trades:
+            self.append(t)
+
+    def _grow(self, extra: int):
+        cap = len(self._cols["pnl"]) + max(extra, self.chunk_rows)
+        for name, arr in self._cols.items():
+            grown = np.empty(cap, dtype=arr.dtype)
+            grown[:self._n] = arr[:self._n]
+            self._cols[name] = grown
+
+    def _reason_code(self, reason: Optional[str]) -> int:
+        if reason is None:
+            return -1
+        code = self._reason_codes.get(reason)
+        if code is None:
+            code = self._reason_codes[reason] = len(self.reasons)
+            self.reasons.append(reason)
+        return code
+
+    def _append_columns(self, other: "TradeLog"):
+        m = len(other)
+        if self._n + m > len(self._cols["pnl"]):
+            self._grow(self._n + m - len(self._cols["pnl"]))
+        for name, _ in TRADE_COLUMNS:
+            src = other.column(name)
+            if name == "close_reason":
+                remap = np.array([self._reason_code(r) for r in other.reasons] + [-1], dtype=np.int16)
+                src = remap[src]  # code -1 indexes the trailing -1
+            self._cols[name][self._n:self._n + m] = src
+        self._n += m
+
+    # ────────── columnar access ──────────
+    def column(self, name: str) -> np.ndarray:
+        """View (no copy) of one column over the filled rows."""
+        return self._cols[name][:self._n]
+
+    def take(self, mask_or_idx) -> "TradeLog":
+        """New log with the rows selected by a boolean mask or index array."""
+        out = TradeLog(self.chunk_rows)
+        out.reasons = list(self.reasons)
+        out._reason_codes = dict(self._reason_codes)
+        out._cols = {name: self.column(name)[mask_or_idx] for name, _ in TRADE_COLUMNS}
+        out._n = len(out._cols["pnl"])
+        return out
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Trades as a DataFrame. Numeric and date columns wrap the stored arrays without
+        copying; close_reason is a Categorical over the stored codes.
+        """
+        data = {name: self.column(name) for name, _ in TRADE_COLUMNS}
+        data["close_reason"] = pd.Categorical.from_codes(data["close_reason"], categories=self.reasons)
+        return pd.DataFrame(data, copy=False)
+
+    # ────────── sequence-of-dicts compatibility view ──────────
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.take(np.arange(self._n)[i])
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("trade index out of range")
+        c = self._cols
+        row = {}
+        for name in _DATE_COLS:
+            v = c[name][i]
+            row[name] = None if np.isnat(v) else pd.Timestamp(v)
+        for name in _NULLABLE_FLOAT_COLS:
+            v = float(c[name][i])
+            row[name] = None if math.isnan(v) else v
+        row["contracts"] = int(c["contracts"][i])
+        row["credit"] = float(c["credit"][i])
+        row["pnl"] = float(c["pnl"][i])
+        code = int(c["close_reason"][i])
+        row["close_reason"] = self.reasons[code] if code >= 0 else None
+        return row
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"TradeLog({self._n} trades)"
+
+    # Pickle only the filled rows
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_cols"] = {name: self.column(name).copy() for name, _ in TRADE_COLUMNS}
+        return state
@@ -0,0 +1,259 @@
+"""trading_calendar.py
+────────────────────────────────────────────────────────────────────────────
+Local NYSE trading calendar (no network).
+
+Full-day holidays and 1:00 pm early closes are generated by rule for any
+year, plus a short table of one-off closures. Cache checks use it to reason
+in sessions instead of calendar days: data that ends on the last session
+that has actually closed is complete, whether the requested end date is a
+weekend, a holiday or later today.
+
+"Now" comes from current_time()/current_date(), which pin_clock() can freeze – HTTP cassette
+replay pins them to the recording time so a scan asks for the same date
+ranges it recorded.
+"""
+
+from __future__ import annotations
+import datetime as dt
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+try:
+    from zoneinfo import ZoneInfo
+    EXCHANGE_TZ = ZoneInfo("America/New_York")
+except Exception:  # no tz database (e.g. Windows without tzdata): fixed EST
+    EXCHANGE_TZ = dt.timezone(dt.timedelta(hours=-5))
+
+OPEN_TIME = dt.time(9, 30)
+CLOSE_TIME = dt.time(16, 0)
+EARLY_CLOSE_TIME = dt.time(13, 0)
+# Daily bars are not published the instant the bell rings
+PUBLISH_DELAY = dt.timedelta(minutes=30)
+
+# Unscheduled closures that no rule produces
+SPECIAL_CLOSURES = {
+    dt.date(2001, 9, 11): "September 11", dt.date(2001, 9, 12): "September 11",
+    dt.date(2001, 9, 13): "September 11", dt.date(2001, 9, 14): "September 11",
+    dt.date(2004, 6, 11): "Reagan funeral",
+    dt.date(2007, 1, 2): "Ford funeral",
+    dt.date(2012, 10, 29): "Hurricane Sandy", dt.date(2012, 10, 30): "Hurricane Sandy",
+    dt.date(2018, 12, 5): "Bush funeral",
+    dt.date(2025, 1, 9): "Carter funeral",
+}
+
+
+# ────────── clock ──────────
+_pinned_ts: float | None = None
+
+
+def pin_clock(ts: float | None) -> None:
+    """Freeze current_time()/current_date() at epoch seconds `ts` (None: follow the system clock again)."""
+    global _pinned_ts
+    _pinned_ts = ts
+
+
+def current_time() -> dt.datetime:
+    """Current exchange-local time (tz-aware), or the pinned time."""
+    return dt.datetime.fromtimestamp(_pinned_ts, EXCHANGE_TZ) if _pinned_ts is not None else dt.datetime.now(EXCHANGE_TZ)
+
+
+def current_date() -> dt.date:
+    """Local calendar date, like dt.date.today(), or the pinned one."""
+    return dt.date.fromtimestamp(_pinned_ts) if _pinned_ts is not None else dt.date.today()
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> dt.date:
+    """n-th (1-based) weekday of a month; n=-1 for the last one."""
+    if n > 0:
+        first = dt.date(year, month, 1)
+        return first + dt.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = dt.date(year + month // 12, month % 12 + 1, 1) - dt.timedelta(days=1)
+    return last - dt.timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> dt.date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return dt.date(year, month, day)
+
+
+def _observed(d: dt.date) -> dt.date:
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday."""
+    if d.weekday() == 5:
+        return d - dt.timedelta(days=1)
+    if d.weekday() == 6:
+        return d + dt.timedelta(days=1)
+    return d
+
+
+@lru_cache(maxsize=None)
+def holidays(year: int) -> dict[dt.date, str]:
+    """Full-day NYSE closures in `year` (date -> name)."""
+    out = {}
+    new_year = dt.date(year, 1, 1)
+    if new_year.weekday() != 5:  # a Saturday New Year's Day is not observed on Dec 31
+        out[_observed(new_year)] = "New Year's Day"
+    if year >= 1998:
+        out[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    out[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    out[_easter(year) - dt.timedelta(days=2)] = "Good Friday"
+    out[_nth_weekday(year, 5, 0, -1)] = "Memorial Day"
+    if year >= 2022:
+        out[_observed(dt.date(year, 6, 19))] = "Juneteenth"
+    out[_observed(dt.date(year, 7, 4))] = "Independence Day"
+    out[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    out[_nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    out[_observed(dt.date(year, 12, 25))] = "Christmas Day"
+    out.update({d: name for d, name in SPECIAL_CLOSURES.items() if d.year == year})
+    return out
+
+
+@lru_cache(maxsize=None)
+def early_closes(year: int) -> frozenset[dt.date]:
+    """1:00 pm closes: July 3, the day after Thanksgiving and Christmas Eve (when they are sessions)."""
+    days = {_nth_weekday(year, 11, 3, 4) + dt.timedelta(days=1)}
+    for d in (dt.date(year, 7, 3), dt.date(year, 12, 24)):
+        if d.weekday() < 4:  # Mon–Thu: the next day is the (weekday) holiday
+            days.add(d)
+    hol = holidays(year)
+    return frozenset(d for d in days if d.weekday() < 5 and d not in hol)
+
+
+@lru_cache(maxsize=64)
+def _holiday_array(y0: int, y1: int) -> np.ndarray:
+    return np.array(sorted(d for y in range(y0, y1 + 1) for d in holidays(y)), dtype="datetime64[D]")
+
+
+def _as_date(d) -> dt.date:
+    if isinstance(d, dt.datetime):
+        return d.date()
+    if isinstance(d, dt.date):
+        return d
+    return pd.Timestamp(d).date()
+
+
+def is_session(d) -> bool:
+    d = _as_date(d)
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+
+def sessions(start, end) -> pd.DatetimeIndex:
+    """Trading sessions in [start, end] (midnight timestamps, like daily bar indexes)."""
+    start, end = _as_date(start), _as_date(end)
+    if start > end:
+        return pd.DatetimeIndex([])
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    mask = np.is_busday(days, holidays=_holiday_array(start.year, end.year))
+    return pd.DatetimeIndex(days[mask])
+
+
+def session_count(start, end) -> int:
+    start, end = _as_date(start), _as_date(end)
+    if start > end:
+        return 0
+    return int(np.busday_count(start, end + dt.timedelta(days=1), holidays=_holiday_array(start.year, end.year)))
+
+
+def previous_session(d, inclusive: bool = True) -> dt.date:
+    d = _as_date(d)
+    if not inclusive:
+        d -= dt.timedelta(days=1)
+    while not is_session(d):
+        d -= dt.timedelta(days=1)
+    return d
+
+
+def next_session(d, inclusive: bool = True) -> dt.date:
+    d = _as_date(d)
+    if not inclusive:
+        d += dt.timedelta(days=1)
+    while not is_session(d):
+        d += dt.timedelta(days=1)
+    return d
+
+
+def session_close(d) -> dt.datetime:
+    """Exchange-local close time of session `d` (tz-aware)."""
+    d = _as_date(d)
+    t = EARLY_CLOSE_TIME if d in early_closes(d.year) else CLOSE_TIME
+    return dt.datetime.combine(d, t, tzinfo=EXCHANGE_TZ)
+
+
+def session_open(d) -> dt.datetime:
+    return dt.datetime.combine(_as_date(d), OPEN_TIME, tzinfo=EXCHANGE_TZ)
+
+
+def expected_last_session(now: dt.datetime | None = None) -> dt.date:
+    """Most recent session whose daily bar should be available at `now` (close + publish delay passed)."""
+    now = now.astimezone(EXCHANGE_TZ) if now is not None and now.tzinfo else (
+        now.replace(tzinfo=EXCHANGE_TZ) if now is not None else current_time())
+    d = previous_session(now.date())
+    if now < session_close(d) + PUBLISH_DELAY:
+        d = previous_session(d, inclusive=False)
+    return d
+
+
+def last_expected_session(end, now: dt.datetime | None = None) -> dt.date:
+    """Last session a daily series requested through `end` can contain right now."""
+    return min(previous_session(end), expected_last_session(now))
+
+
+def is_covered(last_date, end, now: dt.datetime | None = None) -> bool:
+    """True if data ending on `last_date` is complete for a request through `end`."""
+    if last_date is None:
+        return False
+    return _as_date(last_date) >= last_expected_session(end, now)
+
+
+def market_open_between(t0: float, t1: float) -> bool:
+    """True if the exchange was in session at any point between two epoch timestamps."""
+    if t1 <= t0:
+        return False
+    a = dt.datetime.fromtimestamp(t0, EXCHANGE_TZ)
+    b = dt.datetime.fromtimestamp(t1, EXCHANGE_TZ)
+    d = a.date()
+    while d <= b.date():
+        if is_session(d) and session_open(d) < b and session_close(d) > a:
+            return True
+        d = next_session(d, inclusive=False)
+    return False
+
+
+def merge_ranges(ranges) -> list[tuple[dt.date, dt.date]]:
+    """Union of date ranges, joining ones that overlap or touch."""
+    merged: list[list[dt.date]] = []
+    for a, b in sorted(ranges):
+        if merged and a <= merged[-1][1] + dt.timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], b)
+        else:
+            merged.append([a, b])
+    return [(a, b) for a, b in merged]
+
+
+def missing_ranges(coverage, start: dt.date, end: dt.date) -> list[tuple[dt.date, dt.date]]:
+    """Sub-ranges of [start, end] not inside any (sorted, merged) coverage interval."""
+    gaps, cursor = [], start
+    for a, b in coverage:
+        if b < cursor:
+            continue
+        if a > end:
+            break
+        if a > cursor:
+            gaps.append((cursor, a - dt.timedelta(days=1)))
+        cursor = max(cursor, b + dt.timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
@@ -0,0 +1,500 @@
+# bar_store.py
+"""
+Memory-mapped OHLCV bar store (intraday and daily).
+
+Each symbol/timeframe lives in its own directory under BAR_DIR:
+
+    bars/SPY/1m/ts.bin  open.bin  high.bin  low.bin  close.bin  volume.bin
+    bars/SPY/1m/manifest.json      {"rows": …, "first_ns": …, "last_ns": …,
+                                    "coverage": [[first day, last day], …], "updated": epoch s}
+
+Columns are flat little-endian arrays (int64 ns timestamps, float64 prices and
+volume) opened with numpy.memmap, so a decade of minute bars is paged in on
+demand instead of being loaded, and a full daily history is a zero-copy view.
+CSV imports are streamed in chunks and appended; only the import of data that
+overlaps or precedes what is already stored falls back to a full rewrite.
+append() takes downloaded frames (the "1d" timeframe is filled this way by the
+price loader) and rewrites only the stored rows at or after its first bar, so
+adding the newest sessions never touches older data.
+
+Writers (append, import_csv, aggregate) hold a per-directory lock – a thread
+lock plus an OS file lock on <dir>/.lock, so the price loader, the chart pane
+and other processes never interleave a truncate, an append and the manifest
+update. Stored rows are never shrunk in place: a write that has to rewrite
+existing rows writes a new generation of column files (close.<gen>.bin …)
+and switches the manifest to it, so BarViews already mapping the old files
+stay valid. Old generations are deleted once nothing can still open them
+(on Windows, once no view maps them).
+
+Timestamps are exchange-local wall-clock times (tz-aware input is converted
+to America/New_York and made naive), matching the daily price index.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.models.trading_calendar import merge_ranges
+
+logger = logging.getLogger(__name__)
+
+BAR_DIR = Path(__file__).parent / "cache" / "bars"
+COLUMNS = {"ts": np.int64, "open": np.float64, "high": np.float64, "low": np.float64,
+           "close": np.float64, "volume": np.float64}
+EXCHANGE_TZ = "America/New_York"
+_NS_PER_DAY = 86_400_000_000_000
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(fh) -> None:
+        fh.seek(0)
+        while True:
+            try:
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+                return
+            except OSError:
+                time.sleep(0.05)
+
+    def _unlock_file(fh) -> None:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(fh) -> None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(fh) -> None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class _DirLock:
+    """Thread lock plus an OS file lock on <dir>/.lock; re-entrant within a thread."""
+    def __init__(self, d: Path) -> None:
+        self.path = d / ".lock"
+        self._rlock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def __enter__(self) -> "_DirLock":
+        self._rlock.acquire()
+        if self._depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fh = open(self.path, "a+b")
+                _lock_file(fh)
+            except BaseException:
+                self._rlock.release()
+                raise
+            self._fh = fh
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock_file(self._fh)
+            self._fh.close()
+            self._fh = None
+        self._rlock.release()
+
+
+_dir_locks: dict[str, _DirLock] = {}
+_dir_locks_guard = threading.Lock()
+
+
+def _dir_lock(d: Path) -> _DirLock:
+    key = os.path.abspath(d)
+    with _dir_locks_guard:
+        lock = _dir_locks.get(key)
+        if lock is None:
+            lock = _dir_locks[key] = _DirLock(Path(key))
+        return lock
+
+
+class BarView:
+    """Read-only memory-mapped slice of one symbol/timeframe (attributes ts, open, high, low, close, volume)."""
+    def __init__(self, symbol: str, timeframe: str, cols: dict[str, np.ndarray], fingerprint: str):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self._cols = cols
+        self._fingerprint = fingerprint
+        for name, arr in cols.items():
+            setattr(self, name, arr)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def fingerprint(self) -> str:
+        """Cheap content key: store manifest + slice bounds (no pass over the data)."""
+        n = len(self.ts)
+        first, last = (int(self.ts[0]), int(self.ts[-1])) if n else (0, 0)
+        return f"{self._fingerprint}:{first}:{last}:{n}"
+
+    def slice(self, start=None, end=None) -> "BarView":
+        """Bars with start <= ts <= end (a date-only `end` covers that whole day); memmap views, no copy."""
+        a = int(np.searchsorted(self.ts, pd.Timestamp(start).value, side="left")) if start is not None else 0
+        b = len(self.ts)
+        if end is not None:
+            end_ts = pd.Timestamp(end)
+            if end_ts == end_ts.normalize():
+                end_ts += pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+            b = int(np.searchsorted(self.ts, end_ts.value, side="right"))
+        return BarView(self.symbol, self.timeframe, {k: v[a:b] for k, v in self._cols.items()}, self._fingerprint)
+
+    def chunks(self, chunk_rows: int = 1_000_000) -> Iterator[tuple[int, dict[str, np.ndarray]]]:
+        """(offset, columns) for consecutive blocks of at most chunk_rows bars."""
+        for a in range(0, len(self.ts), chunk_rows):
+            yield a, {name: arr[a:a + chunk_rows] for name, arr in self._cols.items()}
+
+    def to_frame(self) -> pd.DataFrame:
+        """Open/High/Low/Close/Volume frame (yfinance column names) on a DatetimeIndex."""
+        return pd.DataFrame({name.capitalize(): getattr(self, name) for name in COLUMNS if name != "ts"},
+                            index=pd.DatetimeIndex(np.asarray(self.ts).view("datetime64[ns]")), copy=False)
+
+    def sessions(self, chunk_rows: int = 1_000_000) -> pd.DataFrame:
+        """
+        One row per trading day: first/last bar index and the session close.
+        Built chunk by chunk, so memory is bounded by the number of days, not bars.
+        """
+        firsts, lasts, closes, days = [], [], [], []
+        prev_day = None
+        for off, c in self.chunks(chunk_rows):
+            day = c["ts"] // _NS_PER_DAY
+            close = c["close"]
+            change = np.empty(len(day), dtype=bool)
+            change[0] = prev_day is None or day[0] != prev_day
+            change[1:] = day[1:] != day[:-1]
+            starts = np.flatnonzero(change)
+            if not len(starts) or starts[0] > 0:
+                # Leading bars continue the session left open by the previous chunk
+                head_end = starts[0] - 1 if len(starts) else len(day) - 1
+                lasts[-1], closes[-1] = off + head_end, float(close[head_end])
+            if len(starts):
+                ends = np.append(starts[1:] - 1, len(day) - 1)
+                firsts.extend((off + starts).tolist())
+                lasts.extend((off + ends).tolist())
+                closes.extend(close[ends].tolist())
+                days.extend(day[starts].tolist())
+            prev_day = day[-1]
+        idx = pd.to_datetime(np.asarray(days, dtype=np.int64) * _NS_PER_DAY)
+        return pd.DataFrame({"first": firsts, "last": lasts, "close": closes}, index=idx)
+
+
+class BarStore:
+    def __init__(self, root: Path = BAR_DIR) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # ────────── import ──────────
+    def import_csv(self, symbol: str, path: str, timeframe: str = "1m", chunksize: int = 500_000,
+                   ts_col: Optional[str] = None) -> int:
+        """
+        Stream a CSV of bars (a timestamp column plus open/high/low/close[/volume], any case)
+        into the store. Returns the number of rows added.
+        """
+        d = self._dir(symbol, timeframe)
+        with _dir_lock(d):
+            manifest = self._manifest(d)
+            gen = manifest.get("gen", 0)
+            self._truncate(d, manifest["rows"], gen)
+            last_ns = manifest["last_ns"] if manifest["rows"] else None
+            added = 0
+            rewrite = False
+
+            handles = {name: open(self._file(d, name, gen), "ab") for name in COLUMNS}
+            try:
+                for raw in pd.read_csv(path, chunksize=chunksize):
+                    chunk = self._normalize(raw, ts_col)
+                    if chunk.empty:
+                        continue
+                    ts = chunk["ts"].to_numpy()
+                    if (last_ns is not None and ts[0] <= last_ns) or (np.diff(ts) <= 0).any():
+                        rewrite = True
+                        break
+                    for name, dtype in COLUMNS.items():
+                        chunk[name].to_numpy(dtype=dtype).tofile(handles[name])
+                    added += len(chunk)
+                    last_ns = int(ts[-1])
+                    if manifest["rows"] == 0 and added == len(chunk):
+                        manifest["first_ns"] = int(ts[0])
+            finally:
+                for fh in handles.values():
+                    fh.close()
+
+            if rewrite:
+                # Out-of-order or overlapping input: merge everything in memory once and rewrite
+                logger.info("Bar import for %s/%s overlaps stored data; rewriting store", symbol, timeframe)
+                self._truncate(d, manifest["rows"], gen)
+                return self._rewrite(symbol, timeframe, path, ts_col, chunksize)
+
+            manifest["rows"] += added
+            if added:
+                manifest["last_ns"] = last_ns
+            self._write_manifest(d, manifest)
+        logger.info("Imported %d %s bars for %s (%d stored)", added, timeframe, symbol.upper(), manifest["rows"])
+        return added
+
+    def append(self, symbol: str, df: pd.DataFrame, timeframe: str = "1d", covered=None) -> int:
+        """
+        Add downloaded bars (DatetimeIndex; open/high/low/close[/volume] or a single close column,
+        any case). Rows at or after the first new timestamp are merged and rewritten (new values
+        win) into a new file generation; a pure append extends the current files. `covered`
+        optionally widens the manifest's coverage to the (start, end) date range that was fetched
+        (default: the span of the new bars). Returns rows stored.
+        """
+        new = self._normalize_frame(df)
+        d = self._dir(symbol, timeframe)
+        with _dir_lock(d):
+            manifest = self._manifest(d)
+            rows, gen = manifest["rows"], manifest.get("gen", 0)
+            self._truncate(d, rows, gen)  # bytes past the manifest are never mapped
+
+            cut = rows
+            if rows and not new.empty:
+                stored_ts = np.fromfile(self._file(d, "ts", gen), dtype=np.int64, count=rows)
+                cut = int(np.searchsorted(stored_ts, int(new["ts"].iloc[0]), side="left"))
+            if cut < rows:
+                # Stored rows from the first new bar onward are merged with the new ones; the result
+                # goes to a new generation so views of the current files are never cut short
+                itemsize = {name: np.dtype(dtype).itemsize for name, dtype in COLUMNS.items()}
+                old = pd.DataFrame({name: np.fromfile(self._file(d, name, gen), dtype=dtype, count=rows - cut,
+                                                      offset=cut * itemsize[name])
+                                    for name, dtype in COLUMNS.items()})
+                new = pd.concat([old, new], ignore_index=True).drop_duplicates("ts", keep="last").sort_values("ts")
+                for name in COLUMNS:
+                    self._copy_prefix(self._file(d, name, gen), self._file(d, name, gen + 1), cut * itemsize[name])
+                gen = manifest["gen"] = gen + 1
+
+            if not new.empty:
+                for name, dtype in COLUMNS.items():
+                    with open(self._file(d, name, gen), "ab") as fh:
+                        new[name].to_numpy(dtype=dtype).tofile(fh)
+                if cut == 0:
+                    manifest["first_ns"] = int(new["ts"].iloc[0])
+                manifest["rows"] = cut + len(new)
+                manifest["last_ns"] = int(new["ts"].iloc[-1])
+
+            if covered is None and not new.empty:
+                covered = (pd.Timestamp(int(new["ts"].iloc[0])), pd.Timestamp(int(new["ts"].iloc[-1])))
+            ranges = self._ranges(manifest)
+            if covered is not None and pd.Timestamp(covered[0]) <= pd.Timestamp(covered[1]):
+                ranges.append((pd.Timestamp(covered[0]).date(), pd.Timestamp(covered[1]).date()))
+            manifest["coverage"] = [[a.isoformat(), b.isoformat()] for a, b in merge_ranges(ranges)]
+            manifest["updated"] = time.time()
+            self._write_manifest(d, manifest)
+            self._drop_stale(d, gen)
+        return manifest["rows"] - rows
+
+    def aggregate(self, symbol: str, src: str = "1m", dst: str = "1h", rule: str = "1h",
+                  chunk_rows: int = 1_000_000) -> int:
+        """Build a coarser timeframe from a stored one, one chunk at a time (chunks split on day boundaries)."""
+        view = self.bars(symbol, src)
+        out = self._dir(symbol, dst)
+        with _dir_lock(out):
+            gen = self._manifest(out).get("gen", 0) + 1   # views of the previous build stay valid
+            manifest = {"rows": 0, "first_ns": 0, "last_ns": 0, "gen": gen}
+            handles = {name: open(self._file(out, name, gen), "wb") for name in COLUMNS}
+            try:
+                carry = None
+                for _, c in view.chunks(chunk_rows):
+                    df = pd.DataFrame({k: v for k, v in c.items() if k != "ts"}, index=pd.to_datetime(c["ts"]))
+                    if carry is not None:
+                        df = pd.concat([carry, df])
+                    last_day = df.index[-1].normalize()
+                    carry, df = df[df.index >= last_day], df[df.index < last_day]   # keep the open session for the next chunk
+                    manifest = self._append_resampled(df, rule, handles, manifest)
+                if carry is not None:
+                    manifest = self._append_resampled(carry, rule, handles, manifest)
+            finally:
+                for fh in handles.values():
+                    fh.close()
+            self._write_manifest(out, manifest)
+            self._drop_stale(out, gen)
+        return manifest["rows"]
+
+    # ────────── read ──────────
+    def bars(self, symbol: str, timeframe: str = "1m", start=None, end=None) -> BarView:
+        d = self._dir(symbol, timeframe)
+        with _dir_lock(d):  # manifest and files of one generation, never mid-write
+            manifest = self._manifest(d)
+            if not manifest["rows"]:
+                raise FileNotFoundError(f"No {timeframe} bars stored for {symbol.upper()}")
+            n, gen = manifest["rows"], manifest.get("gen", 0)
+            cols = {name: np.memmap(self._file(d, name, gen), dtype=dtype, mode="r", shape=(n,))
+                    for name, dtype in COLUMNS.items()}
+        fp = hashlib.blake2b(json.dumps({"sym": symbol.upper(), "tf": timeframe, **manifest}, sort_keys=True).encode(),
+                             digest_size=8).hexdigest()
+        return BarView(symbol.upper(), timeframe, cols, fp).slice(start, end)
+
+    def ohlcv(self, symbol: str, start=None, end=None, timeframe: str = "1d") -> pd.DataFrame:
+        """Stored bars as an Open/High/Low/Close/Volume frame (empty if nothing is stored)."""
+        try:
+            return self.bars(symbol, timeframe, start, end).to_frame()
+        except FileNotFoundError:
+            return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+
+    def coverage(self, symbol: str, timeframe: str = "1d") -> dict:
+        """
+        Manifest summary: {"rows", "ranges", "start", "end", "updated"} – ranges are the merged
+        (date, date) spans already fetched, updated is epoch seconds.
+        """
+        m = self._manifest(self._dir(symbol, timeframe))
+        ranges = merge_ranges(self._ranges(m))
+        return {"rows": m["rows"], "ranges": ranges,
+                "start": ranges[0][0] if ranges else None,
+                "end": ranges[-1][1] if ranges else None,
+                "updated": m.get("updated")}
+
+    def symbols(self, timeframe: str = "1m") -> list[str]:
+        return sorted(p.parent.name for p in self.root.glob(f"*/{timeframe}/manifest.json"))
+
+    # ────────── internals ──────────
+    def _dir(self, symbol: str, timeframe: str) -> Path:
+        return self.root / symbol.strip().upper() / timeframe
+
+    @staticmethod
+    def _manifest(d: Path) -> dict:
+        try:
+            return json.loads((d / "manifest.json").read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"rows": 0, "first_ns": 0, "last_ns": 0}
+
+    @staticmethod
+    def _write_manifest(d: Path, manifest: dict) -> None:
+        tmp = d / "manifest.json.tmp"
+        tmp.write_text(json.dumps(manifest))
+        os.replace(tmp, d / "manifest.json")
+
+    @staticmethod
+    def _ranges(manifest: dict) -> list:
+        cov = manifest.get("coverage") or []
+        if cov and isinstance(cov[0], str):  # single [start, end] pair
+            cov = [cov]
+        return [(pd.Timestamp(a).date(), pd.Timestamp(b).date()) for a, b in cov]
+
+    @staticmethod
+    def _file(d: Path, name: str, gen: int = 0) -> Path:
+        return d / (f"{name}.{gen}.bin" if gen else f"{name}.bin")
+
+    @classmethod
+    def _truncate(cls, d: Path, rows: int, gen: int = 0) -> None:
+        """Drop bytes appended past the manifest's row count (a partial or aborted import)."""
+        for name, dtype in COLUMNS.items():
+            f = cls._file(d, name, gen)
+            if f.exists() and f.stat().st_size > rows * np.dtype(dtype).itemsize:
+                with open(f, "r+b") as fh:
+                    fh.truncate(rows * np.dtype(dtype).itemsize)
+
+    @staticmethod
+    def _copy_prefix(src: Path, dst: Path, nbytes: int, block: int = 1 << 24) -> None:
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            while nbytes > 0:
+                buf = fin.read(min(block, nbytes))
+                if not buf:
+                    break
+                fout.write(buf)
+                nbytes -= len(buf)
+
+    @classmethod
+    def _drop_stale(cls, d: Path, gen: int) -> None:
+        """Delete column files of older generations (a file still mapped on Windows is left for next time)."""
+        keep = {cls._file(d, name, gen).name for name in COLUMNS}
+        for f in d.glob("*.bin"):
+            if f.name not in keep:
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _normalize(raw: pd.DataFrame, ts_col: Optional[str]) -> pd.DataFrame:
+        cols = {c.lower().strip(): c for c in raw.columns}
+        tcol = ts_col or next((cols[k] for k in ("timestamp", "datetime", "time", "date") if k in cols), raw.columns[0])
+        ts = pd.to_datetime(raw[tcol])
+        if ts.dt.tz is not None:
+            ts = ts.dt.tz_convert(EXCHANGE_TZ).dt.tz_localize(None)
+        out = pd.DataFrame({"ts": ts.astype("datetime64[ns]").astype(np.int64)})
+        for name in ("open", "high", "low", "close", "volume"):
+            out[name] = pd.to_numeric(raw[cols[name]], errors="coerce").to_numpy() if name in cols else np.nan
+        return out.dropna(subset=["close"])
+
+    @staticmethod
+    def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """Downloaded frame/series -> store columns; a close-only input fills open/high/low with the close."""
+        if isinstance(df, pd.Series):
+            df = df.to_frame("close")
+        if isinstance(df.columns, pd.MultiIndex):  # yfinance ('Close', 'SPY') columns
+            df = df.copy()
+            df.columns = df.columns.get_level_values(0)
+        cols = {str(c).lower().strip().replace(" ", "_"): c for c in df.columns}
+        close_col = cols.get("close", cols.get("adj_close", df.columns[0]))
+        ts = pd.DatetimeIndex(df.index)
+        if ts.tz is not None:
+            ts = ts.tz_convert(EXCHANGE_TZ).tz_localize(None)
+        out = pd.DataFrame({"ts": ts.as_unit("ns").asi8, "close": pd.to_numeric(df[close_col], errors="coerce").to_numpy()})
+        for name in ("open", "high", "low"):
+            out[name] = pd.to_numeric(df[cols[name]], errors="coerce").to_numpy() if name in cols else out["close"]
+        out["volume"] = pd.to_numeric(df[cols["volume"]], errors="coerce").to_numpy() if "volume" in cols else np.nan
+        out = out.dropna(subset=["close"]).drop_duplicates("ts", keep="last").sort_values("ts")
+        return out[list(COLUMNS)]
+
+    def _rewrite(self, symbol: str, timeframe: str, path: str, ts_col: Optional[str], chunksize: int) -> int:
+        """Merge stored bars and the whole CSV into a new generation (caller holds the directory lock)."""
+        d = self._dir(symbol, timeframe)
+        old = self._manifest(d)
+        parts = []
+        if old["rows"]:
+            v = self.bars(symbol, timeframe)
+            parts.append(pd.DataFrame({name: np.array(getattr(v, name)) for name in COLUMNS}))
+            del v
+        for raw in pd.read_csv(path, chunksize=chunksize):
+            parts.append(self._normalize(raw, ts_col))
+        df = pd.concat(parts, ignore_index=True).drop_duplicates("ts", keep="last").sort_values("ts")
+        gen = old.get("gen", 0) + 1
+        for name, dtype in COLUMNS.items():
+            df[name].to_numpy(dtype=dtype).tofile(self._file(d, name, gen))
+        manifest = {**old, "rows": len(df), "first_ns": int(df["ts"].iloc[0]), "last_ns": int(df["ts"].iloc[-1]),
+                    "gen": gen}
+        self._write_manifest(d, manifest)
+        self._drop_stale(d, gen)
+        return len(df) - old["rows"]
+
+    @staticmethod
+    def _append_resampled(df: pd.DataFrame, rule: str, handles: dict, manifest: dict) -> dict:
+        if df.empty:
+            return manifest
+        agg = df.resample(rule, label="left", closed="left").agg(
+            {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}).dropna(subset=["close"])
+        if agg.empty:
+            return manifest
+        ts = agg.index.as_unit("ns").asi8
+        np.asarray(ts, dtype=np.int64).tofile(handles["ts"])
+        for name in ("open", "high", "low", "close", "volume"):
+            agg[name].to_numpy(dtype=np.float64).tofile(handles[name])
+        if not manifest["rows"]:
+            manifest["first_ns"] = int(ts[0])
+        manifest["rows"] += len(agg)
+        manifest["last_ns"] = int(ts[-1])
+        return manifest
+
+
+_default_store: Optional[BarStore] = None
+
+
+def default_bar_store() -> BarStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = BarStore()
+    return _default_store
@@ -0,0 +1,241 @@
+# chain_archive.py
+"""
+Local archive of historical option quotes.
+
+User-supplied CSV exports are imported into one columnar .npz file per
+symbol and year under CHAIN_DIR (chains/SPY/2019.npz). Every row carries a
+single int64 sort key packing (quote date, days to expiry, put flag, strike
+in cents), so a partition is one sorted key array plus bid/ask columns, and
+any batch of (date, expiry, type, strike) lookups is a single vectorized
+searchsorted.
+
+Lookups are as-of joins: a request dated on a day with no archive snapshot
+uses the most recent earlier snapshot, up to `max_stale_days`. Misses are
+NaN so callers can fall back to model pricing.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CHAIN_DIR = Path(__file__).parent / "cache" / "chains"
+MAX_DTE = 1023            # 10 bits in the key; longer-dated quotes are not archived
+
+_COLUMN_ALIASES = {
+    "date": ("quote_date", "date", "trade_date", "quotedate", "data_date"),
+    "expiry": ("expiration", "expiry", "expiration_date", "expirationdate", "exdate"),
+    "strike": ("strike", "strike_price"),
+    "type": ("option_type", "type", "call_put", "putcall", "cp_flag", "right"),
+    "bid": ("bid", "best_bid", "bid_1545"),
+    "ask": ("ask", "best_offer", "ask_1545"),
+    "symbol": ("underlying", "underlying_symbol", "symbol", "root", "ticker"),
+}
+
+
+def make_keys(date_days, expiry_days, is_put, strike) -> np.ndarray:
+    """Pack (date, dte, put flag, strike cents) into sortable int64 keys (-1 where dte is out of range)."""
+    date_days = np.asarray(date_days, dtype=np.int64)
+    dte = np.asarray(expiry_days, dtype=np.int64) - date_days
+    cents = np.round(np.asarray(strike, dtype=float) * 100).astype(np.int64)
+    keys = (date_days << 43) | (np.clip(dte, 0, MAX_DTE) << 33) | (np.asarray(is_put, dtype=np.int64) << 32) | cents
+    return np.where((dte >= 0) & (dte <= MAX_DTE) & (cents >= 0) & (cents < 2 ** 32), keys, -1)
+
+
+def _days(values) -> np.ndarray:
+    return pd.to_datetime(values).values.astype("datetime64[D]").astype(np.int64)
+
+
+class ChainTable:
+    """Sorted quote rows for one symbol over a date range (see module docstring)."""
+    def __init__(self, symbol: str, keys: np.ndarray, bid: np.ndarray, ask: np.ndarray, max_stale_days: int = 3):
+        self.symbol = symbol
+        self.keys = keys
+        self.bid = bid
+        self.ask = ask
+        self.max_stale_days = max_stale_days
+        self.dates = np.unique(keys >> 43)              # snapshot days present
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def asof_day(self, days) -> np.ndarray:
+        """Snapshot day to use for each requested day (-1 if none within max_stale_days)."""
+        days = np.asarray(days, dtype=np.int64)
+        pos = np.searchsorted(self.dates, days, side="right") - 1
+        snap = np.where(pos >= 0, self.dates[np.maximum(pos, 0)], -1)
+        return np.where((snap >= 0) & (days - snap <= self.max_stale_days), snap, -1)
+
+    def quotes(self, days, expiry_days, is_put, strikes) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized as-of lookup: (bid, ask) per request, NaN where no quote."""
+        snap = self.asof_day(days)
+        req = make_keys(snap, expiry_days, is_put, strikes)
+        if not len(self.keys):
+            self.misses += len(req)
+            return np.full(len(req), np.nan), np.full(len(req), np.nan)
+        pos = np.minimum(np.searchsorted(self.keys, req), len(self.keys) - 1)
+        found = (snap >= 0) & (req >= 0) & (self.keys[pos] == req)
+        n_found = int(found.sum())
+        self.hits += n_found
+        self.misses += len(found) - n_found
+        return np.where(found, self.bid[pos], np.nan), np.where(found, self.ask[pos], np.nan)
+
+    def expiries(self, day: int) -> np.ndarray:
+        """Listed expiry days in the as-of snapshot for `day`."""
+        snap = int(self.asof_day([day])[0])
+        if snap < 0:
+            return np.empty(0, dtype=np.int64)
+        a, b = np.searchsorted(self.keys, [snap << 43, (snap + 1) << 43])
+        return np.unique(snap + ((self.keys[a:b] >> 33) & MAX_DTE))
+
+    def strikes(self, day: int, expiry_day: int, is_put: bool) -> np.ndarray:
+        """Listed strikes in the as-of snapshot for (`day`, expiry, type)."""
+        snap = int(self.asof_day([day])[0])
+        if snap < 0 or not 0 <= expiry_day - snap <= MAX_DTE:
+            return np.empty(0)
+        lo = (snap << 43) | ((expiry_day - snap) << 33) | (int(is_put) << 32)
+        a, b = np.searchsorted(self.keys, [lo, lo + (1 << 32)])
+        return (self.keys[a:b] & 0xFFFFFFFF) / 100.0
+
+    def snap_leg(self, day: int, target_expiry_day: int, strike: float, is_put: bool) -> Optional[tuple[int, float]]:
+        """Nearest listed expiry on/after the target (else the latest one) and nearest listed strike."""
+        exps = self.expiries(day)
+        exps = exps[exps > day]
+        if not len(exps):
+            return None
+        later = exps[exps >= target_expiry_day]
+        exp = int(later[0]) if len(later) else int(exps[-1])
+        ks = self.strikes(day, exp, is_put)
+        if not len(ks):
+            return None
+        return exp, float(ks[np.argmin(np.abs(ks - strike))])
+
+    def frame(self, day: int) -> pd.DataFrame:
+        """The as-of snapshot for `day` in get_option_chain's column layout."""
+        snap = int(self.asof_day([day])[0])
+        if snap < 0:
+            return pd.DataFrame(columns=["expiration", "strike", "option_type", "bid", "ask", "iv", "delta"])
+        a, b = np.searchsorted(self.keys, [snap << 43, (snap + 1) << 43])
+        k = self.keys[a:b]
+        exp = (snap + ((k >> 33) & MAX_DTE)).astype("datetime64[D]")
+        return pd.DataFrame({
+            "expiration": pd.to_datetime(exp).date,
+            "strike": (k & 0xFFFFFFFF) / 100.0,
+            "option_type": np.where((k >> 32) & 1, "put", "call"),
+            "bid": self.bid[a:b], "ask": self.ask[a:b], "iv": np.nan, "delta": np.nan,
+        })
+
+
+class ChainArchive:
+    def __init__(self, root: Path = CHAIN_DIR) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # ────────── import ──────────
+    def import_csv(self, path: str, symbol: Optional[str] = None, chunksize: int = 1_000_000) -> int:
+        """
+        Import a chain CSV (quote date, expiration, strike, call/put, bid, ask; optional
+        underlying column – otherwise `symbol` is used). Returns rows stored.
+        """
+        total = 0
+        for raw in pd.read_csv(path, chunksize=chunksize):
+            df = self._normalize(raw, symbol)
+            for (sym, year), part in df.groupby(["symbol", "year"], sort=False):
+                total += self._merge_partition(sym, int(year), part)
+        logger.info("Imported %d option quotes from %s", total, path)
+        return total
+
+    def symbols(self) -> list[str]:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and any(p.glob("*.npz")))
+
+    def has(self, symbol: str) -> bool:
+        return any((self.root / symbol.upper()).glob("*.npz"))
+
+    def fingerprint(self, symbol: str) -> str:
+        """Cheap change marker for a symbol's partitions (names, sizes, mtimes) – part of result-cache keys."""
+        parts = sorted((f.name, f.stat().st_size, f.stat().st_mtime_ns)
+                       for f in (self.root / symbol.upper()).glob("*.npz"))
+        return hashlib.blake2b(repr(parts).encode(), digest_size=8).hexdigest()
+
+    # ────────── read ──────────
+    def load(self, symbol: str, start, end, max_stale_days: int = 3) -> ChainTable:
+        """All quotes for symbol with quote dates in [start - max_stale_days, end]."""
+        sym = symbol.upper()
+        lo = int(_days([pd.Timestamp(start) - pd.Timedelta(days=max_stale_days)])[0])
+        hi = int(_days([end])[0])
+        keys, bids, asks = [], [], []
+        for year in range(pd.Timestamp(start).year - 1, pd.Timestamp(end).year + 1):
+            f = self.root / sym / f"{year}.npz"
+            if not f.exists():
+                continue
+            with np.load(f) as z:
+                k = z["keys"]
+                a, b = np.searchsorted(k, [lo << 43, (hi + 1) << 43])
+                keys.append(k[a:b]); bids.append(z["bid"][a:b]); asks.append(z["ask"][a:b])
+        if not keys:
+            return ChainTable(sym, np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), max_stale_days)
+        # Partitions are per calendar year, so concatenating in year order keeps keys sorted
+        return ChainTable(sym, np.concatenate(keys), np.concatenate(bids), np.concatenate(asks), max_stale_days)
+
+    # ────────── internals ──────────
+    @staticmethod
+    def _normalize(raw: pd.DataFrame, symbol: Optional[str]) -> pd.DataFrame:
+        lower = {c.lower().strip(): c for c in raw.columns}
+        col = {}
+        for name, aliases in _COLUMN_ALIASES.items():
+            col[name] = next((lower[a] for a in aliases if a in lower), None)
+        missing = [n for n in ("date", "expiry", "strike", "type", "bid", "ask") if col[n] is None]
+        if missing:
+            raise ValueError(f"Option chain CSV is missing column(s): {', '.join(missing)}")
+        if col["symbol"] is None and not symbol:
+            raise ValueError("Option chain CSV has no underlying column; pass symbol=")
+
+        date_days = _days(raw[col["date"]])
+        exp_days = _days(raw[col["expiry"]])
+        is_put = raw[col["type"]].astype(str).str.strip().str.upper().str[0].eq("P").to_numpy()
+        keys = make_keys(date_days, exp_days, is_put, raw[col["strike"]].to_numpy(dtype=float))
+        df = pd.DataFrame({
+            "symbol": (raw[col["symbol"]].astype(str).str.upper() if col["symbol"] else symbol.upper()),
+            "year": pd.to_datetime(date_days.astype("datetime64[D]")).year,
+            "keys": keys,
+            "bid": pd.to_numeric(raw[col["bid"]], errors="coerce").to_numpy(),
+            "ask": pd.to_numeric(raw[col["ask"]], errors="coerce").to_numpy(),
+        })
+        return df[(df["keys"] >= 0) & df["bid"].notna() & df["ask"].notna()]
+
+    def _merge_partition(self, sym: str, year: int, part: pd.DataFrame) -> int:
+        d = self.root / sym
+        d.mkdir(parents=True, exist_ok=True)
+        f = d / f"{year}.npz"
+        keys, bid, ask = part["keys"].to_numpy(), part["bid"].to_numpy(), part["ask"].to_numpy()
+        if f.exists():
+            with np.load(f) as z:
+                keys = np.concatenate([z["keys"], keys])
+                bid = np.concatenate([z["bid"], bid])
+                ask = np.concatenate([z["ask"], ask])
+        # Sort, keeping the last (newest import) row for duplicate keys
+        order = np.argsort(keys, kind="stable")
+        keys, bid, ask = keys[order], bid[order], ask[order]
+        last = np.append(keys[1:] != keys[:-1], True)
+        tmp = d / f"{year}.tmp.npz"
+        np.savez(tmp, keys=keys[last], bid=bid[last], ask=ask[last])
+        tmp.replace(f)
+        return len(part)
+
+
+_default_archive: Optional[ChainArchive] = None
+
+
+def default_chain_archive() -> ChainArchive:
+    global _default_archive
+    if _default_archive is None:
+        _default_archive = ChainArchive()
+    return _default_archive
@@ -0,0 +1,39 @@
+# fingerprint.py
+"""
+Content fingerprints of the price/vol inputs a backtest or sweep runs on.
+
+Shared by the result cache, the sweep journal and the engines' in-process
+caches so that every key built from "the same data" hashes the same way.
+xxhash is used when installed, blake2b otherwise.
+"""
+from __future__ import annotations
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+try:
+    import xxhash
+except ImportError:  # optional dependency; blake2b is slower but fine
+    xxhash = None
+
+
+def _hasher():
+    return xxhash.xxh3_128() if xxhash is not None else hashlib.blake2b(digest_size=16)
+
+
+def data_fingerprint(*datas) -> str:
+    """Hash of the raw bytes and date range of each input (Series, DataFrame, ndarray or None)."""
+    h = _hasher()
+    for d in datas:
+        if d is None:
+            h.update(b"none")
+            continue
+        if isinstance(d, (pd.Series, pd.DataFrame)):
+            h.update(np.ascontiguousarray(d.to_numpy(dtype=float)).tobytes())
+            if len(d.index):
+                h.update(f"{d.index[0]}|{d.index[-1]}|{len(d.index)}".encode())
+        else:
+            h.update(np.ascontiguousarray(np.asarray(d, dtype=float)).tobytes())
+    return h.hexdigest()
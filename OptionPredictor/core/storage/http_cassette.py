@@ -0,0 +1,284 @@
+# http_cassette.py
+"""
+Offline record/replay layer for outbound HTTP.
+
+install(mode) patches the three clients the data layer uses:
+
+    requests.Session.request        (requests.get/post, pytrends, Stooq, Finnhub…)
+    curl_cffi.requests.Session.request (curl_cffi.get, yfinance's sessions)
+    feedparser.parse(url)           (fetched through requests, then parsed)
+
+mode="record" passes every request through and writes the response to the
+cassette store; mode="replay" serves responses from the store only (a
+request with no cassette raises ConnectionError, like being offline), after
+a synthetic delay – the recorded round-trip time by default, or a fixed
+number of seconds. Scans and benchmarks then run deterministically and with
+no network.
+
+Cassettes are JSON files under CASSETTE_DIR/<host>/<hash>.json. The hash
+covers method, URL, sorted query parameters and body; parameters that change
+between runs or carry secrets (VOLATILE_PARAMS: API tokens, yfinance's
+crumb) are left out of the hash and redacted from the stored URL.
+
+Query parameters include dates anchored on today (MarketData's period starts,
+Stooq d1/d2, yfinance start/end), so a recording also stores its clock in
+CASSETTE_DIR/clock.json and replay pins trading_calendar's current_time() /
+current_date() to it: the replayed scan asks for exactly the ranges it
+recorded, on any later day.
+
+Environment (read by install_from_env at app start):
+    HTTP_CASSETTE_MODE     off | record | replay
+    HTTP_CASSETTE_DIR      cassette directory (default CASSETTE_DIR)
+    HTTP_CASSETTE_LATENCY  "recorded" (default) or seconds per replayed request
+
+Benchmark: python -m core.storage.http_cassette {record,replay} SYM [SYM …]
+runs IdeaEngine.generate over the symbols against empty local caches; a
+replay that had to go without any cassette exits non-zero.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from core.models import trading_calendar
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_DIR = Path(__file__).parent / "cache" / "cassettes"
+CLOCK_FILE = "clock.json"        # recording time, pinned during replay
+MODES = ("off", "record", "replay")
+VOLATILE_PARAMS = frozenset({"token", "apikey", "api_key", "key", "crumb", "_"})
+
+
+class Cassette:
+    def __init__(self, directory: Path = CASSETTE_DIR, mode: str = "replay", latency: Optional[float] = None) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', not '{mode}'")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency = latency           # None: sleep the recorded round-trip time
+        self._lock = threading.Lock()
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+
+    # ────────── keys ──────────
+    @staticmethod
+    def request_key(method: str, url: str, params=None, body=None) -> tuple[str, str, str]:
+        """(host, hash, redacted url) for a request."""
+        parts = urlsplit(url)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        if params:
+            query += list(params.items()) if isinstance(params, dict) else list(params)
+        kept = sorted((str(k), str(v)) for k, v in query if str(k).lower() not in VOLATILE_PARAMS)
+        shown = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(kept), ""))
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, sort_keys=True)
+        if isinstance(body, str):
+            body = body.encode()
+        h = hashlib.sha1(f"{method.upper()} {shown}".encode())
+        if body:
+            h.update(b"\0" + bytes(body))
+        return parts.netloc or "local", h.hexdigest(), shown
+
+    # ────────── clock ──────────
+    def save_clock(self, ts: Optional[float] = None) -> None:
+        """Store the recording time (default: now) that replay pins the calendar clock to."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / f"{CLOCK_FILE}.tmp"
+        tmp.write_text(json.dumps({"recorded": time.time() if ts is None else ts}))
+        os.replace(tmp, self.directory / CLOCK_FILE)
+
+    def recorded_clock(self) -> Optional[float]:
+        """Epoch seconds the cassettes were recorded at, or None for an older recording."""
+        try:
+            return float(json.loads((self.directory / CLOCK_FILE).read_text())["recorded"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    # ────────── store ──────────
+    def record(self, method: str, url: str, params, body, resp, elapsed: float) -> None:
+        host, digest, shown = self.request_key(method, url, params, body)
+        entry = {
+            "method": method.upper(), "url": shown, "status": int(resp.status_code),
+            "reason": getattr(resp, "reason", "") or "",
+            "headers": {k: v for k, v in dict(resp.headers).items()
+                        if k.lower() not in ("set-cookie", "content-encoding", "transfer-encoding")},
+            "body": base64.b64encode(resp.content or b"").decode("ascii"),
+            "elapsed": round(elapsed, 4), "recorded": time.time(),
+        }
+        d = self.directory / host
+        d.mkdir(parents=True, exist_ok=True)
+        tmp = d / f"{digest}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps(entry))
+        os.replace(tmp, d / f"{digest}.json")
+        with self._lock:
+            self.stats["recorded"] += 1
+
+    def replay(self, method: str, url: str, params=None, body=None):
+        import requests
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+        host, digest, shown = self.request_key(method, url, params, body)
+        f = self.directory / host / f"{digest}.json"
+        if not f.exists():
+            with self._lock:
+                self.stats["misses"] += 1
+            raise requests.exceptions.ConnectionError(f"No cassette for {method.upper()} {shown}")
+        entry = json.loads(f.read_text())
+        delay = entry.get("elapsed", 0.0) if self.latency is None else self.latency
+        if delay > 0:
+            time.sleep(delay)
+        resp = requests.models.Response()
+        resp.status_code = entry["status"]
+        resp.reason = entry.get("reason", "")
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp._content = base64.b64decode(entry["body"])
+        resp.url = url
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        with self._lock:
+            self.stats["replayed"] += 1
+        return resp
+
+
+# ────────── patching ──────────
+_active: Optional[Cassette] = None
+_originals: list[tuple[object, str, object]] = []
+
+
+def _wrap_request(orig):
+    def request(self, method, url, *args, **kwargs):
+        cas = _active
+        if cas is None:
+            return orig(self, method, url, *args, **kwargs)
+        params = kwargs.get("params", args[0] if args else None)
+        body = kwargs.get("data", args[1] if len(args) > 1 else None) or kwargs.get("json")
+        if cas.mode == "replay":
+            return cas.replay(method, url, params, body)
+        t0 = time.perf_counter()
+        resp = orig(self, method, url, *args, **kwargs)
+        try:
+            cas.record(method, url, params, body, resp, time.perf_counter() - t0)
+        except Exception as e:
+            logger.warning("Could not record %s %s: %s", method, url, e)
+        return resp
+    request.__wrapped__ = orig
+    return request
+
+
+def _wrap_feed_parse(orig):
+    def parse(url_file_stream_or_string, *args, **kwargs):
+        src = url_file_stream_or_string
+        if _active is not None and isinstance(src, str) and src.startswith(("http://", "https://")):
+            import requests
+            try:
+                src = requests.get(src, timeout=20).content
+            except requests.exceptions.RequestException:
+                src = b""  # feedparser's own behaviour on a failed fetch: an empty, bozo feed
+        return orig(src, *args, **kwargs)
+    parse.__wrapped__ = orig
+    return parse
+
+
+def _patch(owner, name: str, replacement) -> None:
+    _originals.append((owner, name, getattr(owner, name)))
+    setattr(owner, name, replacement)
+
+
+def install(mode: str, directory: Path = CASSETTE_DIR, latency: Optional[float] = None) -> Optional[Cassette]:
+    """Route requests / curl_cffi / feedparser through a cassette (mode "off" removes the layer)."""
+    global _active
+    if mode not in MODES:
+        raise ValueError(f"Unknown cassette mode '{mode}' (expected one of {', '.join(MODES)})")
+    uninstall()
+    if mode == "off":
+        return None
+    _active = Cassette(directory, mode, latency)
+    if mode == "record":
+        _active.save_clock()
+    else:
+        ts = _active.recorded_clock()
+        if ts is None:
+            logger.warning("No %s in %s; replaying on today's clock, date-ranged requests may miss",
+                           CLOCK_FILE, _active.directory)
+        trading_calendar.pin_clock(ts)
+
+    import requests
+    _patch(requests.Session, "request", _wrap_request(requests.Session.request))
+    try:
+        from curl_cffi import requests as curl_requests
+        _patch(curl_requests.Session, "request", _wrap_request(curl_requests.Session.request))
+    except ImportError:
+        pass
+    try:
+        import feedparser
+        _patch(feedparser, "parse", _wrap_feed_parse(feedparser.parse))
+    except ImportError:
+        pass
+    logger.info("HTTP cassette layer active: %s (%s)", mode, _active.directory)
+    return _active
+
+
+def uninstall() -> None:
+    global _active
+    while _originals:
+        owner, name, orig = _originals.pop()
+        setattr(owner, name, orig)
+    if _active is not None and _active.mode == "replay":
+        trading_calendar.pin_clock(None)
+    _active = None
+
+
+def active() -> Optional[Cassette]:
+    return _active
+
+
+def install_from_env() -> Optional[Cassette]:
+    mode = os.environ.get("HTTP_CASSETTE_MODE", "off").strip().lower()
+    if mode == "off":
+        return None
+    latency = os.environ.get("HTTP_CASSETTE_LATENCY", "recorded").strip().lower()
+    return install(mode, Path(os.environ.get("HTTP_CASSETTE_DIR", CASSETTE_DIR)),
+                   None if latency == "recorded" else float(latency))
+
+
+# ────────── benchmark ──────────
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    ap = argparse.ArgumentParser(description="Record or replay an IdeaEngine scan over a fixed universe.")
+    ap.add_argument("mode", choices=("record", "replay"))
+    ap.add_argument("symbols", nargs="+")
+    ap.add_argument("--dir", default=str(CASSETTE_DIR))
+    ap.add_argument("--latency", default="recorded", help='"recorded" or seconds per replayed request')
+    opts = ap.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    cas = install(opts.mode, Path(opts.dir), None if opts.latency == "recorded" else float(opts.latency))
+
+    # Empty local caches, so every run makes the same requests
+    from core.engine import market_data_service
+    from core.engine.idea_engine import IdeaEngine
+    from core.storage import market_data
+    from core.storage.bar_store import BarStore
+    from core.storage.idea_cache import IdeaCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        IdeaCache.DB_FILE = Path(tmp) / "ideas.sqlite3"
+        market_data_service.MarketDataService.DB_FILE = str(Path(tmp) / "metrics.sqlite3")
+        market_data._default = market_data.MarketData(store=BarStore(Path(tmp) / "bars"))
+
+        t0 = time.perf_counter()
+        ideas = IdeaEngine().generate([s.upper() for s in opts.symbols])
+        elapsed = time.perf_counter() - t0
+    print(f"{opts.mode}: {len(opts.symbols)} symbols, {len(ideas)} ideas in {elapsed:.2f}s  {cas.stats}")
+    if opts.mode == "replay" and cas.stats["misses"]:
+        # Callers swallow ConnectionError and carry on, so a partial replay would otherwise look like a result
+        raise SystemExit(f"replay incomplete: {cas.stats['misses']} request(s) had no cassette in {cas.directory}")
@@ -8,14 +8,14 @@ from __future__ import annotations
 
 import json
 import sqlite3
-import threading
 import time
 from dataclasses import asdict
 from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, List
 
 from core.models.idea_models import Idea
+from core.storage.sqlite_pool import database
 
 
 class IdeaCache:
@@ -23,43 +23,39 @@ class IdeaCache:
 
     def __init__(self, ttl_sec: int = 900) -> None:
         self.ttl_sec = ttl_sec
-        # allow cross-thread access; protected by _lock
-        self._conn = sqlite3.connect(self.DB_FILE, check_same_thread=False)
-        self._lock = threading.Lock()
-        self._create_table()
+        # per-thread WAL connections; the table is created once, when the first one opens
+        self._db = database(self.DB_FILE, self._create_table)
 
     # ────────── public ──────────
     def read(self, symbol: str) -> List[Idea] | None:
-        key = self._make_key(symbol)
-        with self._lock, self._conn:
-            row = self._conn.execute(
-                "SELECT ts, payload FROM idea_cache WHERE k = ?",
-                (key,),
-            ).fetchone()
+        return self.read_many([symbol]).get(symbol.upper())
 
-        if not row:
-            return None
-        ts, payload = row
-        if time.time() - ts > self.ttl_sec:
-            return None
-        raw = json.loads(payload)
-        return [Idea(**obj) for obj in raw]
+    def read_many(self, symbols: Iterable[str]) -> Dict[str, List[Idea]]:
+        """Fresh cached ideas for several symbols in one query (upper-cased keys; misses absent)."""
+        keys = {self._make_key(s): s.upper() for s in symbols}
+        rows = self._db.query_in("SELECT k, ts, payload FROM idea_cache WHERE k IN ({in})", list(keys))
+        now = time.time()
+        return {keys[k]: [Idea(**obj) for obj in json.loads(payload)]
+                for k, ts, payload in rows if now - ts <= self.ttl_sec}
 
     def write(self, symbol: str, ideas: List[Idea]) -> None:
-        key = self._make_key(symbol)
-        payload = json.dumps([asdict(idea) for idea in ideas])
-        with self._lock, self._conn:
-            self._conn.execute(
+        self.write_many({symbol: ideas})
+
+    def write_many(self, ideas_by_symbol: Dict[str, List[Idea]]) -> None:
+        now = int(time.time())
+        with self._db.transaction() as conn:
+            conn.executemany(
                 "INSERT OR REPLACE INTO idea_cache(k, ts, payload) VALUES (?, ?, ?)",
-                (key, int(time.time()), payload),
+                [(self._make_key(sym), now, json.dumps([asdict(idea) for idea in ideas]))
+                 for sym, ideas in ideas_by_symbol.items()],
             )
 
     # ────────── helpers ──────────
-    def _create_table(self) -> None:
-        with self._lock, self._conn:
-            self._conn.execute(
-                "CREATE TABLE IF NOT EXISTS idea_cache (k TEXT PRIMARY KEY, ts INTEGER, payload TEXT)"
-            )
+    @staticmethod
+    def _create_table(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS idea_cache (k TEXT PRIMARY KEY, ts INTEGER, payload TEXT)"
+        )
 
     @staticmethod
     @lru_cache(maxsize=1024)
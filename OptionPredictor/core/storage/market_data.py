@@ -0,0 +1,528 @@
+# market_data.py
+"""
+Single access point for daily OHLCV history.
+
+Every price consumer (get_prices/get_prices_many, the Monte Carlo loader,
+YahooPriceProvider, the chatbot and the candlestick pane) asks
+MarketData.history() and shares one cache hierarchy:
+
+    RangeCache (LRU)  →  BarStore "1d" memmaps (coverage tracked per symbol)  →  network
+
+Only the trading sessions missing from the store's coverage are downloaded.
+Network access goes through pluggable SourceAdapters (Stooq, yfinance, a local
+CSV directory for offline runs, the synthetic market for load tests), tried in
+order, each with its own retry, exponential backoff and failure cooldown. Fills
+of one symbol run one at a time and re-check the store's coverage first, so
+concurrent requests for overlapping ranges download each session once.
+history_many() fetches a whole universe at once: symbols missing the same range
+share one yfinance call, and Stooq requests run over a small pool of keep-alive
+connections.
+
+Environment:
+    MARKET_DATA_CSV_DIR  directory of SYMBOL.csv files, tried before the network
+    MARKET_DATA_OFFLINE  "1" to use only the CSV directory
+    MARKET_DATA_SYNTHETIC  "1" to use only the synthetic market (bars kept in SYNTHETIC_BAR_DIR)
+"""
+from __future__ import annotations
+
+import datetime as dt
+import io
+import logging
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from core.models import trading_calendar
+from core.models.trading_calendar import missing_ranges
+from core.storage import synthetic_market
+from core.storage.bar_store import BAR_DIR, BarStore, default_bar_store
+from core.storage.range_cache import DEFAULT_MAX_BYTES, RangeCache
+from core.storage.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+PERIOD_DAYS = {
+    "7d": 7, "30d": 30, "1mo": 30, "3mo": 90, "6mo": 180, "1y": 365, "365d": 365,
+    "2y": 730, "5y": 1825, "10y": 3650,
+}
+EARLIEST = dt.date(1970, 1, 1)
+SYNTHETIC_BAR_DIR = BAR_DIR.parent / "synthetic_bars"   # never mixed with real bars
+_FAILED = object()
+
+
+class NoDataError(RuntimeError):
+    """The source answered, but has no rows for the symbol/range (not worth retrying)."""
+
+
+def period_start(period: str, end: dt.date) -> dt.date:
+    """First calendar day of a yfinance-style period ("1y", "6mo", "30d", "ytd", "max") ending at `end`."""
+    if period == "max":
+        return EARLIEST
+    if period == "ytd":
+        return dt.date(end.year, 1, 1)
+    if period in PERIOD_DAYS:
+        return end - dt.timedelta(days=PERIOD_DAYS[period])
+    if period.endswith("d") and period[:-1].isdigit():
+        return end - dt.timedelta(days=int(period[:-1]))
+    raise ValueError(f"Unsupported period '{period}'")
+
+
+def _frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Source output -> OHLCV columns on a sorted, naive DatetimeIndex."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    df = df.rename(columns=lambda c: str(c).strip().title())
+    df = df.loc[:, ~df.columns.duplicated()]
+    if "Close" not in df.columns and "Adj Close" in df.columns:
+        df = df.rename(columns={"Adj Close": "Close"})
+    if "Close" not in df.columns:
+        raise NoDataError("no Close column")
+    out = pd.DataFrame({"Close": pd.to_numeric(df["Close"], errors="coerce").to_numpy()},
+                       index=pd.DatetimeIndex(pd.to_datetime(df.index)))
+    for c in ("Open", "High", "Low"):  # close-only sources get flat bars
+        out[c] = pd.to_numeric(df[c], errors="coerce").to_numpy() if c in df.columns else out["Close"]
+    out["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").to_numpy() if "Volume" in df.columns else float("nan")
+    if out.index.tz is not None:
+        out.index = out.index.tz_localize(None)
+    out = out[OHLCV].dropna(subset=["Close"])
+    return out[~out.index.duplicated(keep="last")].sort_index()
+
+
+# ────────── sources ──────────
+class SourceAdapter:
+    """One network/offline source of daily bars. Subclasses implement _download()."""
+    name = "source"
+    retries = 2           # extra attempts after the first
+    backoff = 1.0         # seconds before the first retry, doubled each time
+    cooldown = 60.0       # skip the source this long after it exhausted its retries
+    parallel = 1          # symbols history_many() fetches concurrently
+
+    def __init__(self) -> None:
+        self._down_until = 0.0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def history(self, symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
+        last_err: Exception | None = None
+        for attempt in range(self.retries + 1):
+            try:
+                df = _frame(single_flight().do((self.name, "history", symbol.upper(), start, end),
+                                               self._download, symbol, start, end))
+                df = df.loc[str(start):str(end)]
+                if df.empty:
+                    raise NoDataError(f"{self.name} returned no rows for {symbol} [{start} to {end}]")
+                return df
+            except NoDataError:
+                raise
+            except Exception as e:
+                last_err = e
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        self._down_until = time.monotonic() + self.cooldown
+        raise RuntimeError(f"{self.name} failed for {symbol}: {last_err}")
+
+    def history_many(self, symbols: list[str], start: dt.date, end: dt.date) -> dict[str, Optional[pd.DataFrame]]:
+        """
+        history() for several symbols: a frame per symbol, None where the source has no data.
+        Symbols that failed are left out so the next source can try them.
+        """
+        def one(sym):
+            if not self.available():
+                return sym, _FAILED
+            try:
+                return sym, self.history(sym, start, end)
+            except NoDataError:
+                return sym, None
+            except Exception as e:
+                logger.warning("%s", e)
+                return sym, _FAILED
+
+        if self.parallel > 1 and len(symbols) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.parallel, len(symbols))) as pool:
+                results = list(pool.map(one, symbols))
+        else:
+            results = [one(sym) for sym in symbols]
+        return {sym: df for sym, df in results if df is not _FAILED}
+
+    def _download(self, symbol: str, start: dt.date, end: dt.date) -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class StooqSource(SourceAdapter):
+    """Stooq CSV endpoint (one symbol per request); batches share a pooled keep-alive session."""
+    name = "stooq"
+    URL = "https://stooq.com/q/d/l/"
+    parallel = 4
+
+    def __init__(self, timeout: float = 15) -> None:
+        super().__init__()
+        self.timeout = timeout
+        self._session = None
+
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            sess = requests.Session()
+            sess.headers["User-Agent"] = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+            sess.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.parallel))
+            self._session = sess
+        return self._session
+
+    @staticmethod
+    def symbol(symbol: str) -> str:
+        s = symbol.lower()
+        return f"{s.replace('.', '-')}.us" if s.replace(".", "").isalpha() and len(s) <= 6 else s
+
+    def _download(self, symbol, start, end):
+        params = {"s": self.symbol(symbol), "d1": start.strftime("%Y%m%d"), "d2": end.strftime("%Y%m%d"), "i": "d"}
+        resp = self.session().get(self.URL, params=params, timeout=self.timeout)
+        resp.raise_for_status()
+        raw = resp.content
+        if raw[:2] == b"PK":  # Stooq sometimes sends a zipped CSV
+            with zipfile.ZipFile(io.BytesIO(raw)) as zf:
+                raw = zf.read(zf.namelist()[0])
+        if not raw.lstrip().startswith(b"Date,"):
+            raise NoDataError(f"Stooq has no data for {symbol}")
+        return pd.read_csv(io.BytesIO(raw), parse_dates=["Date"], index_col="Date")
+
+
+class YFinanceSource(SourceAdapter):
+    name = "yfinance"
+
+    def _download(self, symbol, start, end):
+        import yfinance as yf
+        # auto_adjust=True: split/dividend-adjusted OHLC, consistent with Stooq's series
+        df = yf.download(symbol.replace(".", "-"), start=start.isoformat(),
+                         end=(end + dt.timedelta(days=1)).isoformat(),
+                         interval="1d", auto_adjust=True, progress=False, threads=False)
+        if df is None or df.empty:
+            raise NoDataError(f"yfinance has no data for {symbol}")
+        return df
+
+    def history_many(self, symbols, start, end):
+        """One yf.download call for the whole list; symbols it returns nothing for are retried singly."""
+        if len(symbols) < 2 or not self.available():
+            return super().history_many(symbols, start, end)
+        import yfinance as yf
+        tickers = {sym.replace(".", "-"): sym for sym in symbols}
+        try:
+            raw = yf.download(list(tickers), start=start.isoformat(), end=(end + dt.timedelta(days=1)).isoformat(),
+                              interval="1d", group_by="ticker", auto_adjust=True,
+                              progress=False, threads=True)
+        except Exception as e:
+            logger.warning("yfinance batch download failed: %s", e)
+            raw = None
+        out, retry = {}, []
+        for ticker, sym in tickers.items():
+            try:
+                df = _frame(raw[ticker]).loc[str(start):str(end)]
+            except Exception:  # missing ticker level, no Close column, no batch at all
+                df = None
+            if df is None or df.empty:
+                retry.append(sym)  # a failed ticker and a ticker without data look the same here
+            else:
+                out[sym] = df
+        if retry:
+            out.update(super().history_many(retry, start, end))
+        return out
+
+
+class CSVDirectorySource(SourceAdapter):
+    """Offline source: <directory>/<SYMBOL>.csv with a Date column and OHLC[V] columns."""
+    name = "csv"
+    retries = 0
+    cooldown = 0.0
+
+    def __init__(self, directory: str | Path) -> None:
+        super().__init__()
+        self.directory = Path(directory)
+
+    def _download(self, symbol, start, end):
+        f = self.directory / f"{symbol.upper()}.csv"
+        if not f.exists():
+            raise NoDataError(f"No offline CSV for {symbol} in {self.directory}")
+        df = pd.read_csv(f)
+        date_col = next((c for c in df.columns if str(c).lower() in ("date", "datetime", "timestamp")), df.columns[0])
+        return df.set_index(pd.to_datetime(df.pop(date_col)))
+
+
+class SyntheticSource(SourceAdapter):
+    """Deterministic generated bars for any symbol (see synthetic_market); never fails, so no retries."""
+    name = "synthetic"
+    retries = 0
+    cooldown = 0.0
+
+    def __init__(self, market: Optional[synthetic_market.SyntheticMarket] = None) -> None:
+        super().__init__()
+        self.market = market or synthetic_market.synthetic_market()
+
+    def _download(self, symbol, start, end):
+        df = self.market.history(symbol, start, end)
+        if df.empty:
+            raise NoDataError(f"No synthetic data for {symbol} before {synthetic_market.EPOCH}")
+        return df
+
+    def history_many(self, symbols, start, end):
+        """The whole list is simulated in vectorised chunks rather than symbol by symbol."""
+        return {sym: (df if not df.empty else None)
+                for sym, df in self.market.history_many(symbols, start, end).items()}
+
+
+def default_sources() -> list[SourceAdapter]:
+    if synthetic_market.enabled():
+        return [SyntheticSource()]
+    csv_dir = os.environ.get("MARKET_DATA_CSV_DIR")
+    if os.environ.get("MARKET_DATA_OFFLINE") == "1":
+        return [CSVDirectorySource(csv_dir or Path(__file__).parent / "cache" / "offline")]
+    sources: list[SourceAdapter] = [StooqSource(), YFinanceSource()]
+    if csv_dir:
+        sources.insert(0, CSVDirectorySource(csv_dir))
+    return sources
+
+
+# ────────── service ──────────
+class MarketData:
+    def __init__(self, sources: Optional[list[SourceAdapter]] = None, store: Optional[BarStore] = None,
+                 memory_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.sources = sources if sources is not None else default_sources()
+        self.store = store or default_bar_store()
+        self._memory = RangeCache(memory_bytes)
+        self._fill_locks: dict[str, threading.Lock] = {}
+        self._fill_locks_guard = threading.Lock()
+        self.stats = {"store_hits": 0, "downloads": 0}
+
+    # ────────── public ──────────
+    def history(self, symbol: str, start=None, end=None, period: Optional[str] = None,
+                force_refresh: bool = False, allow_partial: bool = True) -> pd.DataFrame:
+        """
+        Daily OHLCV for symbol over [start, end] (or `period` ending at `end`, default today).
+        Raises RuntimeError if nothing is available locally and every source failed, or –
+        unless allow_partial – if any missing range could not be downloaded.
+        """
+        sym = symbol.strip().upper()
+        end_d = _as_date(end) if end is not None else trading_calendar.current_date()
+        start_d = _as_date(start) if start is not None else period_start(period or "1y", end_d)
+        if start_d > end_d:
+            raise ValueError(f"Start date ({start_d}) after end date ({end_d}).")
+        # Latest session that can exist right now; later days are never "missing"
+        avail_end = min(end_d, trading_calendar.expected_last_session())
+
+        if force_refresh:
+            self._memory.discard(sym)
+        else:
+            hit = self._memory.get(sym, start_d, avail_end)
+            if hit is not None:
+                return hit
+
+        coverage = [] if force_refresh else self.store.coverage(sym).get("ranges", [])
+        gaps = missing_ranges(coverage, start_d, avail_end)
+        errors = []
+        for a, b in gaps:
+            try:
+                self._fill(sym, a, b, recheck=not force_refresh)
+            except Exception as e:
+                errors.append(e)
+                logger.warning("Could not download %s [%s to %s]: %s", sym, a, b, e)
+        if not gaps:
+            self.stats["store_hits"] += 1
+        if errors and not allow_partial:
+            raise RuntimeError(f"Incomplete price data for {sym} [{start_d} to {end_d}]: {errors[-1]}")
+
+        df = self.store.ohlcv(sym, start_d, end_d)
+        if df.empty:
+            raise RuntimeError(f"No price data for {sym} [{start_d} to {end_d}]"
+                               + (f": {errors[-1]}" if errors else ""))
+        df = df.copy()  # detach from the memmaps before caching
+        if not missing_ranges(self.store.coverage(sym)["ranges"], start_d, avail_end):
+            self._memory.put(sym, start_d, avail_end, df)
+        return df
+
+    def close(self, symbol: str, start=None, end=None, period: Optional[str] = None) -> pd.Series:
+        return self.history(symbol, start, end, period)["Close"].rename(symbol.upper())
+
+    def history_many(self, symbols, start=None, end=None, period: Optional[str] = None,
+                     force_refresh: bool = False, allow_partial: bool = True) -> dict[str, pd.DataFrame]:
+        """
+        history() for a list of symbols. Each symbol's missing ranges are resolved from the
+        store first; symbols missing the same range are then downloaded together (one
+        yfinance call per group, pooled Stooq connections for the rest). Symbols with no
+        data at all are left out of the result, and so are symbols with a range that could
+        not be downloaded unless allow_partial.
+        """
+        syms = list(dict.fromkeys(s.strip().upper() for s in symbols))
+        end_d = _as_date(end) if end is not None else trading_calendar.current_date()
+        start_d = _as_date(start) if start is not None else period_start(period or "1y", end_d)
+        if start_d > end_d:
+            raise ValueError(f"Start date ({start_d}) after end date ({end_d}).")
+        avail_end = min(end_d, trading_calendar.expected_last_session())
+
+        out: dict[str, pd.DataFrame] = {}
+        groups: dict[tuple, list[str]] = {}
+        for sym in syms:
+            if force_refresh:
+                self._memory.discard(sym)
+            else:
+                hit = self._memory.get(sym, start_d, avail_end)
+                if hit is not None:
+                    out[sym] = hit
+                    continue
+            coverage = [] if force_refresh else self.store.coverage(sym).get("ranges", [])
+            for a, b in missing_ranges(coverage, start_d, avail_end):
+                if trading_calendar.session_count(a, b) == 0:
+                    self._store(sym, a, b, None)
+                else:
+                    groups.setdefault((a, b), []).append(sym)
+
+        failed: set[str] = set()
+        for (a, b), group in groups.items():
+            failed.update(self._fill_many(group, a, b))
+        if not groups and len(out) < len(syms):
+            self.stats["store_hits"] += 1
+
+        for sym in syms:
+            if sym in out:
+                continue
+            if sym in failed and not allow_partial:
+                logger.warning("Incomplete price data for %s [%s to %s]; left out", sym, start_d, end_d)
+                continue
+            df = self.store.ohlcv(sym, start_d, end_d)
+            if df.empty:
+                logger.warning("No price data for %s [%s to %s]", sym, start_d, end_d)
+                continue
+            out[sym] = df = df.copy()
+            if not missing_ranges(self.store.coverage(sym)["ranges"], start_d, avail_end):
+                self._memory.put(sym, start_d, avail_end, df)
+        return {sym: out[sym] for sym in syms if sym in out}
+
+    def close_many(self, symbols, start=None, end=None, period: Optional[str] = None,
+                   force_refresh: bool = False, allow_partial: bool = True) -> pd.DataFrame:
+        """Close prices as one wide frame (dates × symbols, union calendar, NaN where a symbol has no bar)."""
+        frames = self.history_many(symbols, start, end, period, force_refresh, allow_partial)
+        return pd.DataFrame({sym: df["Close"] for sym, df in frames.items()}).sort_index()
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def memory_stats(self) -> dict:
+        """Size and hit/miss/eviction counters of the in-process range cache."""
+        return self._memory.stats()
+
+    # ────────── internals ──────────
+    def _symbol_lock(self, sym: str) -> threading.Lock:
+        with self._fill_locks_guard:
+            lock = self._fill_locks.get(sym)
+            if lock is None:
+                lock = self._fill_locks[sym] = threading.Lock()
+            return lock
+
+    def _fill(self, sym: str, a: dt.date, b: dt.date, recheck: bool = True) -> None:
+        """
+        Download [a, b] and append it to the store. Fills of one symbol run one at a time,
+        whatever their ranges; a thread that waited re-checks the store's coverage, so it only
+        downloads what the previous fill did not bring in.
+        """
+        with self._symbol_lock(sym):
+            gaps = missing_ranges(self.store.coverage(sym).get("ranges", []), a, b) if recheck else [(a, b)]
+            for ga, gb in gaps:
+                if trading_calendar.session_count(ga, gb) == 0:
+                    self._store(sym, ga, gb, None)
+                else:
+                    self._store(sym, ga, gb, self._download(sym, ga, gb))
+
+    def _fill_many(self, syms: list[str], a: dt.date, b: dt.date) -> list[str]:
+        """
+        Batch version of _fill: each source gets the symbols earlier sources did not deliver.
+        Returns the symbols whose range could not be downloaded (left uncovered).
+        """
+        pending, no_data = list(syms), dict.fromkeys(syms, 0)
+        for src in self.sources:
+            if not pending:
+                break
+            if not src.available():
+                continue
+            got = src.history_many(pending, a, b)
+            for sym, df in got.items():
+                if df is None:
+                    no_data[sym] += 1
+                    continue
+                self.stats["downloads"] += 1
+                with self._symbol_lock(sym):
+                    self._store(sym, a, b, df)
+            pending = [sym for sym in pending if got.get(sym) is None]
+            logger.info("%s batch for [%s to %s]: %d/%d symbols delivered",
+                        src.name, a, b, sum(df is not None for df in got.values()), len(got))
+        failed = []
+        for sym in pending:
+            if no_data[sym] == len(self.sources):
+                with self._symbol_lock(sym):
+                    self._store(sym, a, b, None)  # a real answer: nothing listed in this range
+            else:
+                failed.append(sym)
+        return failed
+
+    def _store(self, sym: str, a: dt.date, b: dt.date, df: Optional[pd.DataFrame]) -> None:
+        """
+        Append downloaded bars (None: none exist) and mark [a, b] as fetched – except that the
+        newest session only counts as fetched once a bar for it arrived: sources may not have
+        published it yet, and covering it empty would leave a hole no later call re-downloads.
+        """
+        covered_to = b
+        if b == trading_calendar.expected_last_session():
+            if df is None or df.empty:
+                covered_to = b - dt.timedelta(days=1)
+            else:
+                covered_to = min(b, df.index.max().date())
+        self.store.append(sym, df if df is not None else pd.DataFrame(columns=OHLCV), "1d",
+                          covered=(a, covered_to))
+
+    def _download(self, sym: str, a: dt.date, b: dt.date) -> Optional[pd.DataFrame]:
+        """First source with data wins. Returns None if every source says there is no data."""
+        errors, no_data = [], 0
+        for src in self.sources:
+            if not src.available():
+                errors.append(f"{src.name}: cooling down")
+                continue
+            try:
+                df = src.history(sym, a, b)
+                self.stats["downloads"] += 1
+                logger.info("%s download succeeded for %s [%s to %s] (%d rows)", src.name, sym, a, b, len(df))
+                return df
+            except NoDataError as e:
+                no_data += 1
+                errors.append(f"{src.name}: {e}")
+            except Exception as e:
+                errors.append(f"{src.name}: {e}")
+        if no_data and no_data == len(self.sources):
+            return None  # a real answer: nothing listed in this range
+        raise RuntimeError("; ".join(errors) or "no sources configured")
+
+
+def _as_date(d) -> dt.date:
+    if isinstance(d, dt.datetime):
+        return d.date()
+    if isinstance(d, dt.date):
+        return d
+    return pd.Timestamp(d).date()
+
+
+_default: Optional[MarketData] = None
+_default_lock = threading.Lock()
+
+
+def market_data() -> MarketData:
+    """Process-wide MarketData instance (created on first use)."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = MarketData(store=BarStore(SYNTHETIC_BAR_DIR) if synthetic_market.enabled() else None)
+        return _default
@@ -0,0 +1,119 @@
+# range_cache.py
+"""
+Bounded, range-aware in-memory cache for daily price series and frames.
+
+One entry per key (usually a symbol) holds a single sorted Series/DataFrame
+together with the date range it is known to be complete for. Any request
+inside that range is answered by a label slice of the stored object (a view,
+no copy), so a one-year entry also serves every month inside it. Storing a
+range that overlaps or touches the entry's range – "touching" judged in
+trading sessions, so Friday and the next Monday are adjacent – extends the
+entry in place; a disjoint range replaces it.
+
+Entries are evicted least-recently-used once their combined size passes
+`max_bytes`. Counters (hits, misses, evictions, merges) are available from
+stats() for diagnostics.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Union
+
+import pandas as pd
+
+from core.models import trading_calendar
+
+Frame = Union[pd.Series, pd.DataFrame]
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _nbytes(obj: Frame) -> int:
+    usage = obj.memory_usage(index=True, deep=False)
+    return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+
+
+def _no_session_between(a: dt.date, b: dt.date) -> bool:
+    """True if there is no trading session strictly between a and b."""
+    return trading_calendar.session_count(a + dt.timedelta(days=1), b - dt.timedelta(days=1)) == 0
+
+
+class RangeCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[Hashable, tuple[dt.date, dt.date, Frame, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.merges = 0
+
+    # ────────── public ──────────
+    def get(self, key: Hashable, start: dt.date, end: dt.date) -> Optional[Frame]:
+        """Slice of the cached data for [start, end], or None unless the whole range is covered."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._contains(entry[0], entry[1], start, end):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2].loc[str(start):str(end)]
+
+    def put(self, key: Hashable, start: dt.date, end: dt.date, data: Frame) -> None:
+        """Record `data` as complete for [start, end], merging with an overlapping or adjacent entry."""
+        if start > end:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[3]
+                o_start, o_end, o_data, _ = old
+                if self._contains(o_start, o_end, start, end):
+                    start, end, data = o_start, o_end, o_data
+                elif (start <= o_end and o_start <= end
+                      or start > o_end and _no_session_between(o_end, start)
+                      or end < o_start and _no_session_between(end, o_start)):
+                    merged = pd.concat([o_data, data])
+                    data = merged[~merged.index.duplicated(keep="last")].sort_index()
+                    start, end = min(start, o_start), max(end, o_end)
+                    self.merges += 1
+            size = _nbytes(data)
+            if size > self.max_bytes:
+                return  # would evict everything else and still not fit
+            self._entries[key] = (start, end, data, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, _, n) = self._entries.popitem(last=False)
+                self._bytes -= n
+                self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[3]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "merges": self.merges}
+
+    # ────────── internals ──────────
+    @staticmethod
+    def _contains(c_start: dt.date, c_end: dt.date, start: dt.date, end: dt.date) -> bool:
+        """[start, end] lies within [c_start, c_end], ignoring non-session days at either end."""
+        if start < c_start and not _no_session_between(start - dt.timedelta(days=1), c_start):
+            return False
+        if end > c_end and not _no_session_between(c_end, end + dt.timedelta(days=1)):
+            return False
+        return True
@@ -0,0 +1,142 @@
+# result_cache.py
+"""
+Content-addressed cache of finished backtests.
+
+A result is keyed by a hash of the strategy config (to_dict() plus the entry
+filters), a fingerprint of the price/vol/benchmark inputs and the engine
+version, so any change to settings, data or simulation logic is a miss. Each
+entry is one pickle (columnar trade log, equity curve, summary, benchmark)
+under CACHE_DIR; reads refresh the file's mtime and writes evict the least
+recently used entries once the directory exceeds its byte budget.
+
+Files are written to a temp name and renamed into place, so sweep workers in
+several processes can share the directory.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent / "cache" / "backtests"
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+EVICT_EVERY = 32          # puts between directory scans
+
+
+def config_payload(config) -> dict:
+    """StrategyConfig.to_dict() plus the fields that change results but are not part of it."""
+    payload = dict(config.to_dict())
+    filters = getattr(config, "filters", None)
+    payload["filters"] = asdict(filters) if is_dataclass(filters) else filters
+    payload["filter_mode"] = getattr(config, "filter_mode", None)
+    return payload
+
+
+class BacktestResultCache:
+    def __init__(self, path: Path = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    # ────────── public ──────────
+    def key(self, config, data_key: str, engine_version: str) -> str:
+        payload = json.dumps(
+            {"config": config_payload(config), "data": data_key, "engine": engine_version},
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def get(self, key: str) -> Optional[dict]:
+        f = self._file(key)
+        try:
+            with open(f, "rb") as fh:
+                entry = pickle.load(fh)
+            os.utime(f)  # LRU: mtime = last use
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning("Dropping unreadable backtest cache entry %s: %s", key, e)
+            self._remove(f)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: dict[str, Any]) -> None:
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(entry, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._file(key))
+        except Exception as e:
+            logger.warning("Could not write backtest cache entry %s: %s", key, e)
+            return
+
+        with self._lock:
+            self._puts += 1
+            due = self._puts % EVICT_EVERY == 1
+        if due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the directory fits max_bytes. Returns files removed."""
+        files = []
+        for e in os.scandir(self.path):
+            if e.name.endswith(".pkl"):
+                try:
+                    st = e.stat()
+                except FileNotFoundError:  # removed by another process
+                    continue
+                files.append((st.st_mtime, st.st_size, e.path))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, f in sorted(files):
+            if total <= self.max_bytes:
+                break
+            self._remove(f)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info("Backtest cache: evicted %d entries (%.1f MB kept)", removed, total / 1e6)
+        return removed
+
+    def clear(self) -> None:
+        for e in os.scandir(self.path):
+            if e.name.endswith((".pkl", ".tmp")):
+                self._remove(e.path)
+
+    # ────────── internals ──────────
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}.pkl"
+
+    @staticmethod
+    def _remove(f) -> None:
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
+
+_default_cache: Optional[BacktestResultCache] = None
+
+
+def default_result_cache() -> BacktestResultCache:
+    """Process-wide cache instance (created on first use)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = BacktestResultCache()
+    return _default_cache
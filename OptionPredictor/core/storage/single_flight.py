@@ -0,0 +1,156 @@
+# single_flight.py
+"""
+Request coalescing for network fetches.
+
+SingleFlight.do(key, fn) runs fn once per key at a time: callers that ask
+for the same (source, endpoint, params) while a call is in flight wait on
+its Future and get the same result (or exception) instead of issuing their
+own request. Successful results are also kept for a short micro-TTL, so a
+burst of identical requests from the dashboard, the idea engine and the
+chart panes costs one network call. Results are shared, not copied – treat
+them as read-only, like the lru_cache'd provider results.
+
+The same key space is shared by threads and asyncio: do_async() awaits an
+in-flight call started from a worker thread and vice versa. stats() reports
+how many calls were executed and how many were saved.
+
+http_get(source, url, params) is the coalesced drop-in for requests.get
+(or any session/module with a compatible .get, e.g. curl_cffi).
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+
+DEFAULT_TTL = 2.0          # seconds a finished result answers identical requests
+
+
+class SingleFlight:
+    def __init__(self, ttl: float = DEFAULT_TTL, max_results: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, Future] = {}
+        self._results: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.executed = 0
+        self.coalesced = 0       # waited on an identical in-flight call
+        self.ttl_hits = 0        # answered from a result finished within the TTL
+
+    # ────────── public ──────────
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """fn(*args, **kwargs), unless an identical call (same key) is running or just finished."""
+        owner, value = self._claim(key)
+        if not owner:
+            return value.result() if isinstance(value, Future) else value
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, value, exc=e)
+            raise
+        self._finish(key, value, result=result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Async do(): coroutine functions are awaited, plain functions run in the default executor."""
+        owner, value = self._claim(key)
+        if not owner:
+            return await asyncio.wrap_future(value) if isinstance(value, Future) else value
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                result = await fn(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+        except BaseException as e:
+            self._finish(key, value, exc=e)
+            raise
+        self._finish(key, value, result=result)
+        return result
+
+    def forget(self, key: Optional[Hashable] = None) -> None:
+        """Drop the finished result for key (all results if None); in-flight calls are unaffected."""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced, "ttl_hits": self.ttl_hits,
+                    "saved": self.coalesced + self.ttl_hits, "in_flight": len(self._inflight)}
+
+    # ────────── internals ──────────
+    def _claim(self, key: Hashable) -> tuple[bool, Any]:
+        """(True, new Future) for the caller that must run the call, else (False, Future or result)."""
+        with self._lock:
+            hit = self._results.get(key)
+            if hit is not None:
+                if hit[0] > time.monotonic():
+                    self.ttl_hits += 1
+                    return False, hit[1]
+                del self._results[key]
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                return False, fut
+            fut = self._inflight[key] = Future()
+            self.executed += 1
+            return True, fut
+
+    def _finish(self, key: Hashable, fut: Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            if exc is None and self.ttl > 0:
+                self._results[key] = (time.monotonic() + self.ttl, result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+        if exc is None:
+            fut.set_result(result)
+        else:
+            fut.set_exception(exc)
+
+
+def _freeze(params) -> Hashable:
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in params.items()))
+    if isinstance(params, (list, tuple)):
+        return tuple(_freeze(v) for v in params)
+    return params
+
+
+_default: Optional[SingleFlight] = None
+_default_lock = threading.Lock()
+
+
+def single_flight() -> SingleFlight:
+    """Process-wide SingleFlight shared by every data source."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SingleFlight()
+        return _default
+
+
+def http_get(source: str, url: str, params=None, session=None, **kwargs):
+    """
+    Coalesced GET: concurrent identical requests share one response. `session` is
+    anything with a requests-style .get (a requests/curl_cffi Session or module).
+    """
+    if session is None:
+        import requests as session
+
+    def fetch():
+        resp = session.get(url, params=params, **kwargs)
+        resp.content  # read the body once, before the response is shared
+        return resp
+
+    return single_flight().do((source, "GET", url, _freeze(params)), fetch)
@@ -0,0 +1,126 @@
+# sqlite_pool.py
+"""
+Shared SQLite connections for the local caches (the market-metrics cache,
+the idea cache).
+
+database(path, migrate) returns one SQLiteDB per file. Each thread gets its
+own long-lived connection to it, opened with
+
+    journal_mode=WAL      readers never block the writer and vice versa
+    synchronous=NORMAL    fsync at checkpoints only (safe with WAL)
+    cache_size / mmap     a 16 MB page cache and 256 MB of memory-mapped I/O
+    busy_timeout          writers wait for the lock instead of raising
+                          "database is locked"
+
+and the schema migration runs once per file per process, on first open,
+instead of a CREATE TABLE IF NOT EXISTS before every query. Writes go through
+transaction(), which takes the write lock up front (BEGIN IMMEDIATE) so two
+threads upgrading read transactions cannot deadlock each other.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",        # KiB
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+BUSY_TIMEOUT = 30.0                    # seconds a writer waits for the lock
+MAX_VARS = 900                         # stay under SQLITE_MAX_VARIABLE_NUMBER on old builds
+
+
+class SQLiteDB:
+    def __init__(self, path: Path, migrate: Optional[Callable[[sqlite3.Connection], None]] = None) -> None:
+        self.path = Path(path)
+        self._migrate = migrate
+        self._migrated = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    # ────────── public ──────────
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection (opened, tuned and migrated on first use)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    def query(self, sql: str, params=()) -> list[tuple]:
+        return self.conn().execute(sql, params).fetchall()
+
+    def query_in(self, sql: str, keys, params=()) -> list[tuple]:
+        """
+        Run `sql` (containing one "{in}" placeholder for an IN list) for all `keys`,
+        in chunks small enough for the bound-variable limit.
+        """
+        keys, rows = list(keys), []
+        for i in range(0, len(keys), MAX_VARS):
+            chunk = keys[i:i + MAX_VARS]
+            rows += self.conn().execute(sql.format(**{"in": ",".join("?" * len(chunk))}),
+                                        (*chunk, *params)).fetchall()
+        return rows
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction: BEGIN IMMEDIATE, commit on success, roll back on error."""
+        conn = self.conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def close(self) -> None:
+        """Close this thread's connection (others close when their thread ends)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+    # ────────── internals ──────────
+    def _open(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: no implicit transactions, so plain reads never hold a lock
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            if not self._migrated:
+                if self._migrate is not None:
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        self._migrate(conn)
+                    except BaseException:
+                        conn.rollback()
+                        conn.close()
+                        raise
+                    conn.commit()
+                self._migrated = True
+        return conn
+
+
+_databases: dict[Path, SQLiteDB] = {}
+_databases_lock = threading.Lock()
+
+
+def database(path, migrate: Optional[Callable[[sqlite3.Connection], None]] = None) -> SQLiteDB:
+    """The process-wide SQLiteDB for `path`; `migrate` is only used by the first caller."""
+    key = Path(path).resolve()
+    with _databases_lock:
+        db = _databases.get(key)
+        if db is None:
+            db = _databases[key] = SQLiteDB(key, migrate)
+        return db
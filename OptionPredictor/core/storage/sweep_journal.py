@@ -0,0 +1,201 @@
+# sweep_journal.py
+"""
+Crash-safe journal for BatchRunner sweeps.
+
+One SQLite file (WAL mode) holds every sweep, keyed by a hash of the strategy
+config, the parameter grid / search settings and a fingerprint of the price
+data. Finished rows are appended in small batches as workers return, so an
+exit, crash or cancel loses at most one batch. Re-running the same sweep picks
+up the journal and only evaluates the combinations that are still missing.
+
+A sweep the user declined to resume is marked abandoned (it is no longer
+offered, but its rows still serve an identical re-run). Every open prunes
+finished and abandoned sweeps after FINISHED_TTL and any sweep untouched for
+STALE_TTL, so the file does not grow without bound.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATH = Path(__file__).parent / "cache" / "sweep_journal.sqlite3"
+FINISHED_TTL = 7 * 86400      # seconds a finished/abandoned sweep is kept
+STALE_TTL = 30 * 86400        # seconds an untouched sweep of any status is kept
+
+
+# ────────── keys & fingerprints ──────────
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, (np.integer,)):
+        return int(v)
+    if isinstance(v, (np.floating,)):
+        return float(v)
+    return str(v)
+
+
+def combo_key(overrides: dict) -> str:
+    """Stable text key for one grid point (numpy scalars and python numbers hash the same)."""
+    return json.dumps(overrides, sort_keys=True, default=_jsonable)
+
+
+def sweep_key(base_cfg, sweep_params: dict, fingerprint: str, extra: Optional[dict] = None) -> str:
+    """Content hash identifying a sweep: config + grid (+ search settings) + data."""
+    cfg = asdict(base_cfg) if is_dataclass(base_cfg) else dict(base_cfg)
+    payload = json.dumps(
+        {"config": cfg, "grid": sweep_params, "extra": extra or {}, "data": fingerprint},
+        sort_keys=True, default=_jsonable,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+# ────────── journal ──────────
+class SweepJournal:
+    """
+    Append-only store of finished sweep rows for one sweep key.
+    Writes are buffered and committed every `flush_every` rows or `flush_sec` seconds.
+    """
+    def __init__(self, key: str, path: Path = JOURNAL_PATH, flush_every: int = 64, flush_sec: float = 2.0) -> None:
+        self.key = key
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_sec = flush_sec
+        self._buffer: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = _connect(self.path)
+
+    # ────────── public ──────────
+    def open(self, base_cfg, sweep_params: dict, total: int, search: Optional[dict] = None) -> None:
+        """Register the sweep (no-op if it already exists, e.g. on resume). `search` holds the BatchRunner search options."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sweeps(k, created, updated, underlying, total, status, search, grid, config) "
+                "VALUES (?, ?, ?, ?, ?, 'running', ?, ?, ?)",
+                (self.key, now, now, getattr(base_cfg, "underlying", ""), int(total), json.dumps(search or {"search": "grid"}),
+                 json.dumps(sweep_params, default=_jsonable), pickle.dumps(base_cfg, protocol=pickle.HIGHEST_PROTOCOL)),
+            )
+            self._conn.execute("UPDATE sweeps SET status = 'running', updated = ? WHERE k = ?", (now, self.key))
+
+    def completed(self) -> Dict[str, dict]:
+        """combo_key → stored result row for everything already journaled."""
+        with self._lock:
+            rows = self._conn.execute("SELECT combo, row FROM sweep_rows WHERE k = ?", (self.key,)).fetchall()
+        return {combo: json.loads(row) for combo, row in rows}
+
+    def append(self, overrides: dict, row: dict) -> None:
+        self._buffer.append((self.key, combo_key(overrides), json.dumps(row, default=_jsonable)))
+        if len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_sec:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO sweep_rows(k, combo, row) VALUES (?, ?, ?)", batch)
+            self._conn.execute("UPDATE sweeps SET updated = ? WHERE k = ?", (time.time(), self.key))
+        self._last_flush = time.monotonic()
+
+    def mark_finished(self) -> None:
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE sweeps SET status = 'finished', updated = ? WHERE k = ?", (time.time(), self.key))
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+
+    # ────────── listing ──────────
+    @staticmethod
+    def list_unfinished(path: Path = JOURNAL_PATH) -> List[dict]:
+        """Metadata for sweeps that were started but never marked finished, newest first."""
+        if not Path(path).exists():
+            return []
+        conn = _connect(path)
+        try:
+            rows = conn.execute(
+                "SELECT s.k, s.updated, s.underlying, s.total, s.search, s.grid, s.config, "
+                "(SELECT COUNT(*) FROM sweep_rows r WHERE r.k = s.k) "
+                "FROM sweeps s WHERE s.status = 'running' ORDER BY s.updated DESC"
+            ).fetchall()
+        finally:
+            conn.close()
+
+        out = []
+        for k, updated, underlying, total, search, grid, config, done in rows:
+            try:
+                cfg = pickle.loads(config)
+            except Exception:
+                logger.warning("Skipping unreadable sweep journal entry %s", k)
+                continue
+            out.append({
+                "key": k, "updated": updated, "underlying": underlying, "total": total,
+                "done": done, "search": json.loads(search), "grid": json.loads(grid), "config": cfg,
+            })
+        return out
+
+    @staticmethod
+    def abandon(keys: Iterable[str], path: Path = JOURNAL_PATH) -> None:
+        """Stop offering these sweeps for resume; their rows are kept until pruned."""
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.executemany("UPDATE sweeps SET status = 'abandoned', updated = ? WHERE k = ?",
+                                 [(time.time(), k) for k in keys])
+        finally:
+            conn.close()
+
+    @staticmethod
+    def discard(keys: Iterable[str], path: Path = JOURNAL_PATH) -> None:
+        conn = _connect(path)
+        try:
+            with conn:
+                for k in keys:
+                    conn.execute("DELETE FROM sweep_rows WHERE k = ?", (k,))
+                    conn.execute("DELETE FROM sweeps WHERE k = ?", (k,))
+        finally:
+            conn.close()
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sweeps (k TEXT PRIMARY KEY, created REAL, updated REAL, underlying TEXT, "
+        "total INTEGER, status TEXT, search TEXT, grid TEXT, config BLOB)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sweep_rows (k TEXT, combo TEXT, row TEXT, PRIMARY KEY (k, combo))"
+    )
+    _prune(conn)
+    return conn
+
+
+def _prune(conn: sqlite3.Connection) -> None:
+    now = time.time()
+    with conn:
+        stale = [k for (k,) in conn.execute(
+            "SELECT k FROM sweeps WHERE (status != 'running' AND updated < ?) OR updated < ?",
+            (now - FINISHED_TTL, now - STALE_TTL),
+        )]
+        for k in stale:
+            conn.execute("DELETE FROM sweep_rows WHERE k = ?", (k,))
+            conn.execute("DELETE FROM sweeps WHERE k = ?", (k,))
+    if stale:
+        logger.info("Pruned %d old sweeps from the journal", len(stale))
@@ -0,0 +1,382 @@
+# synthetic_market.py
+"""
+Deterministic synthetic market: an offline stand-in for every market-data
+source, for load tests and scaling benchmarks.
+
+Any symbol gets a reproducible daily OHLCV history. Its parameters and random
+draws are seeded from blake2b(seed:symbol), and its path always starts at
+EPOCH and steps over the NYSE sessions from trading_calendar. A later end date
+therefore extends a series without changing its past bars. Each daily step uses:
+
+    Heston variance    mean-reverting, vol-of-vol xi, correlated (rho) with returns
+    Poisson jumps      a few per year, negatively biased
+    regime switches    a two-state Markov chain; "stress" multiplies variance
+                       and adds a negative drift
+    earnings gaps      every EARNINGS_EVERY sessions from a per-symbol offset,
+                       applied at the open
+
+Option chains on any session are priced off the same state. Each expiry's ATM
+vol is the Heston expected average variance to expiry plus the variance of the
+earnings gaps before it. A per-symbol skew and smile in normalised moneyness
+ln(K/F)/(atm·√T) shape the rest of the surface, so it is consistent across
+strikes, expiries and days. Earnings dates come from the same schedule as the
+gaps.
+
+The universe is SYN00000 … SYN<n-1>, with a configurable size; any other
+ticker works the same way. Paths are simulated for many symbols at once, in
+chunks, and the most recent ones are kept in memory.
+
+Environment:
+    MARKET_DATA_SYNTHETIC           "1" routes get_prices, MarketData and the providers here
+    MARKET_DATA_SYNTHETIC_SEED      global seed (default 0)
+    MARKET_DATA_SYNTHETIC_UNIVERSE  universe size (default DEFAULT_UNIVERSE)
+
+Benchmark: python -m core.storage.synthetic_market [N] [--years Y]
+"""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from core.models import trading_calendar
+
+logger = logging.getLogger(__name__)
+
+EPOCH = dt.date(2005, 1, 3)    # first simulated session
+DT = 1.0 / 252
+EARNINGS_EVERY = 63            # sessions between reports (quarterly)
+RISK_FREE = 0.04
+DEFAULT_UNIVERSE = 5000
+PREFIX = "SYN"
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+CHAIN_COLUMNS = ["expiration", "strike", "option_type", "bid", "ask", "iv", "delta"]
+
+
+def enabled() -> bool:
+    return os.environ.get("MARKET_DATA_SYNTHETIC") == "1"
+
+
+@dataclass(frozen=True)
+class SymbolParams:
+    s0: float                 # price before EPOCH
+    mu: float                 # annual drift
+    kappa: float              # variance mean reversion
+    theta: float              # long-run variance
+    xi: float                 # vol of variance
+    rho: float                # return/variance correlation
+    v0: float
+    jump_rate: float          # jumps per year
+    jump_mean: float
+    jump_std: float
+    calm_to_stress: float     # daily regime transition probabilities
+    stress_to_calm: float
+    stress_var: float         # variance multiplier in stress
+    stress_drift: float       # extra annual drift in stress
+    earnings_offset: int      # first report session after EPOCH
+    earnings_std: float       # std of the earnings gap
+    volume: float             # typical daily share volume
+    skew: float               # IV slope per unit of normalised moneyness
+    smile: float              # IV curvature
+    vol_premium: float        # implied / expected realised vol
+
+
+def _as_date(d) -> dt.date:
+    if isinstance(d, dt.datetime):
+        return d.date()
+    if isinstance(d, dt.date):
+        return d
+    return pd.Timestamp(d).date()
+
+
+def _third_friday(year: int, month: int) -> dt.date:
+    first = dt.date(year, month, 1)
+    return first + dt.timedelta(days=(4 - first.weekday()) % 7 + 14)
+
+
+def _strike_step(spot: float) -> float:
+    for limit, step in ((25, 0.5), (100, 1.0), (250, 2.5), (1000, 5.0)):
+        if spot < limit:
+            return step
+    return 10.0
+
+
+class SyntheticMarket:
+    def __init__(self, seed: int = 0, universe_size: int = DEFAULT_UNIVERSE,
+                 chunk: int = 128, max_paths: int = 256) -> None:
+        self.seed = int(seed)
+        self.universe_size = int(universe_size)
+        self.chunk = chunk                  # symbols simulated together
+        self.max_paths = max_paths          # full paths kept in memory (LRU)
+        self._params: dict[str, SymbolParams] = {}
+        self._paths: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"simulated": 0, "path_hits": 0}
+
+    # ────────── universe ──────────
+    def universe(self) -> list[str]:
+        width = max(5, len(str(self.universe_size - 1)))
+        return [f"{PREFIX}{i:0{width}d}" for i in range(self.universe_size)]
+
+    def params(self, symbol: str) -> SymbolParams:
+        sym = symbol.strip().upper()
+        p = self._params.get(sym)
+        if p is None:
+            rng = np.random.default_rng([self._key(sym), 0])
+            theta = rng.uniform(0.15, 0.55) ** 2
+            p = SymbolParams(
+                s0=float(np.exp(rng.uniform(np.log(10), np.log(500)))),
+                mu=rng.normal(0.07, 0.05),
+                kappa=rng.uniform(1.0, 5.0),
+                theta=theta,
+                xi=rng.uniform(0.2, 0.8),
+                rho=rng.uniform(-0.8, -0.3),
+                v0=theta * rng.uniform(0.6, 1.5),
+                jump_rate=rng.uniform(0.5, 4.0),
+                jump_mean=rng.normal(-0.02, 0.01),
+                jump_std=rng.uniform(0.02, 0.06),
+                calm_to_stress=rng.uniform(0.002, 0.01),
+                stress_to_calm=rng.uniform(0.02, 0.08),
+                stress_var=rng.uniform(2.0, 4.0),
+                stress_drift=-rng.uniform(0.1, 0.4),
+                earnings_offset=int(rng.integers(0, EARNINGS_EVERY)),
+                earnings_std=rng.uniform(0.03, 0.09),
+                volume=float(np.exp(rng.uniform(np.log(2e5), np.log(5e7)))),
+                skew=-rng.uniform(0.08, 0.25),
+                smile=rng.uniform(0.02, 0.08),
+                vol_premium=rng.uniform(1.0, 1.2),
+            )
+            self._params[sym] = p
+        return p
+
+    # ────────── prices ──────────
+    def history(self, symbol: str, start, end) -> pd.DataFrame:
+        """Daily OHLCV for symbol over [start, end] (empty before EPOCH)."""
+        return self.history_many([symbol], start, end)[symbol.strip().upper()]
+
+    def history_many(self, symbols, start, end) -> dict[str, pd.DataFrame]:
+        """history() for several symbols; paths not in memory are simulated together, a chunk at a time."""
+        start, end = _as_date(start), _as_date(end)
+        out = {}
+        for sym, path in self._paths_for([s.strip().upper() for s in symbols], end):
+            out[sym] = path.loc[str(start):str(end), OHLCV].copy()
+        return out
+
+    def earnings_dates(self, symbol: str, start, end) -> pd.DatetimeIndex:
+        """Report sessions in [start, end] – the same schedule that gaps the price path."""
+        start, end = _as_date(start), _as_date(end)
+        days = trading_calendar.sessions(EPOCH, end)
+        reports = days[self.params(symbol).earnings_offset::EARNINGS_EVERY]
+        return reports[reports >= pd.Timestamp(start)]
+
+    # ────────── options ──────────
+    def option_chain(self, symbol: str, date, expiries: int = 4) -> pd.DataFrame:
+        """
+        Calls and puts for the next `expiries` monthly expirations, strikes ±30% of spot,
+        priced with Black-Scholes on the symbol's IV surface as of the session on/before `date`.
+        """
+        sym = symbol.strip().upper()
+        day, spot, var = self._state(sym, date)
+        p = self.params(sym)
+        exps = self._expirations(day, expiries)
+        reports = self.earnings_dates(sym, day + dt.timedelta(days=1), exps[-1])
+        step = _strike_step(spot)
+        strikes = np.arange(np.ceil(0.7 * spot / step), np.floor(1.3 * spot / step) + 1) * step
+
+        frames = []
+        for exp in exps:
+            T = max((exp - day).days, 1) / 365.0
+            iv = self._implied_vol(p, var, T, int((reports <= pd.Timestamp(exp)).sum()), spot, strikes)
+            sd = iv * np.sqrt(T)
+            d1 = (np.log(spot / strikes) + (RISK_FREE + 0.5 * iv ** 2) * T) / sd
+            d2 = d1 - sd
+            disc = strikes * np.exp(-RISK_FREE * T)
+            for kind, mid, delta in (
+                ("call", spot * norm.cdf(d1) - disc * norm.cdf(d2), norm.cdf(d1)),
+                ("put", disc * norm.cdf(-d2) - spot * norm.cdf(-d1), norm.cdf(d1) - 1.0),
+            ):
+                half = 0.01 + 0.015 * mid
+                frames.append(pd.DataFrame({
+                    "expiration": exp, "strike": strikes, "option_type": kind,
+                    "bid": np.maximum(mid - half, 0.0).round(2), "ask": (mid + half).round(2),
+                    "iv": iv.round(4), "delta": delta.round(4),
+                }))
+        return pd.concat(frames, ignore_index=True)[CHAIN_COLUMNS]
+
+    def earnings_info(self, symbol: str, today=None) -> dict:
+        """Next report date, days until it and the straddle-implied move, shaped like YfinanceEarningsProvider.fetch."""
+        sym = symbol.strip().upper()
+        today = _as_date(today) if today is not None else dt.date.today()
+        nxt = self.earnings_dates(sym, today + dt.timedelta(days=1), today + dt.timedelta(days=200))[0].date()
+        chain = self.option_chain(sym, today)
+        _, spot, _ = self._state(sym, today)
+        exp = chain.loc[chain["expiration"] >= nxt, "expiration"].min()
+        move = None
+        if pd.notna(exp):
+            at_exp = chain[chain["expiration"] == exp]
+            atm = at_exp.loc[(at_exp["strike"] - spot).abs().idxmin(), "strike"]
+            legs = at_exp[at_exp["strike"] == atm]
+            move = round(float(((legs["bid"] + legs["ask"]) / 2).sum() / spot * 100), 2)
+        return {"date": nxt.isoformat(), "days_until": (nxt - today).days, "expected_move_pct": move}
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._paths.clear()
+
+    # ────────── internals ──────────
+    def _key(self, symbol: str) -> int:
+        return int.from_bytes(hashlib.blake2b(f"{self.seed}:{symbol}".encode(), digest_size=8).digest(), "little")
+
+    def _state(self, sym: str, date) -> tuple[dt.date, float, float]:
+        """(session on/before date, close, effective variance after that close)."""
+        day = trading_calendar.previous_session(_as_date(date))
+        path = dict(self._paths_for([sym], day))[sym].loc[:str(day)]
+        if path.empty:
+            raise ValueError(f"No synthetic data for {sym} before {EPOCH}")
+        return path.index[-1].date(), float(path["Close"].iloc[-1]), float(path["Variance"].iloc[-1])
+
+    @staticmethod
+    def _expirations(day: dt.date, n: int) -> list[dt.date]:
+        out, y, m = [], day.year, day.month
+        while len(out) < n:
+            exp = trading_calendar.previous_session(_third_friday(y, m))  # Good Friday moves to Thursday
+            if exp > day:
+                out.append(exp)
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        return out
+
+    @staticmethod
+    def _implied_vol(p: SymbolParams, var: float, T: float, reports: int, spot: float,
+                     strikes: np.ndarray) -> np.ndarray:
+        # Heston: E[(1/T)∫v dt] = theta + (v - theta)(1 - e^{-kappa T}) / (kappa T)
+        avg = p.theta + (var - p.theta) * (1 - np.exp(-p.kappa * T)) / (p.kappa * T)
+        atm = p.vol_premium * np.sqrt(avg + reports * p.earnings_std ** 2 / T)
+        x = np.log(strikes / (spot * np.exp(RISK_FREE * T))) / (atm * np.sqrt(T))
+        return atm * np.maximum(0.5, 1 + p.skew * x + p.smile * x ** 2)
+
+    def _paths_for(self, syms: list[str], end: dt.date):
+        """Yield (symbol, full path through at least `end`), simulating missing ones in chunks."""
+        last = pd.Timestamp(trading_calendar.previous_session(end)) if end >= EPOCH else None
+        todo = []
+        for sym in dict.fromkeys(syms):
+            with self._lock:
+                path = self._paths.get(sym)
+                hit = path is not None and (last is None or path.index[-1] >= last)
+                if hit:
+                    self._paths.move_to_end(sym)
+                    self.stats["path_hits"] += 1
+            if hit:
+                yield sym, path
+            else:
+                todo.append(sym)
+        if not todo:
+            return
+        # Simulate through the latest published session, so later requests reuse the paths
+        horizon = max(end, trading_calendar.expected_last_session())
+        days = trading_calendar.sessions(EPOCH, horizon)
+        for i in range(0, len(todo), self.chunk):
+            paths = self._simulate(todo[i:i + self.chunk], days)
+            logger.debug("Simulated %d synthetic paths through %s", len(paths), horizon)
+            with self._lock:
+                for sym, path in paths.items():
+                    self._paths[sym] = path
+                    self._paths.move_to_end(sym)
+                while len(self._paths) > self.max_paths:
+                    self._paths.popitem(last=False)
+            yield from paths.items()
+
+    def _simulate(self, syms: list[str], days: pd.DatetimeIndex) -> dict[str, pd.DataFrame]:
+        n, k = len(days), len(syms)
+        ps = [self.params(s) for s in syms]
+        c = {f.name: np.array([getattr(p, f.name) for p in ps], dtype=float) for f in fields(SymbolParams)}
+        # Separate streams for normals and uniforms: a longer path draws a superset of a shorter one
+        z = np.empty((n, k, 8))
+        u = np.empty((n, k, 2))
+        for j, sym in enumerate(syms):
+            key = self._key(sym)
+            z[:, j] = np.random.default_rng([key, 1]).standard_normal((n, 8))
+            u[:, j] = np.random.default_rng([key, 2]).random((n, 2))
+
+        rho_c = np.sqrt(1 - c["rho"] ** 2)
+        log_s, v, stress = np.log(c["s0"]), c["v0"].copy(), np.zeros(k, dtype=bool)
+        o_, h_, l_, c_, vol_, var_ = (np.empty((n, k)) for _ in range(6))
+        for t in range(n):
+            zt, ut = z[t], u[t]
+            stress = np.where(stress, ut[:, 0] >= c["stress_to_calm"], ut[:, 0] < c["calm_to_stress"])
+            vp = np.maximum(v, 0.0)  # full truncation
+            var = vp * np.where(stress, c["stress_var"], 1.0)
+            sd = np.sqrt(var * DT)
+            report = (t - c["earnings_offset"]) % EARNINGS_EVERY == 0
+            jump = np.where(ut[:, 1] < c["jump_rate"] * DT, c["jump_mean"] + c["jump_std"] * zt[:, 2], 0.0)
+            gap = 0.3 * sd * zt[:, 3] + jump + np.where(report, c["earnings_std"] * zt[:, 4], 0.0)
+            drift = (c["mu"] + np.where(stress, c["stress_drift"], 0.0) - 0.5 * var) * DT
+            op = log_s + gap
+            log_s = op + drift + 0.95 * sd * zt[:, 0]
+            v = v + c["kappa"] * (c["theta"] - vp) * DT + c["xi"] * np.sqrt(vp * DT) * (
+                c["rho"] * zt[:, 0] + rho_c * zt[:, 1])
+
+            o_[t], c_[t] = op, log_s
+            h_[t] = np.maximum(op, log_s) + 0.5 * sd * np.abs(zt[:, 5])
+            l_[t] = np.minimum(op, log_s) - 0.5 * sd * np.abs(zt[:, 6])
+            surprise = np.abs(log_s - op - drift) / np.maximum(sd, 1e-9)
+            vol_[t] = c["volume"] * np.exp(0.25 * zt[:, 7]) * (1 + 0.5 * surprise) * np.where(report, 3.0, 1.0)
+            var_[t] = np.maximum(v, 0.0) * np.where(stress, c["stress_var"], 1.0)
+
+        self.stats["simulated"] += k
+        out = {}
+        for j, sym in enumerate(syms):
+            out[sym] = pd.DataFrame({
+                "Open": np.exp(o_[:, j]).round(2), "High": np.exp(h_[:, j]).round(2),
+                "Low": np.exp(l_[:, j]).round(2), "Close": np.exp(c_[:, j]).round(2),
+                "Volume": vol_[:, j].round(), "Variance": var_[:, j],
+            }, index=days)
+        return out
+
+
+_default: Optional[SyntheticMarket] = None
+_default_lock = threading.Lock()
+
+
+def synthetic_market() -> SyntheticMarket:
+    """Process-wide SyntheticMarket, configured from the environment."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SyntheticMarket(seed=int(os.environ.get("MARKET_DATA_SYNTHETIC_SEED", 0)),
+                                       universe_size=int(os.environ.get("MARKET_DATA_SYNTHETIC_UNIVERSE",
+                                                                        DEFAULT_UNIVERSE)))
+        return _default
+
+
+# ────────── benchmark ──────────
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description="Generate a synthetic universe and time it.")
+    ap.add_argument("size", nargs="?", type=int, default=DEFAULT_UNIVERSE)
+    ap.add_argument("--years", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=0)
+    opts = ap.parse_args()
+
+    market = SyntheticMarket(seed=opts.seed, universe_size=opts.size)
+    end = trading_calendar.expected_last_session()
+    start = end - dt.timedelta(days=int(365 * opts.years))
+    syms = market.universe()
+
+    t0 = time.perf_counter()
+    bars = sum(len(df) for df in market.history_many(syms, start, end).values())
+    t1 = time.perf_counter()
+    chain = market.option_chain(syms[0], end)
+    t2 = time.perf_counter()
+    print(f"{len(syms)} symbols, {bars} bars in {t1 - t0:.2f}s ({len(syms) / (t1 - t0):.0f} symbols/s); "
+          f"{syms[0]} chain: {len(chain)} contracts in {(t2 - t1) * 1000:.1f} ms")
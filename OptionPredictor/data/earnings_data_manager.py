@@ -7,6 +7,8 @@ import logging
 import yfinance as yf
 from functools import lru_cache
 
+from core.storage.single_flight import http_get
+
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
@@ -32,8 +34,8 @@ class EarningsDataManager:
     def _av_json(self, params_tuple): # Changed parameter name to indicate it's a tuple
         """tiny helper that returns json or None (never raises)."""
         try:
-            # Convert the tuple back to a dictionary before passing to requests.get
-            r = requests.get(self.base_url, params=dict(params_tuple), timeout=10)
+            # Convert the tuple back to a dictionary for the (coalesced) GET
+            r = http_get("alphavantage", self.base_url, params=dict(params_tuple), timeout=10)
             r.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
             if not r.text.strip():
                 return None
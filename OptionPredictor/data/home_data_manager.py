@@ -3,6 +3,10 @@ import requests
 import logging
 import nltk
 
+from core.storage.single_flight import http_get, single_flight
+
+SPY_RSS = "https://feeds.finance.yahoo.com/rss/2.0/headline?s=SPY&region=US&lang=en-US"
+
 
 class HomeDataManager:
     """Centralised, lightweight fetchers for the dashboard."""
@@ -16,7 +20,8 @@ class HomeDataManager:
         """
         try:
             import yfinance as yf
-            h = yf.Ticker(ticker).history(period="1d", auto_adjust=False)
+            h = single_flight().do(("yfinance", "history", ticker, "1d"),
+                                   lambda: yf.Ticker(ticker).history(period="1d", auto_adjust=False))
             return float(h["Close"].iloc[-1])
         except Exception:
             return None
@@ -78,7 +83,7 @@ class HomeDataManager:
         }
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_get("cnn", url, headers=headers, timeout=10)
             response.raise_for_status()
             data = response.json()
             # The structure of the data is {'fear_and_greed': {'score': ...}}
@@ -141,9 +146,7 @@ class HomeDataManager:
         if not rows:
             try:
                 import feedparser
-                rss = feedparser.parse(
-                    "https://feeds.finance.yahoo.com/rss/2.0/headline?s=SPY&region=US&lang=en-US"
-                )
+                rss = single_flight().do(("yahoo_rss", SPY_RSS), feedparser.parse, SPY_RSS)
                 for entry in rss.entries:
                     ts = time.mktime(getattr(entry, "published_parsed", time.gmtime(0)))
                     if ts >= cutoff_ts:
@@ -163,9 +166,7 @@ class HomeDataManager:
                 pass
             try:
                 import feedparser, time as _t
-                rss2 = feedparser.parse(
-                    "https://feeds.finance.yahoo.com/rss/2.0/headline?s=SPY&region=US&lang=en-US"
-                ).entries
+                rss2 = single_flight().do(("yahoo_rss", SPY_RSS), feedparser.parse, SPY_RSS).entries
                 leftovers += rss2
             except Exception:
                 pass
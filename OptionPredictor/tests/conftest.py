@@ -0,0 +1,6 @@
+# conftest.py
+"""Make the app's top-level packages (core, data, ...) importable as they are when run from OptionPredictor/."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
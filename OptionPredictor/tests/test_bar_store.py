@@ -0,0 +1,105 @@
+import datetime as dt
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.storage.bar_store import BarStore
+
+D = dt.date
+
+
+def _daily(start, end, base=100.0):
+    idx = pd.bdate_range(start, end)
+    close = base + np.arange(len(idx), dtype=float)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e6},
+                        index=idx)
+
+
+def _manifest(store, sym, tf="1d"):
+    return json.loads((store._dir(sym, tf) / "manifest.json").read_text())
+
+
+def test_pure_append_extends_current_generation(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("SPY", _daily("2024-01-02", "2024-01-31"))
+    view = store.bars("SPY", "1d")
+    store.append("SPY", _daily("2024-02-01", "2024-02-29", base=200))
+    m = _manifest(store, "SPY")
+    assert m.get("gen", 0) == 0 and m["rows"] == len(view) + 21
+    df = store.ohlcv("SPY")
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+    assert df.loc["2024-02-01", "Close"] == 200.0
+
+
+def test_overlapping_append_writes_new_generation_and_keeps_old_views(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("SPY", _daily("2024-01-02", "2024-01-31"))
+    old = store.bars("SPY", "1d")
+    old_close = np.array(old.close)
+
+    store.append("SPY", _daily("2024-01-29", "2024-02-09", base=500))   # rewrites the last three rows
+    m = _manifest(store, "SPY")
+    assert m["gen"] == 1
+    new = store.ohlcv("SPY")
+    assert new.index.is_unique and len(new) == len(old) + 7
+    assert new.loc["2024-01-29", "Close"] == 500.0 and new.loc["2024-01-26", "Close"] == old_close[-4]
+    # The view taken before the rewrite still reads the old generation's values
+    np.testing.assert_array_equal(np.array(old.close), old_close)
+    files = {f.name for f in store._dir("SPY", "1d").glob("*.bin")}
+    assert "close.1.bin" in files
+
+
+def test_stale_bytes_past_manifest_are_dropped(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("SPY", _daily("2024-01-02", "2024-01-12"))
+    d = store._dir("SPY", "1d")
+    with open(d / "close.bin", "ab") as fh:              # an aborted write
+        np.zeros(5).tofile(fh)
+    store.append("SPY", _daily("2024-01-15", "2024-01-19"))
+    assert len(store.ohlcv("SPY")) == 14
+    assert (d / "close.bin").stat().st_size == 14 * 8
+
+
+def test_coverage_is_merged_and_can_exceed_bars(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("SPY", _daily("2024-01-02", "2024-01-05"), covered=(D(2024, 1, 1), D(2024, 1, 7)))
+    store.append("SPY", pd.DataFrame(columns=["Close"]), covered=(D(2024, 1, 8), D(2024, 1, 8)))
+    store.append("SPY", _daily("2024-03-01", "2024-03-01"))
+    assert store.coverage("SPY")["ranges"] == [(D(2024, 1, 1), D(2024, 1, 8)), (D(2024, 3, 1), D(2024, 3, 1))]
+    assert store.coverage("SPY")["rows"] == 5
+
+
+def test_concurrent_appends_keep_every_row_once(tmp_path):
+    store = BarStore(tmp_path)
+    store.append("SPY", _daily("2023-01-02", "2023-12-29"))
+    chunks = [_daily(f"2024-{m:02d}-01", f"2024-{m:02d}-28") for m in range(1, 7)]
+    chunks += [_daily("2023-06-01", "2023-06-30", base=900)]          # forces rewrites
+    errors = []
+
+    def write(chunk):
+        try:
+            store.append("SPY", chunk)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(c,)) for c in chunks]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    df = store.ohlcv("SPY")
+    expected = pd.concat([_daily("2023-01-02", "2023-12-29")] + chunks).index.unique()
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+    assert df.index.equals(expected.sort_values())
+    assert df.loc["2023-06-01", "Close"] == 900.0
+
+
+def test_missing_symbol_raises_and_ohlcv_is_empty(tmp_path):
+    store = BarStore(tmp_path)
+    with pytest.raises(FileNotFoundError):
+        store.bars("NOPE", "1d")
+    assert store.ohlcv("NOPE").empty
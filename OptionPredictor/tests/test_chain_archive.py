@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from core.storage.chain_archive import ChainArchive, _days
+
+ROWS = [
+    # quote_date, expiration, strike, type, bid, ask
+    ("2024-03-04", "2024-03-15", 500.0, "P", 1.10, 1.20),
+    ("2024-03-04", "2024-03-15", 505.0, "P", 2.00, 2.10),
+    ("2024-03-04", "2024-03-15", 510.0, "C", 3.30, 3.45),
+    ("2024-03-04", "2024-04-19", 500.0, "put", 6.00, 6.25),
+    ("2024-03-05", "2024-03-15", 500.0, "P", 1.00, 1.05),
+]
+
+
+def _archive(tmp_path):
+    csv = tmp_path / "chain.csv"
+    pd.DataFrame(ROWS, columns=["quote_date", "expiration", "strike", "option_type", "bid", "ask"]).to_csv(csv, index=False)
+    archive = ChainArchive(tmp_path / "chains")
+    assert archive.import_csv(str(csv), symbol="spy") == len(ROWS)
+    return archive
+
+
+def test_quotes_round_trip(tmp_path):
+    table = _archive(tmp_path).load("SPY", "2024-03-01", "2024-03-31")
+    assert len(table) == len(ROWS)
+    days = _days([r[0] for r in ROWS])
+    bid, ask = table.quotes(days, _days([r[1] for r in ROWS]), [r[3].upper().startswith("P") for r in ROWS],
+                            [r[2] for r in ROWS])
+    np.testing.assert_array_equal(bid, [r[4] for r in ROWS])
+    np.testing.assert_array_equal(ask, [r[5] for r in ROWS])
+    assert table.hits == len(ROWS) and table.misses == 0
+
+
+def test_quotes_miss_and_as_of(tmp_path):
+    table = _archive(tmp_path).load("SPY", "2024-03-01", "2024-03-31", max_stale_days=3)
+    exp = _days(["2024-03-15"])[0]
+    # Wrong type, unlisted strike, and a day past max_stale_days are NaN
+    bid, ask = table.quotes(_days(["2024-03-04", "2024-03-04", "2024-03-12"]), [exp] * 3,
+                            [False, True, True], [500.0, 502.5, 500.0])
+    assert np.isnan(bid).all() and np.isnan(ask).all()
+    # A day without a snapshot uses the latest earlier one within max_stale_days
+    bid, ask = table.quotes(_days(["2024-03-07"]), [exp], [True], [500.0])
+    assert (bid[0], ask[0]) == (1.00, 1.05)
+
+
+def test_reimport_keeps_newest_quote(tmp_path):
+    archive = _archive(tmp_path)
+    csv = tmp_path / "update.csv"
+    pd.DataFrame([("2024-03-04", "2024-03-15", 500.0, "P", 1.15, 1.25)],
+                 columns=["quote_date", "expiration", "strike", "option_type", "bid", "ask"]).to_csv(csv, index=False)
+    archive.import_csv(str(csv), symbol="SPY")
+    table = archive.load("SPY", "2024-03-01", "2024-03-31")
+    assert len(table) == len(ROWS)
+    bid, ask = table.quotes(_days(["2024-03-04"]), _days(["2024-03-15"]), [True], [500.0])
+    assert (bid[0], ask[0]) == (1.15, 1.25)
+
+
+def test_snap_leg_uses_listed_expiry_and_strike(tmp_path):
+    table = _archive(tmp_path).load("SPY", "2024-03-01", "2024-03-31")
+    day = _days(["2024-03-04"])[0]
+    exp, strike = table.snap_leg(day, _days(["2024-03-20"])[0], 503.0, True)
+    assert exp == _days(["2024-04-19"])[0] and strike == 500.0
+    np.testing.assert_array_equal(table.strikes(day, _days(["2024-03-15"])[0], True), [500.0, 505.0])
@@ -0,0 +1,52 @@
+import datetime as dt
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.models import trading_calendar
+from core.storage import http_cassette
+from core.storage.http_cassette import Cassette
+
+RECORDED = time.mktime((2026, 10, 14, 18, 0, 0, 0, 0, -1))   # local time on a past Wednesday evening
+
+
+@pytest.fixture(autouse=True)
+def _uninstall():
+    yield
+    http_cassette.uninstall()
+
+
+def _response(body: bytes):
+    return SimpleNamespace(status_code=200, reason="OK", headers={"Content-Type": "text/csv"}, content=body)
+
+
+def test_request_key_ignores_order_and_volatile_params():
+    a = Cassette.request_key("get", "https://stooq.com/q/d/l/", {"s": "spy.us", "d1": "20250101", "crumb": "x"})
+    b = Cassette.request_key("GET", "https://stooq.com/q/d/l/?d1=20250101", {"s": "spy.us", "crumb": "y"})
+    assert a == b
+    assert "crumb" not in a[2]
+    assert a != Cassette.request_key("GET", "https://stooq.com/q/d/l/", {"s": "spy.us", "d1": "20250102"})
+
+
+def test_replay_pins_the_recording_clock(tmp_path):
+    Cassette(tmp_path, "record").save_clock(RECORDED)
+    http_cassette.install("replay", tmp_path, latency=0)
+    assert trading_calendar.current_date() == dt.date(2026, 10, 14)
+    assert trading_calendar.expected_last_session() == trading_calendar.expected_last_session(
+        dt.datetime.fromtimestamp(RECORDED, trading_calendar.EXCHANGE_TZ))
+    http_cassette.uninstall()
+    assert trading_calendar.current_date() == dt.date.today()
+
+
+def test_record_then_replay_round_trip_and_misses(tmp_path):
+    requests = pytest.importorskip("requests")
+    url, params = "https://stooq.com/q/d/l/", {"s": "spy.us", "d1": "20251014", "d2": "20261014"}
+    Cassette(tmp_path, "record").record("GET", url, params, None, _response(b"Date,Close\n"), 0.0)
+
+    cas = Cassette(tmp_path, "replay", latency=0)
+    resp = cas.replay("GET", url, dict(params))
+    assert resp.status_code == 200 and resp.content == b"Date,Close\n"
+    with pytest.raises(requests.exceptions.ConnectionError):
+        cas.replay("GET", url, {**params, "d2": "20261015"})
+    assert cas.stats == {"recorded": 0, "replayed": 1, "misses": 1}
@@ -0,0 +1,110 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.models import trading_calendar
+from core.storage.bar_store import BarStore
+from core.storage.market_data import MarketData, NoDataError, SourceAdapter
+from core.storage.single_flight import single_flight
+
+D = dt.date
+TODAY = D(2026, 10, 16)          # a Friday session, pinned as the newest one expected
+
+
+class FakeSource(SourceAdapter):
+    """Daily bars for every symbol through `published`; records each requested range."""
+    name = "fake"
+    retries = 0
+    backoff = 0.0
+    cooldown = 0.0
+
+    def __init__(self, published: dt.date = TODAY, fail: frozenset = frozenset()) -> None:
+        super().__init__()
+        self.published = published
+        self.fail = set(fail)
+        self.calls: list[tuple[str, dt.date, dt.date]] = []
+
+    def _download(self, symbol, start, end):
+        self.calls.append((symbol, start, end))
+        if symbol in self.fail:
+            raise ConnectionError("source down")
+        idx = trading_calendar.sessions(start, min(end, self.published))
+        if not len(idx):
+            raise NoDataError(f"nothing published for {symbol}")
+        close = 100.0 + np.arange(len(idx), dtype=float)
+        return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                             "Volume": 1e6}, index=idx)
+
+
+@pytest.fixture(autouse=True)
+def _pinned_clock(monkeypatch):
+    monkeypatch.setattr(trading_calendar, "expected_last_session", lambda now=None: TODAY)
+    single_flight().forget()
+    yield
+    single_flight().forget()
+
+
+def _service(tmp_path, source):
+    return MarketData(sources=[source], store=BarStore(tmp_path / "bars"))
+
+
+def test_only_missing_sessions_are_downloaded(tmp_path):
+    src = FakeSource()
+    md = _service(tmp_path, src)
+    first = md.history("SPY", D(2026, 9, 1), D(2026, 9, 30))
+    assert first.index[0].date() == D(2026, 9, 1) and first.index[-1].date() == D(2026, 9, 30)
+    md.clear_memory()
+    single_flight().forget()
+    wider = md.history("SPY", D(2026, 9, 1), D(2026, 10, 9))
+    assert src.calls == [("SPY", D(2026, 9, 1), D(2026, 9, 30)), ("SPY", D(2026, 10, 1), D(2026, 10, 9))]
+    assert wider.index.is_unique and wider.index[-1].date() == D(2026, 10, 9)
+
+
+def test_repeat_request_is_served_without_download(tmp_path):
+    src = FakeSource()
+    md = _service(tmp_path, src)
+    md.history("SPY", D(2026, 9, 1), D(2026, 9, 30))
+    md.clear_memory()
+    md.history("SPY", D(2026, 9, 8), D(2026, 9, 20))
+    assert len(src.calls) == 1 and md.stats["store_hits"] == 1
+
+
+def test_unpublished_last_session_stays_uncovered(tmp_path):
+    src = FakeSource(published=TODAY - dt.timedelta(days=1))
+    md = _service(tmp_path, src)
+    assert md.history("SPY", D(2026, 10, 1), TODAY).index[-1].date() == D(2026, 10, 15)
+
+    # The trailing gap is only the newest session and every source still has nothing for it
+    single_flight().forget()
+    assert md.history("SPY", D(2026, 10, 1), TODAY).index[-1].date() == D(2026, 10, 15)
+    assert md.store.coverage("SPY")["ranges"][-1][1] < TODAY
+
+    src.published = TODAY
+    single_flight().forget()
+    assert md.history("SPY", D(2026, 10, 1), TODAY).index[-1].date() == TODAY
+    assert src.calls[-1] == ("SPY", TODAY, TODAY)
+
+
+def test_failed_gap_is_not_covered(tmp_path):
+    src = FakeSource(fail={"SPY"})
+    md = _service(tmp_path, src)
+    with pytest.raises(RuntimeError):
+        md.history("SPY", D(2026, 9, 1), D(2026, 9, 30))
+    assert md.store.coverage("SPY").get("ranges", []) == []
+
+    md.history("QQQ", D(2026, 9, 1), D(2026, 9, 30))
+    src.fail.add("QQQ")
+    with pytest.raises(RuntimeError, match="Incomplete"):
+        md.history("QQQ", D(2026, 9, 1), D(2026, 10, 9), allow_partial=False)
+    assert len(md.history("QQQ", D(2026, 9, 1), D(2026, 10, 9))) == 21     # partial: what the store has
+
+
+def test_history_many_drops_failed_symbols_unless_partial(tmp_path):
+    src = FakeSource(fail={"BAD"})
+    md = _service(tmp_path, src)
+    frames = md.history_many(["SPY", "QQQ", "BAD"], D(2026, 9, 1), D(2026, 9, 30), allow_partial=False)
+    assert sorted(frames) == ["QQQ", "SPY"]
+    closes = md.close_many(["SPY", "QQQ"], D(2026, 9, 1), D(2026, 9, 30))
+    assert list(closes.columns) == ["SPY", "QQQ"] and len(closes) == 21
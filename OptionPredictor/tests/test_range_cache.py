@@ -0,0 +1,86 @@
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+from core.storage.range_cache import RangeCache, _nbytes
+
+D = dt.date
+
+
+def _closes(start, end):
+    idx = pd.bdate_range(start, end)
+    return pd.Series(np.arange(len(idx), dtype=float), index=idx)
+
+
+def test_get_slices_inside_covered_range():
+    cache = RangeCache()
+    cache.put("SPY", D(2024, 1, 2), D(2024, 1, 31), _closes("2024-01-02", "2024-01-31"))
+    got = cache.get("SPY", D(2024, 1, 8), D(2024, 1, 12))
+    assert list(got.index.date) == [D(2024, 1, 8), D(2024, 1, 9), D(2024, 1, 10), D(2024, 1, 11), D(2024, 1, 12)]
+    assert cache.get("SPY", D(2024, 1, 8), D(2024, 2, 5)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_weekend_edges_count_as_covered():
+    cache = RangeCache()
+    cache.put("SPY", D(2024, 3, 4), D(2024, 3, 8), _closes("2024-03-04", "2024-03-08"))
+    # Saturday/Sunday either side hold no session
+    assert cache.get("SPY", D(2024, 3, 2), D(2024, 3, 10)) is not None
+
+
+def test_adjacent_ranges_merge_across_weekend():
+    cache = RangeCache()
+    cache.put("SPY", D(2024, 3, 4), D(2024, 3, 8), _closes("2024-03-04", "2024-03-08"))    # Mon–Fri
+    cache.put("SPY", D(2024, 3, 11), D(2024, 3, 15), _closes("2024-03-11", "2024-03-15"))  # next Mon–Fri
+    assert cache.stats()["merges"] == 1
+    got = cache.get("SPY", D(2024, 3, 4), D(2024, 3, 15))
+    assert len(got) == 10 and got.index.is_monotonic_increasing
+
+
+def test_adjacent_ranges_merge_across_holiday():
+    cache = RangeCache()
+    cache.put("SPY", D(2024, 3, 25), D(2024, 3, 28), _closes("2024-03-25", "2024-03-28"))
+    cache.put("SPY", D(2024, 4, 1), D(2024, 4, 5), _closes("2024-04-01", "2024-04-05"))   # Good Friday between
+    assert cache.stats()["merges"] == 1
+    assert cache.get("SPY", D(2024, 3, 25), D(2024, 4, 5)) is not None
+
+
+def test_overlap_merges_and_keeps_newest_values():
+    cache = RangeCache()
+    cache.put("SPY", D(2024, 1, 2), D(2024, 1, 12), _closes("2024-01-02", "2024-01-12"))
+    newer = _closes("2024-01-10", "2024-01-19") + 100
+    cache.put("SPY", D(2024, 1, 10), D(2024, 1, 19), newer)
+    got = cache.get("SPY", D(2024, 1, 2), D(2024, 1, 19))
+    assert not got.index.duplicated().any()
+    assert got.loc["2024-01-10"] == newer.loc["2024-01-10"]
+
+
+def test_disjoint_range_replaces_entry():
+    cache = RangeCache()
+    cache.put("SPY", D(2024, 1, 2), D(2024, 1, 5), _closes("2024-01-02", "2024-01-05"))
+    cache.put("SPY", D(2024, 2, 5), D(2024, 2, 9), _closes("2024-02-05", "2024-02-09"))   # sessions in between
+    assert cache.stats()["merges"] == 0
+    assert cache.get("SPY", D(2024, 1, 2), D(2024, 1, 5)) is None
+    assert cache.get("SPY", D(2024, 2, 5), D(2024, 2, 9)) is not None
+
+
+def test_lru_eviction():
+    # Fresh series each time: a sliced index caches its lookup engine, which memory_usage counts
+    cache = RangeCache(max_bytes=2 * _nbytes(_closes("2024-01-02", "2024-03-29")) + 1)
+    for sym in ("A", "B"):
+        cache.put(sym, D(2024, 1, 2), D(2024, 3, 29), _closes("2024-01-02", "2024-03-29"))
+    assert cache.get("A", D(2024, 1, 2), D(2024, 1, 5)) is not None     # A is now most recent
+    cache.put("C", D(2024, 1, 2), D(2024, 3, 29), _closes("2024-01-02", "2024-03-29"))
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2 and stats["bytes"] <= stats["max_bytes"]
+    assert cache.get("B", D(2024, 1, 2), D(2024, 1, 5)) is None
+    assert cache.get("A", D(2024, 1, 2), D(2024, 1, 5)) is not None
+    assert cache.get("C", D(2024, 1, 2), D(2024, 1, 5)) is not None
+
+
+def test_oversized_entry_is_not_stored():
+    data = _closes("2024-01-02", "2024-12-31")
+    cache = RangeCache(max_bytes=_nbytes(data) - 1)
+    cache.put("SPY", D(2024, 1, 2), D(2024, 12, 31), data)
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.storage.single_flight import SingleFlight
+
+N_CALLERS = 8
+
+
+def _concurrently(fn, n=N_CALLERS):
+    barrier = threading.Barrier(n)
+
+    def call():
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(n) as pool:
+        futures = [pool.submit(call) for _ in range(n)]
+        return futures
+
+
+def test_concurrent_calls_share_one_execution():
+    sf = SingleFlight(ttl=0)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    results = [f.result() for f in _concurrently(lambda: sf.do("k", fetch))]
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    stats = sf.stats()
+    assert stats["executed"] == 1 and stats["coalesced"] == N_CALLERS - 1 and stats["in_flight"] == 0
+
+
+def test_exception_reaches_every_waiter_and_is_not_cached():
+    sf = SingleFlight(ttl=10)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("boom")
+
+    for f in _concurrently(lambda: sf.do("k", fail)):
+        with pytest.raises(ValueError):
+            f.result()
+    assert len(calls) == 1
+    assert sf.do("k", lambda: "ok") == "ok"
+
+
+def test_distinct_keys_run_separately():
+    sf = SingleFlight(ttl=0)
+    counter = iter(range(N_CALLERS))
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            key = next(counter)
+        return sf.do(key, lambda: key)
+
+    assert sorted(f.result() for f in _concurrently(call)) == list(range(N_CALLERS))
+    assert sf.stats()["executed"] == N_CALLERS
+
+
+def test_ttl_serves_recent_result_then_expires():
+    sf = SingleFlight(ttl=0.2)
+    assert sf.do("k", lambda: 1) == 1
+    assert sf.do("k", lambda: 2) == 1
+    assert sf.stats()["ttl_hits"] == 1
+    time.sleep(0.25)
+    assert sf.do("k", lambda: 3) == 3
+    sf.forget("k")
+    assert sf.do("k", lambda: 4) == 4
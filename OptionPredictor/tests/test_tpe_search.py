@@ -0,0 +1,35 @@
+import pandas as pd
+
+from core.engine.tpe_search import TPESearch
+
+SPACE = {"dte_target": [7, 14, 21, 30, 45], "profit_target_pct": [25, 50, 75, 100]}
+
+
+def _prior(points):
+    return pd.DataFrame([{**p, "total_return_pct": float(i)} for i, p in enumerate(points)])
+
+
+def test_warm_start_points_are_never_proposed():
+    prior = [{"dte_target": d, "profit_target_pct": p} for d in (7, 14, 21) for p in (25, 50, 75, 100)]
+    search = TPESearch(SPACE, max_evals=20, n_startup=2, seed=0)
+    assert search.warm_start(_prior(prior)) == len(prior)
+    asked = search.ask(20)
+    assert len(asked) == 20 - len(prior)      # only the unseen rest of the grid
+    assert not any(a in prior for a in asked)
+    assert search.budget_left() == 20 - len(asked)
+
+
+def test_warm_start_snaps_to_choices():
+    search = TPESearch(SPACE, seed=0)
+    search.warm_start(_prior([{"dte_target": 29, "profit_target_pct": 49.0}]))
+    assert {"dte_target": 30, "profit_target_pct": 50} not in search.ask(search.grid_size)
+
+
+def test_replay_of_warm_point_counts_budget_once():
+    point = {"dte_target": 7, "profit_target_pct": 25}
+    search = TPESearch(SPACE, max_evals=5, seed=0)
+    search.warm_start(_prior([point]))
+    search.replay(point, 1.0)
+    search.replay(point, 1.0)
+    assert search.budget_left() == 4
+    assert len(search.history()) == 1           # observed once, by the warm start
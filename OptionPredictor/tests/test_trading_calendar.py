@@ -0,0 +1,106 @@
+import datetime as dt
+
+import pytest
+
+from core.models import trading_calendar as tc
+
+D = dt.date
+
+
+@pytest.mark.parametrize("day, name", [
+    (D(2021, 7, 5), "Independence Day"),      # July 4 on a Sunday
+    (D(2022, 6, 20), "Juneteenth"),           # June 19 on a Sunday
+    (D(2021, 4, 2), "Good Friday"),
+    (D(2023, 4, 7), "Good Friday"),
+    (D(2024, 3, 29), "Good Friday"),
+    (D(2021, 12, 24), "Christmas Day"),       # Dec 25 on a Saturday
+    (D(2025, 1, 9), "Carter funeral"),
+])
+def test_holidays(day, name):
+    assert tc.holidays(day.year)[day] == name
+    assert not tc.is_session(day)
+
+
+@pytest.mark.parametrize("day", [
+    D(2021, 6, 18),     # Juneteenth is only observed from 2022
+    D(2021, 12, 31),    # Saturday New Year's Day is not moved back a year
+    D(2021, 7, 2),
+    D(2024, 3, 28),
+])
+def test_sessions_not_holidays(day):
+    assert tc.is_session(day)
+
+
+@pytest.mark.parametrize("year, expected", [
+    (2021, {D(2021, 11, 26)}),                                     # July 3 Sat, Dec 24 is the holiday
+    (2023, {D(2023, 7, 3), D(2023, 11, 24)}),                      # Dec 24 on a Sunday
+    (2024, {D(2024, 7, 3), D(2024, 11, 29), D(2024, 12, 24)}),
+])
+def test_early_closes(year, expected):
+    assert tc.early_closes(year) == expected
+
+
+def test_session_close_times():
+    assert tc.session_close(D(2024, 7, 3)).time() == tc.EARLY_CLOSE_TIME
+    assert tc.session_close(D(2024, 7, 2)).time() == tc.CLOSE_TIME
+
+
+def test_sessions_and_count_skip_holidays():
+    days = tc.sessions(D(2024, 3, 25), D(2024, 4, 2))
+    assert [d.date() for d in days] == [D(2024, 3, 25), D(2024, 3, 26), D(2024, 3, 27), D(2024, 3, 28),
+                                        D(2024, 4, 1), D(2024, 4, 2)]
+    assert tc.session_count(D(2024, 3, 25), D(2024, 4, 2)) == 6
+    assert tc.session_count(D(2024, 4, 2), D(2024, 3, 25)) == 0
+
+
+def _et(*args):
+    return dt.datetime(*args, tzinfo=tc.EXCHANGE_TZ)
+
+
+@pytest.mark.parametrize("now, expected", [
+    (_et(2024, 3, 27, 16, 29), D(2024, 3, 26)),   # closed, bar not yet published
+    (_et(2024, 3, 27, 16, 31), D(2024, 3, 27)),
+    (_et(2024, 3, 27, 9, 0), D(2024, 3, 26)),     # before the open
+    (_et(2024, 7, 3, 13, 29), D(2024, 7, 2)),     # early close at 1 pm
+    (_et(2024, 7, 3, 13, 31), D(2024, 7, 3)),
+    (_et(2024, 3, 30, 12, 0), D(2024, 3, 28)),    # Saturday after Good Friday
+    (_et(2024, 4, 1, 9, 0), D(2024, 3, 28)),      # Monday morning after it
+])
+def test_expected_last_session(now, expected):
+    assert tc.expected_last_session(now) == expected
+
+
+def test_expected_last_session_converts_other_timezones():
+    now = dt.datetime(2024, 3, 27, 20, 31, tzinfo=dt.timezone.utc)   # 16:31 EDT
+    assert tc.expected_last_session(now) == D(2024, 3, 27)
+
+
+def test_is_covered_uses_sessions():
+    now = _et(2024, 4, 1, 12, 0)
+    # A request through the weekend/holiday is complete once it has Thursday's bar
+    assert tc.is_covered(D(2024, 3, 28), D(2024, 3, 31), now)
+    assert not tc.is_covered(D(2024, 3, 27), D(2024, 3, 31), now)
+    assert not tc.is_covered(None, D(2024, 3, 31), now)
+
+
+@pytest.mark.parametrize("coverage, start, end, expected", [
+    ([], D(2024, 1, 1), D(2024, 1, 31), [(D(2024, 1, 1), D(2024, 1, 31))]),
+    ([(D(2024, 1, 1), D(2024, 1, 31))], D(2024, 1, 1), D(2024, 1, 31), []),
+    ([(D(2023, 12, 1), D(2024, 2, 1))], D(2024, 1, 5), D(2024, 1, 6), []),
+    ([(D(2024, 1, 10), D(2024, 1, 20))], D(2024, 1, 1), D(2024, 1, 31),
+     [(D(2024, 1, 1), D(2024, 1, 9)), (D(2024, 1, 21), D(2024, 1, 31))]),
+    ([(D(2024, 1, 1), D(2024, 1, 10)), (D(2024, 1, 15), D(2024, 1, 31))], D(2024, 1, 1), D(2024, 1, 31),
+     [(D(2024, 1, 11), D(2024, 1, 14))]),
+    ([(D(2024, 1, 1), D(2024, 1, 1))], D(2024, 1, 1), D(2024, 1, 2), [(D(2024, 1, 2), D(2024, 1, 2))]),
+    ([(D(2024, 1, 2), D(2024, 1, 2))], D(2024, 1, 1), D(2024, 1, 2), [(D(2024, 1, 1), D(2024, 1, 1))]),
+    ([(D(2023, 1, 1), D(2023, 6, 1)), (D(2025, 1, 1), D(2025, 6, 1))], D(2024, 1, 1), D(2024, 1, 31),
+     [(D(2024, 1, 1), D(2024, 1, 31))]),
+    ([], D(2024, 1, 1), D(2024, 1, 1), [(D(2024, 1, 1), D(2024, 1, 1))]),
+])
+def test_missing_ranges(coverage, start, end, expected):
+    assert tc.missing_ranges(coverage, start, end) == expected
+
+
+def test_merge_ranges_joins_touching():
+    ranges = [(D(2024, 1, 11), D(2024, 1, 20)), (D(2024, 1, 1), D(2024, 1, 10)), (D(2024, 2, 1), D(2024, 2, 2))]
+    assert tc.merge_ranges(ranges) == [(D(2024, 1, 1), D(2024, 1, 20)), (D(2024, 2, 1), D(2024, 2, 2))]
@@ -40,9 +40,9 @@ from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from dateutil.parser import parse as _dateparse
 
 
-# ─── Stooq downloader (robust) ───────────────────────────────────────────
-import io, zipfile, pandas as pd
-from curl_cffi import requests as curl_requests
+# ─── Daily price history (local bar store, then Stooq / yfinance) ───────
+from core.storage.market_data import market_data
+from core.storage.single_flight import http_get
 
 import sys
 import os
@@ -87,44 +87,9 @@ def _palette(theme: str):
 
 
 
-_STOOQ_PERIOD_MAP = {           # how many calendar days to keep
-    "1mo": 30,  "3mo": 90,  "6mo": 180,
-    "1y": 365, "2y": 730,  "5y": 1825,
-    "10y": 3650, "ytd": 366, "max": None,
-}
-
-class StooqNoDataError(RuntimeError): pass     # clean exception
-
-def _stooq_history(symbol: str, period: str = "1y") -> pd.DataFrame:
-    # ---------- map symbols to Stooq convention -------------------------
-    if symbol.isalpha() and len(symbol) <= 5:          # simple US ticker?
-        stooq_sym = f"{symbol.lower()}.us"            #  → append .us
-    else:
-        stooq_sym = symbol.lower()                    # e.g. ^spx, eurusd
-    days = _STOOQ_PERIOD_MAP.get(period, 365)
-    url  = f"https://stooq.com/q/d/l/?s={stooq_sym}&i=d"
-
-
-    raw_bytes = curl_requests.get(url, timeout=20).content
-
-    # ① sometimes Stooq sends a tiny zip, sometimes bare CSV  ------------
-    try:
-        with zipfile.ZipFile(io.BytesIO(raw_bytes)) as zf:
-            csv_bytes = zf.read(zf.namelist()[0])
-    except zipfile.BadZipFile:
-        csv_bytes = raw_bytes
-
-    if not csv_bytes.lstrip().startswith(b"Date,"):
-        raise StooqNoDataError(f"Stooq returned no data for {symbol}")
-
-    df = (pd.read_csv(io.BytesIO(csv_bytes), parse_dates=["Date"])
-            .rename(columns=str.title)        # open→Open etc.
-            .set_index("Date").sort_index())
-
-    if days is not None:
-        df = df.iloc[-days:]
-
-    return df
+def _price_history(symbol: str, period: str = "1y") -> pd.DataFrame:
+    """Daily OHLCV for the chart command, served by the shared MarketData service."""
+    return market_data().history(symbol, period=period)
 
 # ───────────────────────────────────────────────────────────────
 # 1)  BUILD ONE  curl-cffi  SESSION  AND SAFE WRAPPERS
@@ -1069,7 +1034,7 @@ class FinancialChatbotApp(ctk.CTk):
         period = args[1] if len(args) > 1 else "1y"
 
         try:
-            df = _stooq_history(sym, period)
+            df = _price_history(sym, period)
         except Exception as e:
             return f"Could not download chart data for {sym}: {e}"
 
@@ -1089,7 +1054,7 @@ class FinancialChatbotApp(ctk.CTk):
         url = (f"https://finnhub.io/api/v1/company-news?symbol={sym}"
                f"&from={from_date}&to={to_date}&token={FINNHUB_API_KEY}")
         try:
-            articles = curl_requests.get(url, timeout=20).json()[:10]
+            articles = http_get("finnhub", url, session=curl_requests, timeout=20).json()[:10]
             if not articles: return f"No recent news found for {sym}."
             
             def sent(h):
@@ -1209,7 +1174,7 @@ class FinancialChatbotApp(ctk.CTk):
         
         try:
             # Use curl-cffi for robustness
-            eps_js = curl_requests.get("https://www.alphavantage.co/query", params={"function": "EARNINGS", "symbol": sym, "apikey": AV_KEY}, timeout=20).json()
+            eps_js = http_get("alphavantage", "https://www.alphavantage.co/query", session=curl_requests, params={"function": "EARNINGS", "symbol": sym, "apikey": AV_KEY}, timeout=20).json()
             if eps_js and eps_js.get("quarterlyEarnings"):
                 last = eps_js["quarterlyEarnings"][0]
                 qtr, act, est, surpr = last.get("fiscalDateEnding"), last.get("reportedEPS"), last.get("estimatedEPS"), last.get("surprisePercentage")
@@ -1217,7 +1182,7 @@ class FinancialChatbotApp(ctk.CTk):
                      eps_line = (f"Last ({qtr})  ·  EPS **{float(act):.2f}** vs est **{float(est):.2f}**"
                                  f"  → surprise **{float(surpr):+.1f}%**")
 
-            inc_js = curl_requests.get("https://www.alphavantage.co/query", params={"function": "INCOME_STATEMENT", "symbol": sym, "apikey": AV_KEY}, timeout=20).json()
+            inc_js = http_get("alphavantage", "https://www.alphavantage.co/query", session=curl_requests, params={"function": "INCOME_STATEMENT", "symbol": sym, "apikey": AV_KEY}, timeout=20).json()
             if inc_js and inc_js.get("quarterlyReports"):
                 rev = inc_js["quarterlyReports"][0].get("totalRevenue")
                 if rev and rev != "None":
@@ -1,5 +1,5 @@
 from __future__ import annotations
-import json, io, zipfile, requests
+import json
 from pathlib import Path
 
 import tkinter as tk
@@ -7,11 +7,12 @@ from tkinter import ttk, colorchooser, simpledialog, messagebox
 
 import pandas as pd
 import mplfinance as mpf
-import yfinance as yf
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.lines import Line2D
 
+from core.storage.market_data import market_data
+
 
 class CandlestickChartPane(ttk.Frame):
     """
@@ -146,9 +147,7 @@ class CandlestickChartPane(ttk.Frame):
             spine.set_color(fg)
 
         # Data fetch
-        df = self._fetch_data_from_yf(period) 
-        if df is None or (isinstance(df, pd.DataFrame) and df.empty):
-            df = self._fetch_data_from_stooq(period)
+        df = self._fetch_data(period)
         if df is None or (isinstance(df, pd.DataFrame) and df.empty):
             self.ax.text(0.5,0.5,"Chart unavailable", ha="center", va="center", color=fg)
         else:
@@ -180,28 +179,11 @@ class CandlestickChartPane(ttk.Frame):
         self.theme = theme
         self.refresh_data()
         
-    def _fetch_data_from_yf(self, period):
-        try:
-            df = yf.download(self.ticker, period=period, interval="1d",
-                             auto_adjust=False, progress=False)
-            return df if isinstance(df, pd.DataFrame) and not df.empty else None
-        except:
-            return None
-
-    def _fetch_data_from_stooq(self, period):
+    def _fetch_data(self, period):
+        """Daily OHLCV from the shared MarketData service (bar store, then Stooq / yfinance)."""
         try:
-            url = f"https://stooq.com/q/d/l/?s={self.ticker.lower()}.us&i=d"
-            raw = requests.get(url, timeout=15).content
-            if raw[:2]==b"PK":
-                with zipfile.ZipFile(io.BytesIO(raw)) as zf:
-                    raw = zf.read(zf.namelist()[0])
-            df = (pd.read_csv(io.BytesIO(raw), parse_dates=["Date"])
-                    .set_index("Date").sort_index())
-            if period=="7d":    df = df.iloc[-7:]
-            elif period=="30d": df = df.iloc[-30:]
-            elif period=="365d":df = df.iloc[-252:]
-            return df
-        except:
+            return market_data().history(self.ticker, period=period).copy()
+        except Exception:
             return None
 
     # ── Annotation & Undo ─────────────────────────────────────